@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""Benchmark kaizen workflows against the local fake AgileZen server.
+
+For each workflow the number of requests per second, the p50/p99 latency of
+its operations and the peak memory allocated by Python are measured:
+
+    python bench/benchmark.py --stories 5000 --latency 0.005 --save base.json
+    python bench/benchmark.py --stories 5000 --latency 0.005 \
+        --baseline base.json
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kaizen.api import ZenRequest  # noqa: E402
+from kaizen.cli import ZenApi  # noqa: E402
+from kaizen.client import ApiClient  # noqa: E402
+from kaizen.fakeserver import FakeDataset, FakeServer  # noqa: E402
+
+API_KEY = "benchmark_api_key"
+# Metrics for which a higher value is a regression
+LOWER_IS_BETTER = ("p50", "p99", "peak_kb")
+
+
+def _percentile(values, percent):
+    """Return the given percentile of values using the nearest rank."""
+    values = sorted(values)
+    index = max(0, int(round(percent / 100.0 * len(values))) - 1)
+    return values[index]
+
+
+def _measure(server, operations):
+    """Run every operation and return the metrics of the run.
+
+    Args:
+        server: the FakeServer the operations are sent to
+        operations: list of callables, each one being timed separately
+    """
+    latencies = []
+    requests_before = server.request_count
+    tracemalloc.start()
+    start = time.time()
+    for operation in operations:
+        operation_start = time.time()
+        operation()
+        latencies.append(time.time() - operation_start)
+    wall = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    requests = server.request_count - requests_before
+    return {"operations": len(operations), "requests": requests,
+            "wall": wall, "rps": requests / wall if wall else 0,
+            "p50": _percentile(latencies, 50),
+            "p99": _percentile(latencies, 99),
+            "peak_kb": peak / 1024.0}
+
+
+def bench_list(server, api, project_id, args):
+    """List projects, phases and the first page of stories."""
+    operations = []
+    for _ in range(args.repeat):
+        operations.append(api.list_projects)
+        operations.append(lambda: api.list_phases(project_id))
+        operations.append(lambda: api.list_stories(project_id))
+    return _measure(server, operations)
+
+
+def bench_paginate(server, api, project_id, args):
+    """Walk through every story of the project."""
+    client = ApiClient(API_KEY, api_url=server.api_url)
+    request = ZenRequest(API_KEY, client).projects(project_id).stories()
+
+    def walk():
+        for _ in request.iter_items(args.page_size, workers=args.workers):
+            pass
+    return _measure(server, [walk] * args.repeat)
+
+
+def bench_bump_phase(server, api, project_id, args):
+    """Move stories to their next phase one by one."""
+    last_phase = server.dataset.phases[project_id][-1]["id"]
+    story_ids = [story["id"] for story
+                 in server.dataset.stories[project_id].values()
+                 if story["phase"]["id"] != last_phase][:args.operations]
+    return _measure(server, [
+        lambda story_id=story_id: api.move_story_to_next_phase(story_id,
+                                                               project_id)
+        for story_id in story_ids])
+
+
+def bench_bulk_update(server, api, project_id, args):
+    """Update many stories concurrently."""
+    client = ApiClient(API_KEY, api_url=server.api_url)
+    stories = ZenRequest(API_KEY, client).projects(project_id)
+    story_ids = list(server.dataset.stories[project_id])[:args.operations]
+
+    def update_all():
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            list(executor.map(
+                lambda story_id: stories.stories(story_id)
+                .update(text="updated %s" % story_id).send(), story_ids))
+    return _measure(server, [update_all])
+
+
+WORKFLOWS = {
+    "list": bench_list,
+    "paginate": bench_paginate,
+    "bump-phase": bench_bump_phase,
+    "bulk-update": bench_bulk_update,
+}
+
+
+def run(args):
+    """Run the selected workflows and return their metrics."""
+    dataset = FakeDataset(projects=1, stories=args.stories)
+    project_id = list(dataset.projects)[0]
+    results = {}
+    with FakeServer(dataset, latency=args.latency) as server:
+        (handle, config_path) = tempfile.mkstemp(suffix=".yaml")
+        with os.fdopen(handle, "w") as config_file:
+            config_file.write("api_key: %s\nproject_id: %s\napi_url: %s\n"
+                              % (API_KEY, project_id, server.api_url))
+        try:
+            api = ZenApi(config_path)
+            for name in args.workflows:
+                results[name] = WORKFLOWS[name](server, api, project_id, args)
+        finally:
+            os.remove(config_path)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print results next to the baseline and return the regressions."""
+    regressions = []
+    for (name, metrics) in sorted(results.items()):
+        for (metric, value) in sorted(metrics.items()):
+            reference = baseline.get(name, {}).get(metric)
+            if not reference or metric not in LOWER_IS_BETTER + ("rps",):
+                continue
+            ratio = value / reference
+            regressed = ratio > 1 + tolerance if metric in LOWER_IS_BETTER \
+                else ratio < 1 - tolerance
+            print("%-12s %-8s %12.4f %12.4f x%.2f%s"
+                  % (name, metric, reference, value, ratio,
+                     " REGRESSION" if regressed else ""))
+            if regressed:
+                regressions.append((name, metric))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workflows", nargs="+", choices=sorted(WORKFLOWS),
+                        default=sorted(WORKFLOWS))
+    parser.add_argument("--stories", type=int, default=1000,
+                        help="number of stories in the synthetic project")
+    parser.add_argument("--latency", type=float, default=0,
+                        help="seconds added by the server to every response")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of times list and paginate are run")
+    parser.add_argument("--operations", type=int, default=100,
+                        help="number of stories bumped or updated")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="concurrency of paginate and bulk-update")
+    parser.add_argument("--save", help="write the results to this json file")
+    parser.add_argument("--baseline", help="compare with this json file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="relative change reported as a regression")
+    args = parser.parse_args()
+    results = run(args)
+    print(json.dumps(results, indent=2, sort_keys=True))
+    if args.save:
+        with open(args.save, "w") as results_file:
+            json.dump(results, results_file, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            if compare(results, json.load(baseline_file), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""Benchmark the startup time of the kaizen command line interface.
+
+Each scenario is run in a new interpreter, like a shell hook calling kaizen,
+and the p50/p99 of its wall time are reported in milliseconds:
+
+    python bench/startup.py --save startup.json
+    python bench/startup.py --baseline startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark import _percentile, compare
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    # Bare interpreter, the floor of every other scenario
+    "python": "pass",
+    "import": "import kaizen.cli",
+    # Build the API object from the config as every command does
+    "config": "from kaizen.cli import ZenApi; ZenApi(%(config_path)r)",
+}
+
+
+def _time_scenario(code, runs, env):
+    """Return the wall times in ms of running code in new interpreters."""
+    timings = []
+    for _ in range(runs):
+        start = time.time()
+        subprocess.check_call([sys.executable, "-c", code], env=env)
+        timings.append((time.time() - start) * 1000)
+    return timings
+
+
+def run(args):
+    """Run the selected scenarios and return their metrics."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [ROOT] + [path for path in [env.get("PYTHONPATH")] if path])
+    # Keep the config cache of the benchmark away from the user's one
+    env["HOME"] = tempfile.mkdtemp()
+    config_path = os.path.join(env["HOME"], ".kaizen.yaml")
+    with open(config_path, "w") as config_file:
+        config_file.write("api_key: benchmark_api_key\nproject_id: 1\n")
+    results = {}
+    for name in args.scenarios:
+        code = SCENARIOS[name] % {"config_path": config_path}
+        timings = _time_scenario(code, args.runs, env)
+        results[name] = {"p50": _percentile(timings, 50),
+                         "p99": _percentile(timings, 99)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS),
+                        default=sorted(SCENARIOS))
+    parser.add_argument("--runs", type=int, default=20,
+                        help="number of interpreters started per scenario")
+    parser.add_argument("--save", help="write the results to this json file")
+    parser.add_argument("--baseline", help="compare with this json file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="relative change reported as a regression")
+    args = parser.parse_args()
+    results = run(args)
+    print(json.dumps(results, indent=2, sort_keys=True))
+    if args.save:
+        with open(args.save, "w") as results_file:
+            json.dump(results, results_file, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            if compare(results, json.load(baseline_file), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Asyncio support to send requests to AgileZen API concurrently.
+
+The chainable requests from kaizen.api are used unchanged, only the way they
+are sent differs:
+
+    projects = await ZenRequest(api_key).projects().send_async()
+    stories = await gather(*[ZenRequest(api_key).projects(p["id"]).stories()
+                             for p in projects["items"]], limit=10)
+"""
+import asyncio
+import functools
+
+from kaizen.client import DEFAULT_POOL_SIZE, get_client
+
+
+class AsyncApiClient(object):
+    """Send requests to AgileZen API from a coroutine.
+
+    HTTP calls are issued by an ApiClient in a pool of threads so they use the
+    pooled connections of the api key without blocking the event loop.
+    """
+
+    def __init__(self, api_key, pool_size=DEFAULT_POOL_SIZE, client=None,
+                 executor=None):
+        """
+        Args:
+            api_key: the AgileZen api key
+            pool_size: max number of connections kept in the pool
+            client: the ApiClient issuing the HTTP calls, defaults to the
+            client shared by every request of api_key
+            executor: the concurrent.futures.Executor in which the calls are
+            made, defaults to the event loop default executor
+        """
+        self._client = client or get_client(api_key, pool_size)
+        self._executor = executor
+
+    async def send_request(self, request, headers=None):
+        """Send a HTTP request, from which url, verb, params and data are taken
+
+        Args:
+            request: the request to send
+            headers: headers to send
+
+        Returns:
+            the dict loaded from the json response
+
+        Raises:
+            a requests.HTTPError if the status code is not OK
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._client.send_request, request, headers)
+        return await loop.run_in_executor(self._executor, call)
+
+
+def _as_awaitable(request_or_awaitable):
+    """Return an awaitable for the given ApiRequest or awaitable."""
+    if hasattr(request_or_awaitable, "send_async"):
+        return request_or_awaitable.send_async()
+    return request_or_awaitable
+
+
+async def gather(*requests, limit=DEFAULT_POOL_SIZE):
+    """Send the given requests concurrently, at most limit at a time.
+
+    Args:
+        requests: ApiRequests or awaitables returned by ApiRequest.send_async
+        limit: max number of requests in flight at once
+
+    Returns:
+        the list of JSON dict responses, in the same order as requests
+
+    Raises:
+        the first exception raised by one of the requests
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(request):
+        async with semaphore:
+            return await _as_awaitable(request)
+
+    return await asyncio.gather(*[bounded(request) for request in requests])
@@ -1,5 +1,10 @@
-from kaizen.client import ApiClient
+from kaizen.client import get_client
+from kaizen.deadline import Deadline
+from kaizen.pagination import DEFAULT_PAGE_SIZE, iter_items, iter_pages
+from kaizen.records import record_class_for, to_records
+from kaizen.fanout import fan_out
 from kaizen.request import VERBS, Request
+from kaizen.watch import iter_changes
 
 
 def _default_to_empty_str(arg):
@@ -15,28 +20,100 @@ def _remove_none_from_dict(data):
 class ApiRequest(Request):
     """The base Request object containing common methods."""
 
-    def __init__(self, api_key):
+    __slots__ = ("_api_key", "_client", "_deadline")
+
+    def __init__(self, api_key, client=None):
+        """
+        Args:
+            api_key: the AgileZen api key
+            client: the ApiClient used to send the request, sub-requests built
+            from this one share it. Defaults to the client shared by every
+            request of api_key, see kaizen.client.get_client
+        """
         Request.__init__(self)
         self._api_key = api_key
-        self._client = ApiClient(api_key)
+        self._client = client or get_client(api_key)
+        self._deadline = None
 
-    # TODO(bvidal): the method send could cache the result from the API
-    # and invalid it if any other method is called. Not sure it's useful
-    # though... So I don't need it for now.
-    def send(self):
+    def _share_attributes(self, request):
+        Request._share_attributes(self, request)
+        request._api_key = self._api_key
+        request._client = self._client
+        request._deadline = self._deadline
+
+    def send(self, records=False):
         """Send the request to the API.
 
+        Args:
+            records: return compact typed records, see kaizen.records, rather
+            than the JSON dict
+
+        Returns:
+            the JSON dict response from AgileZen, or a record or RecordPage
+            if records is True
+        Raises:
+            requests.exceptions.HTTPError if the request is not successful
+        """
+        response = self._client.send_request(self)
+        if records:
+            return to_records(response, record_class_for(self.url))
+        return response
+
+    def stream(self):
+        """Send the request to the API and decode the entities of the response
+        as it is received.
+
         Returns:
-            the JSON dict response from AgileZen
+            an ItemStream over the entities listed in the response
         Raises:
             requests.exceptions.HTTPError if the request is not successful
         """
-        return self._client.send_request(self)
+        return self._client.stream_items(self)
+
+    def send_async(self, async_client=None):
+        """Send the request to the API from asyncio code.
+
+        Args:
+            async_client: the AsyncApiClient used to send the request, defaults
+            to one wrapping the client of this request
+
+        Returns:
+            an awaitable resolving to the JSON dict response from AgileZen
+        """
+        # Imported here as kaizen.aio is only usable on Python 3
+        from kaizen.aio import AsyncApiClient
+        async_client = async_client or AsyncApiClient(self._api_key,
+                                                      client=self._client)
+        return async_client.send_request(self)
 
     def get_api_key(self):
         return self._api_key
 
-    def paginate(self, page, size=100):
+    def get_client(self):
+        return self._client
+
+    @property
+    def deadline(self):
+        """The Deadline of the request, None if it has none."""
+        return self._deadline
+
+    def with_deadline(self, deadline):
+        """Return a request that must be answered before the deadline, the
+        requests built from it, e.g. its pages or sub-resources, share it.
+
+        Args:
+            deadline: a Deadline or a number of seconds from now, None to
+            remove the deadline
+        Note:
+            see kaizen.deadline
+        """
+        request = self._clone()
+        if deadline is not None and not isinstance(deadline, Deadline):
+            deadline = Deadline(deadline)
+        request._deadline = deadline
+        return request
+
+    def paginate(self, page, size=DEFAULT_PAGE_SIZE):
         """Paginate results from the api.
 
         Args:
@@ -47,6 +124,40 @@ class ApiRequest(Request):
         """
         return self.update_params({"page": page, "pageSize": size})
 
+    def for_page(self, page, size=DEFAULT_PAGE_SIZE):
+        """Return a copy of this request paginated to the given page.
+
+        Args:
+            page: the index of the page to return
+            size: the number of entities on each page
+        """
+        return self.paginate(page, size)
+
+    def iter_pages(self, size=DEFAULT_PAGE_SIZE, prefetch=True, workers=1,
+                   start=1):
+        """Iterate over every page of results, the next pages are fetched in
+        the background while the current one is consumed.
+
+        Args:
+            size: the number of entities on each page
+            prefetch: whether the next pages should be fetched in the background
+            workers: max number of pages fetched concurrently
+            start: the first page to fetch
+        """
+        return iter_pages(self, size, prefetch, workers, start)
+
+    def iter_items(self, size=DEFAULT_PAGE_SIZE, prefetch=True, workers=1,
+                   stream=False):
+        """Iterate over every item of every page of results, in page order.
+
+        Args:
+            size: the number of entities on each page
+            prefetch: whether the next pages should be fetched in the background
+            workers: max number of pages fetched concurrently
+            stream: whether items should be decoded as each page is received
+        """
+        return iter_items(self, size, prefetch, workers, stream)
+
     def where(self, filters):
         """Make it possible to filter resource(s) this request will return.
 
@@ -77,6 +188,8 @@ class ZenRequest(ApiRequest):
     ZenRequest(api_key).projects(project_id).send()
     """
 
+    __slots__ = ()
+
     def projects(self, project_id=None):
         """Access the Project resource. If project_id is None the request will
         list the Projects you have access to.
@@ -86,10 +199,19 @@ class ZenRequest(ApiRequest):
         """
         return ProjectRequest.from_zen_request(self, project_id)
 
+    def fan_out(self, resource, project_ids=None, **options):
+        """Yield the items of a resource, e.g. 'stories', of many Projects
+        queried concurrently, every Project accessible if project_ids is None.
+        See kaizen.fanout.fan_out for the options.
+        """
+        return fan_out(self, resource, project_ids, **options)
+
 
 class ProjectRequest(ApiRequest):
     """Access the Project resource."""
 
+    __slots__ = ()
+
     @classmethod
     def from_zen_request(cls, zen_request, project_id=None):
         """Creates a ProjectRequest with all the attributes of the ZenRequest.
@@ -99,9 +221,7 @@ class ProjectRequest(ApiRequest):
             project_id: id of the Project to work on or None to get access
             to the list of Projects
         """
-        request = cls(zen_request.get_api_key())
-        request = zen_request.copy(request)
-        return request.update_url("/projects/%s" %
+        return zen_request.cast(cls).update_url("/projects/%s" %
                                   _default_to_empty_str(project_id))
 
     def update(self, name=None, description=None, details=None, owner=None):
@@ -148,10 +268,18 @@ class ProjectRequest(ApiRequest):
         """
         return self.update_url("/members/%s" % _default_to_empty_str(user_id))
 
+    def iter_changes(self, **options):
+        """Yield the stories of the Project added, changed or removed as it is
+        polled, see kaizen.watch.iter_changes for the options.
+        """
+        return iter_changes(self, **options)
+
 
 class PhaseRequest(ApiRequest):
     """Give access to the Phase entry point."""
 
+    __slots__ = ()
+
     @classmethod
     def from_project_request(cls, project_request, phase_id=None):
         """Create a PhaseRequest as a sub-resource of a ProjectRequest
@@ -162,9 +290,7 @@ class PhaseRequest(ApiRequest):
             phase_id: the id of the phase we want to access, or None to be able
             to list the Phases of the Project
         """
-        request = cls(project_request.get_api_key())
-        request = project_request.copy(request)
-        return request.update_url("/phases/%s" %
+        return project_request.cast(cls).update_url("/phases/%s" %
                                   _default_to_empty_str(phase_id))
 
     def update(self, name, description, index=None, limit=None):
@@ -202,12 +328,12 @@ class PhaseRequest(ApiRequest):
 class StoryRequest(ApiRequest):
     """Access the Story entry point"""
 
+    __slots__ = ()
+
     @classmethod
     def from_project_request(cls, project_request, story_id=None):
-        story_request = cls(project_request.get_api_key())
-        story_request = project_request.copy(story_request)
-        return story_request.update_url("/stories/%s"
-                                        % _default_to_empty_str(story_id))
+        return project_request.cast(cls).update_url(
+            "/stories/%s" % _default_to_empty_str(story_id))
 
     def update(self, text=None, phase_id=None, owner=None, color=None,
                details=None, size=None, priority=None, status=None,
@@ -229,10 +355,11 @@ class StoryRequest(ApiRequest):
             blocked_reason: the reason the story is blocked, if its status is
             set to 'blocked'
         """
-        self.add(text, phase_id, owner, color, details, size, priority)
+        request = self.add(text, phase_id, owner, color, details, size,
+                           priority)
         data = _remove_none_from_dict({"status": status,
                                        "blockedReason": blocked_reason})
-        return self.update_data(data).update_verb(VERBS.PUT)
+        return request.update_data(data).update_verb(VERBS.PUT)
 
     def move_to_phase(self, phase_id, owner=None):
         """Move the Story to a Phase, it can be assigned to a User.
@@ -0,0 +1,280 @@
+"""Cache responses of AgileZen API to avoid fetching unchanged resources."""
+from collections import OrderedDict
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+DEFAULT_MAX_SIZE = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 60
+DEFAULT_CACHE_DIRECTORY = "~/.kaizen/cache"
+
+# Move a file over another atomically, os.replace does not exist on Python 2
+# where os.rename replaces files on POSIX systems
+replace_file = getattr(os, "replace", os.rename)
+
+
+def _segments(url):
+    """Return the non empty segments of the given url path."""
+    return [segment for segment in url.split("/") if segment]
+
+
+def _is_related(url, other_url):
+    """Return True if one of the url is a parent resource of the other."""
+    segments, other_segments = _segments(url), _segments(other_url)
+    length = min(len(segments), len(other_segments))
+    return segments[:length] == other_segments[:length]
+
+
+def cache_key(verb, url, params):
+    """Return the key identifying a request in the cache.
+
+    Args:
+        verb: the HTTP verb of the request
+        url: the url of the resource
+        params: the query parameters of the request
+    """
+    return (verb, url, tuple(sorted((params or {}).items())))
+
+
+class ResponseCache(object):
+    """In-process cache of responses with time to live and LRU eviction.
+
+    Entries expire ttl seconds after being stored and the least recently used
+    entries are evicted once max_size entries, or max_bytes bytes of response
+    bodies, are cached.
+
+    Note:
+        the size of a response is the size of the body it was decoded from,
+        the decoded dict takes a few times more memory. Cached responses are
+        shared between callers and should not be mutated
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL,
+                 clock=time.time, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            max_size: max number of responses to keep
+            ttl: number of seconds a response is considered fresh
+            clock: function returning the current time in seconds
+            max_bytes: max total size of the responses kept, responses
+            larger than it are not cached
+        """
+        self._max_size = max_size
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the fresh response stored for key or None.
+
+        Args:
+            key: the key of the request as returned by cache_key
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            # Reinserted as the most recently used, there is no move_to_end
+            # on Python 2
+            self._entries[key] = self._entries.pop(key)
+            self.hits += 1
+            return entry[1]
+
+    def _remove(self, key):
+        """Drop the entry of key. Called locked."""
+        self._bytes -= self._entries.pop(key)[2]
+
+    def set(self, key, response, size=0):
+        """Store the response for key, evicting the least recently used
+        entries if the cache is full.
+
+        Args:
+            key: the key of the request as returned by cache_key
+            response: the response to cache
+            size: number of bytes of the body the response was decoded from
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self._max_bytes:
+                return
+            self._entries[key] = (self._clock() + self._ttl, response, size)
+            self._bytes += size
+            while len(self._entries) > self._max_size \
+                    or self._bytes > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, url):
+        """Drop every response of the resources affected by a change to url
+        i.e. the resource itself, its parents and its sub-resources within the
+        same top level resource.
+
+        Args:
+            url: the url of the resource that changed
+        """
+        scope = "/".join(_segments(url)[:2])
+        with self._lock:
+            for key in [key for key in self._entries
+                        if _is_related(key[1], scope)]:
+                self._remove(key)
+
+    def clear(self):
+        """Drop every cached response."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return the number of hits, misses and evictions along with the
+        number and total size of the responses cached.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "size": len(self._entries),
+                    "bytes": self._bytes}
+
+
+class DiskCache(object):
+    """On-disk cache of responses revalidated with the API.
+
+    Each response body is stored, along with its ETag and Last-Modified
+    validators, in a file sharded by the hash of the request key. Cached
+    responses are never considered fresh: their validators are sent as
+    conditional headers and the body is read back from disk when the API
+    answers 304 Not Modified.
+
+    Given a max_age, the responses not stored or read back for that long are
+    removed as new ones are stored, bounding the cache of requests that are
+    never repeated.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIRECTORY, max_age=None):
+        """
+        Args:
+            directory: the directory in which responses are stored, defaults
+            to '~/.kaizen/cache'
+            max_age: number of seconds an unused response is kept, None to
+            keep responses until the cache is cleared
+        """
+        self._directory = os.path.expanduser(directory)
+        self._max_age = max_age
+        self._pruned_at = time.time()
+
+    def _get_path(self, key):
+        """Return the path of the file holding the response for key."""
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self._directory, digest[:2], digest)
+
+    def validators(self, key):
+        """Return the conditional headers to revalidate the response for key,
+        empty if the response is not cached.
+
+        Args:
+            key: the key of the request as returned by cache_key
+        """
+        try:
+            with open(self._get_path(key), "rb") as cache_file:
+                metadata = json.loads(cache_file.readline().decode("utf-8"))
+        except (IOError, OSError, ValueError):
+            return {}
+        headers = {}
+        if metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+        return headers
+
+    def load(self, key):
+        """Return the response stored for key or None if it is not cached.
+
+        Args:
+            key: the key of the request as returned by cache_key
+        """
+        path = self._get_path(key)
+        try:
+            with open(path, "rb") as cache_file:
+                cache_file.readline()
+                response = json.load(io.TextIOWrapper(cache_file, "utf-8"))
+            # The modification time tells prune when it was last used
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            return None
+        return response
+
+    def store(self, key, headers, content):
+        """Store the raw response content for key if it can be revalidated.
+
+        Args:
+            key: the key of the request as returned by cache_key
+            headers: the headers of the response
+            content: the raw body of the response
+        """
+        metadata = {"etag": headers.get("ETag"),
+                    "last_modified": headers.get("Last-Modified")}
+        if not any(metadata.values()):
+            return
+        path = self._get_path(key)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+        # Write to a temporary file first so readers never see partial files
+        (handle, tmp_path) = tempfile.mkstemp(dir=directory)
+        with os.fdopen(handle, "wb") as cache_file:
+            cache_file.write(json.dumps(metadata).encode("utf-8"))
+            cache_file.write(b"\n")
+            cache_file.write(content)
+        replace_file(tmp_path, path)
+        if self._max_age is not None \
+                and time.time() - self._pruned_at >= self._max_age:
+            self.prune()
+
+    def prune(self, max_age=None):
+        """Remove the responses not stored or read back for max_age seconds.
+
+        Args:
+            max_age: number of seconds, defaults to the max_age of the cache
+
+        Returns:
+            the number of responses removed
+        """
+        max_age = self._max_age if max_age is None else max_age
+        self._pruned_at = time.time()
+        oldest = self._pruned_at - max_age
+        removed = 0
+        for (directory, _, names) in os.walk(self._directory):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) < oldest:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    # Replaced or removed concurrently
+                    pass
+        return removed
+
+    def clear(self):
+        """Drop every cached response."""
+        shutil.rmtree(self._directory, ignore_errors=True)
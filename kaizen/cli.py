@@ -1,29 +1,91 @@
-from kaizen.api import ZenRequest
+"""Command line interface of kaizen.
+
+It is run for every shell command so only what is needed to build the parsers
+is imported at startup: requests, yaml and the rest of kaizen are imported by
+the commands using them.
+"""
 from parse_this import parse_class, create_parser, Self
-from pprint import pprint
-from yaml.error import YAMLError
+import json
 import os
-import yaml
+import threading
+
+DEFAULT_CONFIG_PATH = "~/.kaizen.yaml"
+DEFAULT_CONFIG_CACHE = "~/.kaizen/config-cache.json"
+CONFIG_CACHE_ENV_VARIABLE = "KAIZEN_CONFIG_CACHE"
 
 
 class KaizenConfigError(Exception):
     """Used when a configuration error occurs."""
 
 
-def get_config(config_path):
+def _load_config_cache(cache_path):
+    try:
+        with open(cache_path, "r") as cache_file:
+            return json.load(cache_file)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _store_config_cache(cache_path, cache):
+    import tempfile
+    from kaizen.cache import replace_file
+    directory = os.path.dirname(cache_path)
+    try:
+        os.makedirs(directory)
+    except OSError:
+        if not os.path.isdir(directory):
+            return
+    try:
+        (handle, tmp_path) = tempfile.mkstemp(dir=directory)
+        with os.fdopen(handle, "w") as cache_file:
+            json.dump(cache, cache_file)
+        replace_file(tmp_path, cache_path)
+    except (IOError, OSError, TypeError, ValueError):
+        # The config could not be serialized, it will be parsed next time
+        pass
+
+
+def get_config(config_path, cache_path=None):
     """Returns the configuration dict.
 
+    The parsed configuration is cached in JSON, keyed on the path, size and
+    modification time of the yaml file, so yaml is only imported and run when
+    the file changes.
+
     Args:
         config_path: full path to the yaml config file
+        cache_path: path of the JSON cache, defaults to the one in the
+        KAIZEN_CONFIG_CACHE environment variable or
+        '~/.kaizen/config-cache.json'. An empty string disables caching
     """
+    try:
+        stat = os.stat(config_path)
+    except (IOError, OSError):
+        raise KaizenConfigError("'%s' does not exist." % config_path)
+    key = os.path.abspath(config_path)
+    signature = [stat.st_mtime, stat.st_size]
+    if cache_path is None:
+        cache_path = os.environ.get(CONFIG_CACHE_ENV_VARIABLE,
+                                    DEFAULT_CONFIG_CACHE)
+    if cache_path:
+        cache_path = os.path.expanduser(cache_path)
+        cache = _load_config_cache(cache_path)
+        entry = cache.get(key)
+        if entry and entry.get("signature") == signature:
+            return entry["config"]
+    import yaml
     try:
         with open(config_path, "r") as config_file:
-            return yaml.load(config_file)
+            config = yaml.load(config_file)
     except IOError:
         raise KaizenConfigError("'%s' does not exist." % config_path)
-    except YAMLError:
+    except yaml.YAMLError:
         raise KaizenConfigError("'%s' is not a well formatted yaml file."
                                 % config_path)
+    if cache_path:
+        cache[key] = {"signature": signature, "config": config}
+        _store_config_cache(cache_path, cache)
+    return config
 
 
 @parse_class()
@@ -37,19 +99,99 @@ class ZenApi(object):
             config_path: full path to the config file, by default
             '~/.kaizen.yaml' is used
         """
-        config_path = config_path or os.path.expanduser("~/.kaizen.yaml")
+        config_path = config_path or os.path.expanduser(DEFAULT_CONFIG_PATH)
         self._config = get_config(config_path)
-        self._zen_request = ZenRequest(self._config["api_key"])
+        self._zen_request_instance = None
+        # The daemon runs commands on concurrent threads
+        self._zen_request_lock = threading.Lock()
+        self._mirror = None
+        self._cache = None
+        self._phase_indexes = None
+
+    def _create_client(self, **options):
+        """Return an ApiClient of the configured api key, url, transport and
+        timeout.
+
+        Args:
+            options: other arguments of ApiClient
+        """
+        from kaizen.client import DEFAULT_TIMEOUT, ApiClient
+        return ApiClient(self._config["api_key"],
+                         api_url=self._config.get("api_url",
+                                                  ApiClient.API_URL),
+                         transport=self._config.get("transport"),
+                         timeout=self._config.get("timeout", DEFAULT_TIMEOUT),
+                         **options)
+
+    @property
+    def _zen_request(self):
+        """The ZenRequest of the configured api key, created on first use so
+        commands not calling the API don't import requests.
+
+        With a 'deadline' in the config, each access returns a request with a
+        new deadline so every command gets the whole budget.
+        """
+        if self._zen_request_instance is None:
+            with self._zen_request_lock:
+                if self._zen_request_instance is None:
+                    self._zen_request_instance = self._create_zen_request()
+        if self._config.get("deadline"):
+            return self._zen_request_instance.with_deadline(
+                self._config["deadline"])
+        return self._zen_request_instance
 
-    @create_parser(Self)
-    def list_projects(self, phases=False, members=False, metrics=False):
+    def _create_zen_request(self):
+        from kaizen.api import ZenRequest
+        from kaizen.coalesce import RequestCoalescer
+        from kaizen.hedge import HedgePolicy
+        from kaizen.phases import DEFAULT_PHASE_INDEX_TTL, PhaseIndexCache
+        self._phase_indexes = PhaseIndexCache(self._config.get(
+            "phase_index_ttl", DEFAULT_PHASE_INDEX_TTL))
+        hedge = HedgePolicy() if self._config.get("hedge") else None
+        client = self._create_client(cache=self._cache,
+                                     hooks=[self._phase_indexes],
+                                     coalescer=RequestCoalescer(),
+                                     hedge=hedge)
+        return ZenRequest(self._config["api_key"], client)
+
+    def _get_mirror(self):
+        if self._mirror is None:
+            from kaizen.mirror import DEFAULT_MIRROR_PATH, Mirror
+            self._mirror = Mirror(self._config.get("mirror_path",
+                                                   DEFAULT_MIRROR_PATH))
+        return self._mirror
+
+    @create_parser(Self, int, bool, int)
+    def sync(self, project_id=None, full=False, workers=1):
+        """Mirror the Project into the local database used by --offline.
+
+        Only the Stories updated since the previous sync are fetched.
+
+        Args:
+            project_id: id of the Project to mirror, defaults to every Project
+            full: reload every Story of the Project
+            workers: number of pages fetched in parallel
+        """
+        project_ids = [project_id] if project_id else None
+        return self._get_mirror().sync(self._zen_request, project_ids, full,
+                                       workers=workers)
+
+    @create_parser(Self, bool, bool, bool, bool, bool)
+    def list_projects(self, phases=False, members=False, metrics=False,
+                      records=False, offline=False):
         """List all Projects you have access to.
 
         Args:
             phase: add the phases to the Project object
             members: add the members to the Project object
             metrics: add the metrics to the Project object
+            records: return compact Project records instead of dicts
+            offline: answer from the local mirror, metrics are not available
         """
+        if offline:
+            from kaizen.records import Project, to_records
+            response = self._get_mirror().list_projects(phases, members)
+            return to_records(response, Project) if records else response
         request = self._zen_request.projects()
         enrichments = [name for name, value in
                        [("phases", phases), ("members", members),
@@ -57,11 +199,11 @@ class ZenApi(object):
                        if value]
         if enrichments:
             request = request.with_enrichments(*enrichments)
-        return request.send()
+        return request.send(records)
 
-    @create_parser(Self, int, bool, bool, int, int)
+    @create_parser(Self, int, bool, bool, int, int, bool, bool)
     def list_stories(self, project_id=None, tasks=False, tags=False, page=1,
-                     size=100):
+                     size=100, records=False, offline=False):
         """List stories in the Project specified by the given id.
 
         Args:
@@ -70,17 +212,25 @@ class ZenApi(object):
             tags: should the tags be included in the stories
             page: page number to display, defaults to the first page
             size: max number of stories to return, defaults to 100
+            records: return compact Story records instead of dicts
+            offline: answer from the local mirror
         """
         project_id = project_id or self._config["project_id"]
+        if offline:
+            from kaizen.records import Story, to_records
+            response = self._get_mirror().list_stories(
+                project_id, tasks=tasks, tags=tags, page=page, size=size)
+            return to_records(response, Story) if records else response
         request = self._zen_request.projects(project_id).stories()
         enrichments = [name for name, value in
                        [("tasks", tasks), ("tags", tags)] if value]
         if enrichments:
             request = request.with_enrichments(*enrichments)
-        return request.paginate(page, size).send()
+        return request.paginate(page, size).send(records)
 
-    @create_parser(Self, int)
-    def list_phases(self, project_id=None, stories=False, page=1, size=100):
+    @create_parser(Self, int, bool, int, int, bool, bool)
+    def list_phases(self, project_id=None, stories=False, page=1, size=100,
+                    records=False, offline=False):
         """List phases in the Project specified by the given id.
 
         Args:
@@ -88,12 +238,83 @@ class ZenApi(object):
             stories: should the stories be included in the phases
             page: page number to display, defaults to the first page
             size: max number of stories to return, defaults to 100
+            records: return compact Phase records instead of dicts
+            offline: answer from the local mirror
         """
         project_id = project_id or self._config["project_id"]
+        if offline:
+            from kaizen.records import Phase, to_records
+            response = self._get_mirror().list_phases(project_id, stories,
+                                                      page, size)
+            return to_records(response, Phase) if records else response
         request = self._zen_request.projects(project_id).phases()
         if stories:
             request = request.with_enrichments("stories")
-        return request.paginate(page, size).send()
+        return request.paginate(page, size).send(records)
+
+    def _fan_out(self, resource, project_ids, **options):
+        project_ids = [int(project_id) for project_id
+                       in (project_ids or "").split(",") if project_id.strip()]
+        return list(self._zen_request.fan_out(resource, project_ids or None,
+                                              **options))
+
+    @create_parser(Self, str, bool, bool, str, str, bool, int,
+                   name="list-all-stories")
+    def list_stories_across_projects(self, project_ids=None, tasks=False,
+                                     tags=False, where=None, sort=None,
+                                     reverse=False, workers=8):
+        """List the Stories of many Projects, queried concurrently, each
+        Story being tagged with its Project.
+
+        Args:
+            project_ids: comma separated ids of the Projects, defaults to
+            every Project you have access to
+            tasks: should the tasks be included in the stories
+            tags: should the tags be included in the stories
+            where: filter selecting the Stories e.g. 'status:blocked'
+            sort: field the Stories are ordered by e.g. 'phase.name'
+            reverse: sort in descending order
+            workers: max number of Projects queried at once
+        """
+        enrichments = [name for name, value in
+                       [("tasks", tasks), ("tags", tags)] if value]
+        return self._fan_out("stories", project_ids, where=where,
+                             enrichments=enrichments, sort=sort,
+                             reverse=reverse, workers=workers)
+
+    @create_parser(Self, str, bool, str, bool, int, name="list-all-phases")
+    def list_phases_across_projects(self, project_ids=None, stories=False,
+                                    sort=None, reverse=False, workers=8):
+        """List the Phases of many Projects, queried concurrently, each Phase
+        being tagged with its Project.
+
+        Args:
+            project_ids: comma separated ids of the Projects, defaults to
+            every Project you have access to
+            stories: should the stories be included in the phases
+            sort: field the Phases are ordered by e.g. 'name'
+            reverse: sort in descending order
+            workers: max number of Projects queried at once
+        """
+        enrichments = ["stories"] if stories else []
+        return self._fan_out("phases", project_ids, enrichments=enrichments,
+                             sort=sort, reverse=reverse, workers=workers)
+
+    @create_parser(Self, str, str, bool, int, name="list-all-members")
+    def list_members_across_projects(self, project_ids=None, sort=None,
+                                     reverse=False, workers=8):
+        """List the members of many Projects, queried concurrently, each
+        member being tagged with its Project.
+
+        Args:
+            project_ids: comma separated ids of the Projects, defaults to
+            every Project you have access to
+            sort: field the members are ordered by e.g. 'userName'
+            reverse: sort in descending order
+            workers: max number of Projects queried at once
+        """
+        return self._fan_out("members", project_ids, sort=sort,
+                             reverse=reverse, workers=workers)
 
     @create_parser(Self, int, str, str, int, int)
     def add_phase(self, name, description, project_id=None, index=None,
@@ -111,16 +332,15 @@ class ZenApi(object):
         return self._zen_request.projects(project_id).phases()\
                    .add(name, description, index, limit).send()
 
-    def _get_next_phase_id(self, phase_name, project_id):
-        # We can assume we won't need to paginate and go over more than 100 Phases
-        phases = self.list_phases(project_id)["items"]
-        if phases[-1]["name"] == phase_name:
-            raise ValueError("Story is already in the last phase '%s'"
-                             % phase_name)
-        for (idx, phase) in enumerate(phases):
-            if phase["name"] == phase_name:
-                return phases[idx + 1]["id"]
-        raise ValueError("Unknown phase '%s'" % phase_name)
+    def _get_next_phase_id(self, phase_name, project_id, project_request=None):
+        project_request = project_request or \
+            self._zen_request.projects(project_id)
+        index = self._phase_indexes.get(project_request, int(project_id))
+        if phase_name not in index:
+            # The phase may have been added since the index was built
+            index = self._phase_indexes.get(project_request, int(project_id),
+                                            refresh=True)
+        return index.next_phase_id(phase_name)
 
     @create_parser(Self, int, int, name="bump-phase")
     def move_story_to_next_phase(self, story_id, project_id=None):
@@ -136,15 +356,126 @@ class ZenApi(object):
         story = story_request.send()
         try:
             phase_id = self._get_next_phase_id(story["phase"]["name"],
-                                               project_id)
+                                               project_id, request)
         except ValueError as error:
-            return error.message
+            return str(error)
         return story_request.update(phase_id=phase_id).send()
 
+    @create_parser(Self, str, int, str, int, name="bulk-bump-phase")
+    def move_stories_to_next_phase(self, story_ids=None, project_id=None,
+                                   where=None, workers=10):
+        """Move many Stories to their next Phase concurrently.
+
+        Args:
+            story_ids: comma separated ids of the Stories to move
+            project_id: id of the Project
+            where: filter selecting the Stories to move e.g. 'phase:Ready'
+            workers: max number of requests sent at once
+        """
+        from kaizen.phases import bump_stories
+        project_id = project_id or self._config["project_id"]
+        story_ids = [int(story_id) for story_id
+                     in (story_ids or "").split(",") if story_id.strip()]
+        project_request = self._zen_request.projects(project_id)
+        index = self._phase_indexes.get(project_request, int(project_id))
+        return bump_stories(project_request, index, story_ids, where,
+                            workers)
+
+    @create_parser(Self, int, int, int)
+    def stats(self, project_id=None, workers=4, size=100):
+        """Count Stories per user, Phase and status along with their sizes,
+        priorities, ages and tasks, going through every Story of the Project.
+
+        Args:
+            project_id: id of the Project
+            workers: number of pages fetched in parallel
+            size: number of Stories fetched per request
+        """
+        from kaizen.stats import project_stats
+        project_id = project_id or self._config["project_id"]
+        return project_stats(self._zen_request.projects(project_id), size,
+                             workers).to_dict()
+
+    @create_parser(Self, str, str, str, bool, int, int, bool)
+    def export(self, path, project_ids=None, format="jsonl", gzip=False,
+               workers=4, size=100, restart=False):
+        """Export every Story, with its tasks, tags and Phase, to a file.
+
+        An interrupted export is resumed from its last page written.
+
+        Args:
+            path: the file to write, '-' for the standard output
+            project_ids: comma separated ids of the Projects to export
+            format: one of 'jsonl', 'csv' or 'columnar'
+            gzip: compress the file with gzip
+            workers: number of pages fetched in parallel
+            size: number of Stories fetched per request
+            restart: overwrite an interrupted export instead of resuming it
+        """
+        from kaizen.export import export_stories
+        project_ids = [int(project_id) for project_id
+                       in (project_ids or "").split(",") if project_id.strip()]
+        project_ids = project_ids or [self._config["project_id"]]
+        return export_stories(self._zen_request, project_ids, path, format,
+                              gzip, size, workers, not restart)
+
+    @create_parser(Self, int, int, int, bool)
+    def watch(self, project_id=None, min_interval=5, max_interval=300,
+              initial=False):
+        """Print the Stories added, changed or removed as they happen, one
+        JSON line per change. Polling speeds up while the Project changes and
+        polls are conditional requests, revalidating the responses stored in
+        '~/.kaizen/watch-cache'.
+
+        Args:
+            project_id: id of the Project to watch
+            min_interval: min number of seconds between two polls
+            max_interval: max number of seconds between two polls
+            initial: print every Story of the Project first
+        """
+        import sys
+        from kaizen.api import ZenRequest
+        from kaizen.cache import DiskCache
+        from kaizen.watch import WATCH_CACHE_DIRECTORY
+        project_id = project_id or self._config["project_id"]
+        # Responses still polled are read back at least every max_interval,
+        # the others are dropped. Watching never ends, it is not bound by the
+        # configured deadline
+        disk_cache = DiskCache(WATCH_CACHE_DIRECTORY,
+                               max_age=2 * max_interval)
+        client = self._create_client(disk_cache=disk_cache)
+        project_request = ZenRequest(self._config["api_key"], client)\
+            .projects(project_id)
+        changes = project_request.iter_changes(
+            min_interval=min_interval, max_interval=max_interval,
+            initial=initial)
+        for change in changes:
+            sys.stdout.write(json.dumps(change.to_dict()) + "\n")
+            sys.stdout.flush()
+
+    @create_parser(Self, str, int, bool)
+    def daemon(self, socket_path=None, cache_ttl=30, stop=False):
+        """Serve the commands of the cli from this process on a Unix socket,
+        keeping connections and responses warm between commands.
+
+        Args:
+            socket_path: path of the socket, defaults to '~/.kaizen/daemon.sock'
+            cache_ttl: number of seconds GET responses are cached
+            stop: stop the daemon listening on the socket instead
+        """
+        from kaizen.daemon import ZenDaemon, stop as stop_daemon
+        if stop:
+            stop_daemon(socket_path)
+            return "Daemon stopped"
+        from kaizen.cache import ResponseCache
+        self._cache = ResponseCache(ttl=cache_ttl)
+        self._zen_request_instance = None
+        ZenDaemon(self, socket_path).serve_forever()
+        return "Daemon stopped"
+
     # TODO: Possible methods to implement include:
     #  - pop_next: pop the top Story of the "todo" phase and move it to
     #    "working" assigning it to the user
-    #  - stats: list # of Story per user - also grouped by status/phase
     #  - todo: list Story in the "todo" phase
     #  - done: move Story to the "done" phase
     # For those methods the concept of configuration should be introduced. It
@@ -152,7 +483,32 @@ class ZenApi(object):
     # api key, etc...
 
 
+def _should_forward(argv):
+    """Return True if the command line can be run by the daemon: it uses the
+    daemon's config, does not manage the daemon itself, returns and does not
+    write files relative to the current directory.
+    """
+    options = set(arg.split("=")[0] for arg in argv)
+    return not options & set(["daemon", "watch", "export", "--config_path",
+                              "--config-path", "-h", "--help"])
+
+
 def run_cli():
+    from pprint import pprint
+    import socket
+    import sys
+    argv = sys.argv[1:]
+    if _should_forward(argv):
+        from kaizen.daemon import DaemonError, InvalidArguments, forward
+        try:
+            return pprint(forward(argv))
+        except (socket.error, InvalidArguments):
+            # No daemon is running, or argparse has to explain what is wrong
+            # with the arguments: run the command in this process
+            pass
+        except DaemonError as error:
+            sys.stderr.write("kaizen: error: %s\n" % error)
+            sys.exit(1)
     pprint(ZenApi.parser.call())
 
 
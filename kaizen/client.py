@@ -1,8 +1,20 @@
 """This module deals with HTTP related concerns regarding AgileZen API."""
-import json
 import logging
 import requests
+import threading
+import time
+import weakref
 
+from kaizen.cache import cache_key
+from kaizen.codec import STREAM_CHUNK_SIZE, ItemStream, get_codec
+from kaizen.deadline import DeadlineExceeded
+from kaizen.metrics import RequestEvent
+from kaizen.request import VERBS
+from kaizen.retry import get_rate_limiter
+from kaizen.transport import (DEFAULT_POOL_SIZE, DEFAULT_TRANSPORT, Transport,
+                              close_transports, get_transport)
+
+DEFAULT_TIMEOUT = 30
 _LOG = logging.getLogger(__name__)
 # requests logs a line every time a new connection is established
 logging.getLogger("requests").setLevel(logging.ERROR)
@@ -13,17 +25,131 @@ def default_dict(obj):
     return obj or {}
 
 
+def get_session(api_key, pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
+    """Return the requests.Session shared by every client using the same api key
+    and pool options, creating it on first use.
+
+    Reusing a single Session means connections to AgileZen are pooled and kept
+    alive instead of paying a new TCP+TLS handshake for every request.
+
+    Args:
+        api_key: the AgileZen api key
+        pool_size: max number of connections kept in the pool
+        keep_alive: whether connections should be reused between requests
+    """
+    return get_transport("requests", api_key, pool_size, keep_alive).session
+
+
+def close_sessions():
+    """Close every shared Session and release their pooled connections."""
+    close_transports()
+
+
+# Clients are forgotten once unused, options are often built per call
+_CLIENTS = weakref.WeakValueDictionary()
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _hashable(value):
+    """Return value as a hashable, lists being turned into tuples."""
+    return tuple(value) if isinstance(value, list) else value
+
+
+def get_client(api_key, pool_size=DEFAULT_POOL_SIZE, **options):
+    """Return the ApiClient shared by every request using the same api key
+    and options, creating it on first use.
+
+    Requests built without a client use the one returned for their api key,
+    so its connections, cache, rate limiter and hooks are shared process-wide
+    instead of a client being built for every request. A client is kept while
+    something, such as a request, references it. The pooled connections and
+    the rate limiter of its api key outlive it.
+
+    Args:
+        api_key: the AgileZen api key
+        pool_size: max number of connections kept in the pool
+        options: other keyword arguments of ApiClient, objects such as caches
+        or hooks are compared by identity
+    """
+    key = (api_key, pool_size, tuple(sorted(
+        (name, _hashable(value)) for (name, value) in options.items())))
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = _CLIENTS[key] = ApiClient(api_key, pool_size, **options)
+        return client
+
+
+def clear_clients():
+    """Forget every shared ApiClient, new ones are created on next use."""
+    with _CLIENTS_LOCK:
+        _CLIENTS.clear()
+
+
 class ApiClient(object):
     """Ease making calls to AgileZen API."""
 
     API_URL = "https://agilezen.com/api/v1"
 
-    def __init__(self, api_key):
+    def __init__(self, api_key, pool_size=DEFAULT_POOL_SIZE, keep_alive=True,
+                 cache=None, disk_cache=None, retry=None, rate_limit=None,
+                 api_url=API_URL, hooks=None, codec=None, coalescer=None,
+                 transport=None, timeout=DEFAULT_TIMEOUT, hedge=None):
         """
         Args:
             api_key: the AgileZen api key
+            pool_size: max number of connections kept in the pool
+            keep_alive: whether connections should be reused between requests
+            cache: a ResponseCache in which GET responses are kept, cached
+            responses are invalidated by any other request to the same
+            resource. Responses are not cached by default
+            disk_cache: a DiskCache in which GET responses are stored and
+            revalidated with conditional requests
+            retry: the RetryPolicy used when a request fails, requests are not
+            retried by default
+            rate_limit: max number of requests per second sent with api_key,
+            shared by every client using the same api key
+            api_url: root url of the API, defaults to AgileZen API
+            hooks: list of RequestHooks called for every HTTP request sent,
+            e.g. a MetricsCollector
+            codec: the codec used to encode and decode JSON, defaults to the
+            fastest one installed, see kaizen.codec
+            coalescer: a RequestCoalescer sharing one HTTP call between
+            concurrent identical GET requests, only share it between clients
+            using the same api key
+            transport: the Transport sending the HTTP requests or the name of
+            one of kaizen.transport.TRANSPORTS, defaults to 'requests'
+            timeout: max number of seconds to wait for the API to accept a
+            connection or to send data, None to wait forever. Requests with a
+            deadline wait at most until it passes, see kaizen.deadline
+            hedge: a HedgePolicy sending a second copy of slow GET requests,
+            requests are not hedged by default
         """
         self._api_key = api_key
+        self._api_url = api_url
+        if not isinstance(transport, Transport):
+            transport = get_transport(transport or DEFAULT_TRANSPORT, api_key,
+                                      pool_size, keep_alive)
+        self._transport = transport
+        self._cache = cache
+        self._disk_cache = disk_cache
+        self._retry = retry
+        self._rate_limiter = None
+        if rate_limit:
+            self._rate_limiter = get_rate_limiter(api_key, rate_limit)
+        self._hooks = list(hooks or [])
+        self._codec = codec or get_codec()
+        self._coalescer = coalescer
+        self._timeout = timeout
+        self._hedge = hedge
+
+    def add_hook(self, hook):
+        """Call the given RequestHooks for every HTTP request sent."""
+        self._hooks.append(hook)
+
+    def _call_hooks(self, name, event):
+        for hook in self._hooks:
+            getattr(hook, name)(event)
 
     def send_request(self, request, headers=None):
         """Send a HTTP request, from which url, verb, params and data are taken
@@ -38,17 +164,192 @@ class ApiClient(object):
         Raises:
             a requests.HTTPError if the status code is not OK
         """
+        if self._cache is None and self._coalescer is None:
+            return self._send_request(request, headers)[0]
+        if request.verb != VERBS.GET:
+            response = self._send_request(request, headers)[0]
+            if self._cache is not None:
+                self._cache.invalidate(request.url)
+            return response
+        key = cache_key(request.verb, request.url, request.params)
+        if self._cache is not None:
+            response = self._cache.get(key)
+            if response is not None:
+                return response
+        if self._coalescer is None:
+            (response, size) = self._send_request(request, headers)
+        else:
+            (response, size) = self._coalescer.do(
+                (key, tuple(sorted(default_dict(headers).items()))),
+                lambda: self._send_request(request, headers),
+                getattr(request, "deadline", None))
+        if self._cache is not None:
+            self._cache.set(key, response, size)
+        return response
+
+    def _send_request(self, request, headers=None):
+        """Actually send the request to the API, see send_request.
+
+        Returns:
+            the decoded response and the size of the body it was decoded from
+        """
+        event = RequestEvent(request.verb, request.url)
+        self._call_hooks("before_send", event)
+        try:
+            (response, size) = self._fetch(request, default_dict(headers),
+                                           event)
+        except Exception as error:
+            event.error = error
+            self._call_hooks("on_error", event)
+            raise
+        self._call_hooks("after_response", event)
+        return (response, size)
+
+    def _fetch(self, request, headers, event):
+        """Return the decoded response to the request, revalidating it with the
+        disk cache if there is one, and the size of the body it was decoded
+        from.
+        """
+        if self._disk_cache is None or request.verb != VERBS.GET:
+            return self._decode(self._http_request(request, headers, event),
+                                event)
+        key = cache_key(request.verb, request.url, request.params)
+        conditional_headers = dict(headers)
+        conditional_headers.update(self._disk_cache.validators(key))
+        response = self._http_request(request, conditional_headers, event)
+        if response.status_code == requests.codes.not_modified:
+            start = time.time()
+            cached_response = self._disk_cache.load(key)
+            event.decode = time.time() - start
+            if cached_response is not None:
+                # The body was read from disk, only measure it to cache it
+                size = 0 if self._cache is None \
+                    else len(self._codec.dumps(cached_response))
+                return (cached_response, size)
+            # The cached response vanished since its validators were read
+            response = self._http_request(request, headers, event)
+        self._disk_cache.store(key, response.headers, response.content)
+        return self._decode(response, event)
+
+    def _decode(self, response, event):
+        """Return the dict loaded from the json response and its size."""
+        start = time.time()
+        decoded_response = self._codec.loads(response.content)
+        event.decode = time.time() - start
+        return (decoded_response, len(response.content))
+
+    def stream_items(self, request, headers=None,
+                     chunk_size=STREAM_CHUNK_SIZE):
+        """Send a HTTP request listing entities and decode the entities of the
+        response as it is received.
+
+        Args:
+            request: the request to send
+            headers: headers to send
+            chunk_size: number of bytes read from the response at once
+
+        Returns:
+            an ItemStream over the entities of the response, pagination
+            information being in its metadata
+
+        Raises:
+            a requests.HTTPError if the status code is not OK
+        """
+        event = RequestEvent(request.verb, request.url)
+        self._call_hooks("before_send", event)
+        try:
+            response = self._http_request(request, default_dict(headers),
+                                          event, stream=True)
+        except Exception as error:
+            event.error = error
+            self._call_hooks("on_error", event)
+            raise
+        self._call_hooks("after_response", event)
+        return ItemStream(response.iter_content(chunk_size),
+                          close=response.close)
+
+    def _http_request(self, request, headers, event, stream=False):
+        """Issue the HTTP request and return the requests.Response.
+
+        Args:
+            request: the request to send
+            headers: headers to send
+            event: the RequestEvent describing the request
+            stream: if True the body of the response is not read
+
+        Raises:
+            a requests.HTTPError if the status code is not OK
+            a DeadlineExceeded if the deadline of the request passed
+        """
         url = self._get_url(request.url)
-        headers = default_dict(headers)
-        data = json.dumps(default_dict(request.data))
+        data = self._codec.dumps(default_dict(request.data))
         params = default_dict(request.params)
-        response = requests.request(request.verb, url, params=params,
-                                    data=data,
-                                    headers=self._get_headers(headers))
-        response.raise_for_status()
+        headers = self._get_headers(headers)
+        event.bytes_out += len(data)
+        start = time.time()
+        attempt = 0
+        deadline = getattr(request, "deadline", None)
+
+        def acquire():
+            """Wait for the rate limiter, at most until the deadline."""
+            if deadline is None:
+                if self._rate_limiter is not None:
+                    self._rate_limiter.acquire()
+                return
+            # Raises once the deadline passed
+            timeout = deadline.timeout()
+            if self._rate_limiter is not None \
+                    and not self._rate_limiter.acquire(timeout):
+                raise DeadlineExceeded("Deadline exceeded waiting for the "
+                                       "rate limiter")
+
+        def send():
+            """Send the request with the time left when it starts, a hedge
+            starts after the first attempt.
+            """
+            timeout = self._timeout if deadline is None \
+                else deadline.timeout(self._timeout)
+            return self._transport.request(request.verb, url, params, data,
+                                           headers, stream=stream,
+                                           timeout=timeout)
+        while True:
+            acquire()
+            event.attempts += 1
+            try:
+                if self._hedge is not None and not stream \
+                        and request.verb == VERBS.GET:
+                    response = self._hedge.call(
+                        send, acquire=acquire,
+                        discard=requests.Response.close)
+                else:
+                    response = send()
+                event.status = response.status_code
+                if not stream:
+                    event.bytes_in += len(response.content)
+                event.ttfb = response.elapsed.total_seconds()
+                response.raise_for_status()
+                break
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.HTTPError) as error:
+                if stream and error.response is not None:
+                    error.response.close()
+                if self._retry is None or not self._retry.should_retry(
+                        request.verb, attempt, error.response):
+                    event.total = time.time() - start
+                    raise
+                delay = self._retry.get_delay(attempt, error.response)
+                if deadline is not None and delay >= deadline.remaining():
+                    # The deadline would pass before the retry is sent
+                    event.total = time.time() - start
+                    raise
+                _LOG.debug("retrying request to '%s' in %s s: %s", url, delay,
+                           error)
+                self._retry.sleep(delay)
+                attempt += 1
+        event.total = time.time() - start
         _LOG.debug("request issued to '%s' [%s s]", url,
                    response.elapsed.total_seconds())
-        return response.json()
+        return response
 
     def _get_url(self, resource_path):
         """Return the full URL to an API resource
@@ -57,7 +358,7 @@ class ApiClient(object):
             resource_path: path to the resource from the API root
         """
         resource_path = "/%s" % resource_path.lstrip("/")
-        return "%s%s" % (self.__class__.API_URL, resource_path)
+        return "%s%s" % (self._api_url, resource_path)
 
     def _get_headers(self, headers):
         """Return the given headers update with headers required by the API.
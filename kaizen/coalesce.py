@@ -0,0 +1,91 @@
+"""Share one in-flight call between concurrent identical requests.
+
+When a GET is already being sent, the threads sending the same GET wait for
+its response instead of sending their own:
+
+    coalescer = RequestCoalescer()
+    client = ApiClient(api_key, coalescer=coalescer)
+    ...
+    coalescer.saved  # number of HTTP calls avoided
+"""
+import threading
+
+from kaizen.deadline import DeadlineExceeded
+
+
+class _Call(object):
+    """A call in flight and, once it is done, its result or error."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer(object):
+    """Run a single call at a time per key, concurrent callers with the same
+    key receiving the result, or the error, of the call in flight.
+
+    It is thread-safe. Responses are shared, not copied, callers must not
+    mutate them.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.saved = 0
+
+    def do(self, key, function, deadline=None):
+        """Return the result of function(), or of the call in flight for key.
+
+        Args:
+            key: hashable identifying the call e.g. as returned by cache_key
+            function: the function making the call
+            deadline: the Deadline of the caller, bounding how long it waits
+            for the call in flight
+
+        Raises:
+            the exception raised by the call
+            DeadlineExceeded if the deadline passed while waiting for the call
+            in flight
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.saved += 1
+        if not leader:
+            if deadline is None:
+                call.done.wait()
+            elif not call.done.wait(deadline.remaining()):
+                raise DeadlineExceeded("Deadline exceeded")
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """Return the number of calls made and of calls saved."""
+        with self._lock:
+            return {"calls": self.calls, "saved": self.saved}
+
+    def reset(self):
+        """Reset the counters."""
+        with self._lock:
+            self.calls = 0
+            self.saved = 0
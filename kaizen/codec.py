@@ -0,0 +1,196 @@
+"""Encode and decode the JSON exchanged with AgileZen API.
+
+The fastest JSON library installed is used: orjson, then ujson, falling back
+on the standard json module.
+
+Large list responses can also be decoded incrementally with ItemStream, which
+yields the entities of the 'items' array as the response is received instead
+of decoding the whole document at once.
+"""
+import codecs
+import json
+import re
+
+STREAM_CHUNK_SIZE = 64 * 1024
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Characters a JSON number may go on with, the empty string for its end
+_NUMBER_PARTS = ".eE+-0123456789"
+
+
+class JsonCodec(object):
+    """Codec using the standard json module."""
+
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+    def loads(self, data):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        return json.loads(data)
+
+
+class OrjsonCodec(object):
+    """Codec using orjson, raises ImportError if it is not installed."""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self.dumps = orjson.dumps
+        self.loads = orjson.loads
+
+
+class UjsonCodec(object):
+    """Codec using ujson, raises ImportError if it is not installed."""
+
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+        self.dumps = ujson.dumps
+        self.loads = ujson.loads
+
+
+# Codecs by order of preference
+CODECS = [OrjsonCodec, UjsonCodec, JsonCodec]
+
+
+def get_codec(name=None):
+    """Return the codec with the given name or the fastest one installed.
+
+    Args:
+        name: one of 'orjson', 'ujson' or 'json', None to pick the fastest
+
+    Raises:
+        ValueError if the codec is unknown
+        ImportError if the library of the codec is not installed
+    """
+    if name is not None:
+        for codec_class in CODECS:
+            if codec_class.name == name:
+                return codec_class()
+        raise ValueError("Unknown JSON codec '%s'" % name)
+    for codec_class in CODECS:
+        try:
+            return codec_class()
+        except ImportError:
+            continue
+
+
+class ItemStream(object):
+    """Iterate over the entities of the 'items' array of a JSON document read
+    from an iterable of byte chunks, decoding one entity at a time.
+
+    The other top level keys of the document, e.g. pagination information,
+    are available in metadata once they have been read. Only the part of the
+    document not yet decoded is held in memory.
+    """
+
+    def __init__(self, chunks, items_key="items", close=None):
+        """
+        Args:
+            chunks: iterable of bytes making up the JSON document
+            items_key: the top level key of the array to stream
+            close: function called once the document has been read
+        """
+        self._chunks = iter(chunks)
+        self._items_key = items_key
+        self._close = close
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._exhausted = False
+        self.metadata = {}
+
+    def _fill(self):
+        """Append the next chunk to the buffer, return False if the document
+        has been read entirely.
+        """
+        if self._exhausted:
+            return False
+        self._buffer = self._buffer[self._position:]
+        self._position = 0
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._exhausted = True
+            self._buffer += self._text_decoder.decode(b"", final=True)
+            return False
+        self._buffer += self._text_decoder.decode(chunk)
+        return True
+
+    def _peek(self):
+        """Return the next non whitespace character without consuming it."""
+        while True:
+            self._position = _WHITESPACE.match(self._buffer,
+                                               self._position).end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def _expect(self, characters):
+        """Consume the next non whitespace character and return it.
+
+        Raises:
+            ValueError if it is not one of characters
+        """
+        character = self._peek()
+        if character not in characters:
+            raise ValueError("Expected one of '%s' but got '%s'"
+                             % (characters, character))
+        self._position += 1
+        return character
+
+    def _value(self):
+        """Consume and return the next JSON value."""
+        self._peek()
+        while True:
+            try:
+                (value, end) = self._decoder.raw_decode(self._buffer,
+                                                        self._position)
+            except ValueError:
+                if not self._fill():
+                    raise
+                continue
+            # A number ending the buffer, or followed by the start of its
+            # fraction or exponent, may go on in the next chunk
+            if isinstance(value, (int, float)) \
+                    and not isinstance(value, bool) \
+                    and self._buffer[end:end + 1] in _NUMBER_PARTS \
+                    and self._fill():
+                continue
+            self._position = end
+            return value
+
+    def _items(self):
+        self._expect("[")
+        if self._peek() == "]":
+            self._position += 1
+            return
+        while True:
+            yield self._value()
+            if self._expect(",]") == "]":
+                return
+
+    def __iter__(self):
+        try:
+            self._expect("{")
+            if self._peek() == "}":
+                return
+            while True:
+                key = self._value()
+                self._expect(":")
+                if key == self._items_key:
+                    for item in self._items():
+                        yield item
+                else:
+                    self.metadata[key] = self._value()
+                if self._expect(",}") == "}":
+                    return
+        finally:
+            if self._close is not None:
+                self._close()
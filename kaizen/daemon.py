@@ -0,0 +1,178 @@
+"""Serve kaizen commands from a long lived process over a Unix socket.
+
+`kaizen daemon` keeps a ZenApi, and with it the pooled connections and the
+cached responses of its ApiClient, warm between commands. The cli forwards
+its command line to the daemon when one is listening and prints the result,
+falling back to running the command itself otherwise.
+
+Only the owner of the daemon can connect to its socket. Each connection
+carries one JSON line {"argv": [...]} answered by one JSON line
+{"result": ...} or {"error": "..."}.
+"""
+import json
+import os
+import socket
+import threading
+
+try:
+    from socketserver import StreamRequestHandler, ThreadingMixIn, \
+        UnixStreamServer
+except ImportError:
+    from SocketServer import StreamRequestHandler, ThreadingMixIn, \
+        UnixStreamServer
+
+DEFAULT_SOCKET_PATH = "~/.kaizen/daemon.sock"
+SOCKET_ENV_VARIABLE = "KAIZEN_DAEMON_SOCKET"
+
+
+class DaemonError(Exception):
+    """Used when the daemon failed to run a command."""
+
+
+class InvalidArguments(DaemonError):
+    """Used when the daemon could not parse a command line."""
+
+
+def get_socket_path(socket_path=None):
+    """Return the path of the daemon socket: the given one, the one in the
+    KAIZEN_DAEMON_SOCKET environment variable or '~/.kaizen/daemon.sock'.
+    """
+    return os.path.expanduser(socket_path or os.environ.get(
+        SOCKET_ENV_VARIABLE, DEFAULT_SOCKET_PATH))
+
+
+def _to_json(value):
+    """Serialize what json can't, records being turned into dicts."""
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return str(value)
+
+
+class _Handler(StreamRequestHandler):
+
+    def handle(self):
+        try:
+            message = json.loads(self.rfile.readline().decode("utf-8"))
+        except ValueError:
+            return self._answer({"error": "Malformed message"})
+        if message.get("stop"):
+            self._answer({"result": "stopped"})
+            return self.server.stop_requested()
+        try:
+            result = self.server.run_command(message.get("argv") or [])
+        except SystemExit:
+            return self._answer({"error": "Invalid arguments %s"
+                                 % message.get("argv"),
+                                 "invalid_arguments": True})
+        except Exception as error:
+            return self._answer({"error": "%s: %s" % (type(error).__name__,
+                                                      error)})
+        self._answer({"result": result})
+
+    def _answer(self, message):
+        self.wfile.write(json.dumps(message, default=_to_json)
+                         .encode("utf-8") + b"\n")
+
+
+class _ThreadingUnixStreamServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+class ZenDaemon(object):
+    """Run the commands received on a Unix socket with a single ZenApi."""
+
+    def __init__(self, api, socket_path=None):
+        """
+        Args:
+            api: the ZenApi instance running every command
+            socket_path: path of the socket to listen on, see get_socket_path
+        """
+        self._api = api
+        self.socket_path = get_socket_path(socket_path)
+        directory = os.path.dirname(self.socket_path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        if os.path.exists(self.socket_path):
+            if is_running(self.socket_path):
+                raise DaemonError("A daemon is already listening on '%s'"
+                                  % self.socket_path)
+            # Left behind by a daemon that did not stop cleanly
+            os.remove(self.socket_path)
+        self._server = _ThreadingUnixStreamServer(self.socket_path, _Handler)
+        # Whoever can connect runs commands with the owner's api key
+        os.chmod(self.socket_path, 0o600)
+        self._server.run_command = self.run_command
+        self._server.stop_requested = self.stop_requested
+
+    def run_command(self, argv):
+        """Parse the command line and run it with the daemon's ZenApi."""
+        return self._api.parser.call(argv, instance=self._api)
+
+    def serve_forever(self):
+        """Serve commands until stop is called."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def stop_requested(self):
+        """Stop serving, can be called from a request handler."""
+        # shutdown waits for serve_forever to return, don't block the handler
+        threading.Thread(target=self._server.shutdown).start()
+
+
+def _send(message, socket_path):
+    """Send the message to the daemon and return its answer.
+
+    Raises:
+        socket.error if no daemon is listening on socket_path
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+        client.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        answer = client.makefile("rb").readline()
+    finally:
+        client.close()
+    if not answer:
+        raise DaemonError("The daemon closed the connection")
+    return json.loads(answer.decode("utf-8"))
+
+
+def is_running(socket_path=None):
+    """Return True if a daemon is listening on the socket."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(get_socket_path(socket_path))
+        return True
+    except socket.error:
+        return False
+    finally:
+        client.close()
+
+
+def forward(argv, socket_path=None):
+    """Run the command line on the daemon and return its result.
+
+    Raises:
+        socket.error if no daemon is listening on the socket
+        InvalidArguments if the command line could not be parsed
+        DaemonError if the command failed
+    """
+    answer = _send({"argv": list(argv)}, get_socket_path(socket_path))
+    if answer.get("invalid_arguments"):
+        raise InvalidArguments(answer["error"])
+    if "error" in answer:
+        raise DaemonError(answer["error"])
+    return answer["result"]
+
+
+def stop(socket_path=None):
+    """Stop the daemon listening on the socket.
+
+    Raises:
+        socket.error if no daemon is listening on the socket
+    """
+    _send({"stop": True}, get_socket_path(socket_path))
@@ -0,0 +1,52 @@
+"""Bound the time spent on operations making many requests.
+
+A Deadline is a budget of time shared by every request of an operation, e.g.
+every page of a listing or every story of a bulk move. Requests built from a
+request with a deadline share it and their timeout is capped by the time
+left, once it is spent they fail with DeadlineExceeded instead of being sent:
+
+    stories = ZenRequest(api_key).with_deadline(10).projects(12).stories()
+    list(stories.iter_items())  # raises DeadlineExceeded after 10 seconds
+"""
+import time
+
+import requests
+
+
+class DeadlineExceeded(requests.Timeout):
+    """Used when a request is sent after the deadline of its operation."""
+
+
+class Deadline(object):
+    """The time by which an operation must be done."""
+
+    def __init__(self, seconds, clock=time.time):
+        """
+        Args:
+            seconds: number of seconds from now the operation has
+            clock: function returning the current time in seconds
+        """
+        self._clock = clock
+        self._expires_at = clock() + seconds
+
+    def remaining(self):
+        """Return the number of seconds left, 0 once the deadline passed."""
+        return max(0.0, self._expires_at - self._clock())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, timeout=None):
+        """Return the timeout of a request sent now.
+
+        Args:
+            timeout: the timeout of the request without deadline, None if it
+            has none
+
+        Raises:
+            DeadlineExceeded if the deadline passed
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("Deadline exceeded")
+        return remaining if timeout is None else min(timeout, remaining)
@@ -0,0 +1,256 @@
+"""Export every story of projects to JSONL, CSV or a compact columnar file.
+
+Stories are written page by page as the pages arrive, only the pages being
+fetched or written are held in memory. After each page the export records its
+progress in '<path>.progress' so an interrupted export resumes after the last
+page written:
+
+    export_stories(ZenRequest(api_key), [12, 42], "stories.csv.gz", "csv",
+                   compress=True)
+
+Compressed exports are written as one gzip member per page, which gzip tools
+and the gzip module read as a single stream.
+
+The columnar format stores each page as a row group: the number of rows then,
+for each column, the zlib-compressed JSON list of its values. read_columnar
+reads it back.
+"""
+import csv
+import io
+import json
+import os
+import struct
+import sys
+import zlib
+
+from kaizen.cache import replace_file
+from kaizen.pagination import DEFAULT_PAGE_SIZE
+
+FORMATS = ("jsonl", "csv", "columnar")
+COLUMNAR_MAGIC = b"KZC1"
+# Columns of the csv and columnar formats, nested entities being flattened
+COLUMNS = ("id", "project_id", "text", "details", "size", "color", "priority",
+           "status", "blocked_reason", "deadline", "create_time",
+           "update_time", "phase_id", "phase_name", "owner", "creator", "tags",
+           "tasks", "complete_tasks")
+_BUFFER_SIZE = 1024 * 1024
+_UINT32 = struct.Struct(">I")
+# unicode on Python 2, str on Python 3
+_TEXT = type(u"")
+
+
+class ExportError(Exception):
+    """Used when an export can not be run or resumed."""
+
+
+def flatten_story(story):
+    """Return the values of the story for each of COLUMNS."""
+    phase = story.get("phase") or {}
+    tasks = story.get("tasks") or []
+    return (story.get("id"), (story.get("project") or {}).get("id"),
+            story.get("text"), story.get("details"), story.get("size"),
+            story.get("color"), story.get("priority"), story.get("status"),
+            story.get("blockedReason"), story.get("deadline"),
+            story.get("createTime"), story.get("updateTime"), phase.get("id"),
+            phase.get("name"), (story.get("owner") or {}).get("userName"),
+            (story.get("creator") or {}).get("userName"),
+            ",".join(tag["name"] for tag in story.get("tags") or []),
+            len(tasks),
+            len([task for task in tasks if task.get("status") == "complete"]))
+
+
+class JsonLinesEncoder(object):
+    """One JSON story per line, stories being exported as returned."""
+
+    def header(self):
+        return b""
+
+    def encode(self, stories):
+        return "".join(json.dumps(story) + "\n"
+                       for story in stories).encode("utf-8")
+
+
+class CsvEncoder(object):
+    """One line per story with the values of COLUMNS."""
+
+    def _encode_rows(self, rows):
+        if sys.version_info[0] < 3:
+            # The csv module of Python 2 writes byte strings
+            buffer = io.BytesIO()
+            csv.writer(buffer, lineterminator="\n").writerows(
+                [value.encode("utf-8") if isinstance(value, _TEXT) else value
+                 for value in row] for row in rows)
+            return buffer.getvalue()
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+    def header(self):
+        return self._encode_rows([COLUMNS])
+
+    def encode(self, stories):
+        return self._encode_rows(flatten_story(story) for story in stories)
+
+
+class ColumnarEncoder(object):
+    """Row groups of zlib-compressed columns, see the module documentation."""
+
+    def header(self):
+        columns = json.dumps(COLUMNS).encode("utf-8")
+        return COLUMNAR_MAGIC + _UINT32.pack(len(columns)) + columns
+
+    def encode(self, stories):
+        rows = [flatten_story(story) for story in stories]
+        if not rows:
+            return b""
+        chunks = [_UINT32.pack(len(rows))]
+        for column in zip(*rows):
+            data = zlib.compress(json.dumps(column).encode("utf-8"))
+            chunks.append(_UINT32.pack(len(data)))
+            chunks.append(data)
+        return b"".join(chunks)
+
+
+ENCODERS = {"jsonl": JsonLinesEncoder, "csv": CsvEncoder,
+            "columnar": ColumnarEncoder}
+
+
+def _gzip(data):
+    """Return data as a complete gzip member."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _read_exactly(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ExportError("Truncated columnar file")
+    return data
+
+
+def read_columnar(stream):
+    """Yield every row of a columnar export as a dict indexed on COLUMNS.
+
+    Args:
+        stream: the binary file object of the export, decompressed
+    """
+    if stream.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ExportError("Not a columnar export")
+    (length,) = _UINT32.unpack(_read_exactly(stream, _UINT32.size))
+    columns = json.loads(_read_exactly(stream, length).decode("utf-8"))
+    while True:
+        data = stream.read(_UINT32.size)
+        if not data:
+            return
+        (rows,) = _UINT32.unpack(data)
+        values = []
+        for _ in columns:
+            (length,) = _UINT32.unpack(_read_exactly(stream, _UINT32.size))
+            values.append(json.loads(zlib.decompress(
+                _read_exactly(stream, length)).decode("utf-8")))
+        for index in range(rows):
+            yield dict((column, column_values[index])
+                       for (column, column_values) in zip(columns, values))
+
+
+class _Progress(object):
+    """The progress of an export, saved next to it after every page."""
+
+    def __init__(self, path):
+        self._path = path + ".progress"
+
+    def load(self):
+        try:
+            with open(self._path, "r") as progress_file:
+                return json.load(progress_file)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def save(self, state):
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, "w") as progress_file:
+            json.dump(state, progress_file)
+        replace_file(tmp_path, self._path)
+
+    def clear(self):
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+
+def export_stories(zen_request, project_ids, path, export_format="jsonl",
+                   compress=False, size=DEFAULT_PAGE_SIZE, workers=4,
+                   resume=True):
+    """Write every story of the projects, with their tags and tasks, to path.
+
+    Args:
+        zen_request: the ZenRequest used to call the API
+        project_ids: ids of the projects to export, in order
+        path: the file to write, '-' writes to the standard output and can't
+        be resumed
+        export_format: one of 'jsonl', 'csv' or 'columnar'
+        compress: gzip the file
+        size: number of stories per page
+        workers: number of pages fetched in parallel
+        resume: continue the interrupted export of path if there is one,
+        otherwise path is overwritten
+
+    Returns:
+        a dict with the number of stories and pages written
+
+    Raises:
+        ExportError if the format is unknown or the export to resume was made
+        with other options
+    """
+    if export_format not in ENCODERS:
+        raise ExportError("Unknown format '%s', use one of %s"
+                          % (export_format, ", ".join(FORMATS)))
+    encoder = ENCODERS[export_format]()
+    options = {"projects": list(project_ids), "format": export_format,
+               "compress": compress, "size": size}
+    to_stdout = path == "-"
+    progress = None if to_stdout else _Progress(path)
+    state = progress.load() if progress is not None and resume else None
+    if state is not None:
+        if state["options"] != options:
+            raise ExportError("'%s' was exported with other options %s"
+                              % (path, state["options"]))
+        output = open(path, "r+b", _BUFFER_SIZE)
+        output.seek(state["offset"])
+        output.truncate()
+    else:
+        state = {"options": options, "offset": 0, "project": 0, "page": 0}
+        output = getattr(sys.stdout, "buffer", sys.stdout) if to_stdout \
+            else open(path, "wb", _BUFFER_SIZE)
+
+    def write(data):
+        if data:
+            output.write(_gzip(data) if compress else data)
+
+    summary = {"stories": 0, "pages": 0}
+    try:
+        if state["offset"] == 0:
+            write(encoder.header())
+        for position in range(state["project"], len(options["projects"])):
+            stories = zen_request.projects(options["projects"][position])\
+                .stories().with_enrichments("tags", "tasks")
+            for response in stories.iter_pages(size, workers=workers,
+                                               start=state["page"] + 1):
+                items = response.get("items", [])
+                write(encoder.encode(items))
+                summary["stories"] += len(items)
+                summary["pages"] += 1
+                state["page"] = response.get("page", state["page"] + 1)
+                if progress is not None:
+                    output.flush()
+                    state["offset"] = output.tell()
+                    progress.save(state)
+            state["project"] = position + 1
+            state["page"] = 0
+    finally:
+        if to_stdout:
+            output.flush()
+        else:
+            output.close()
+    if progress is not None:
+        progress.clear()
+    return summary
@@ -0,0 +1,511 @@
+"""A local stand-in for AgileZen API serving a synthetic dataset.
+
+It implements the resources used by kaizen: projects, phases, stories, tags,
+tasks and members along with pagination, filters and enrichments. It is meant
+to exercise and benchmark the client without hitting the real API:
+
+    with FakeServer(FakeDataset(stories=5000), latency=0.01) as server:
+        client = ApiClient("api_key", api_url=server.api_url)
+        ZenRequest("api_key", client).projects(1).stories().send()
+"""
+from datetime import datetime, timedelta
+import json
+import operator
+import random
+import re
+import socket
+import sys
+import threading
+import time
+import zlib
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qsl, urlsplit
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qsl, urlsplit
+
+API_PREFIX = "/api/v1"
+PHASE_NAMES = ["Backlog", "Ready", "Working", "Review", "Archive"]
+COLORS = ["grey", "blue", "green", "yellow", "orange", "red", "purple", "teal"]
+STATUSES = ["ready", "started", "blocked", "finished"]
+TAG_NAMES = ["bug", "feature", "chore", "urgent", "ui", "api", "docs"]
+EPOCH = datetime(2014, 1, 1)
+
+
+_OPERATOR = re.compile(r"[<>]?=?")
+_OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt,
+              "<=": operator.le, "=": operator.eq}
+
+
+class NotFound(Exception):
+    """Raised when a request targets an unknown resource."""
+
+
+def _timestamp(seconds):
+    """Return the API representation of a date seconds after EPOCH."""
+    return (EPOCH + timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _now():
+    """Return the number of seconds elapsed since EPOCH."""
+    return (datetime.utcnow() - EPOCH).total_seconds()
+
+
+class FakeDataset(object):
+    """Synthetic and deterministic AgileZen data."""
+
+    def __init__(self, projects=1, phases=5, stories=100, members=10,
+                 tasks=2, tags=2, details_size=200, seed=42):
+        """
+        Args:
+            projects: number of projects
+            phases: number of phases per project
+            stories: number of stories per project
+            members: number of members per project
+            tasks: number of tasks per story
+            tags: number of tags per story
+            details_size: number of characters in the details of a story
+            seed: seed of the random generator
+        """
+        generator = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self.users = [self._user(index) for index in range(members)]
+        self.projects = {}
+        self.phases = {}
+        self.stories = {}
+        for _ in range(projects):
+            project = self._add_project(generator, phases, stories, tasks,
+                                        tags, details_size)
+            self.projects[project["id"]] = project
+
+    def _new_id(self):
+        with self._lock:
+            self._next_id += 1
+            return self._next_id - 1
+
+    def _user(self, index):
+        return {"id": index + 1, "name": "User %s" % index,
+                "userName": "user%s" % index,
+                "email": "user%s@example.com" % index}
+
+    def _add_project(self, generator, phases, stories, tasks, tags,
+                     details_size):
+        project_id = self._new_id()
+        project = {"id": project_id, "name": "Project %s" % project_id,
+                   "description": "Synthetic project",
+                   "details": "", "createTime": _timestamp(0),
+                   "owner": self.users[0] if self.users else None}
+        self.phases[project_id] = [
+            {"id": self._new_id(),
+             "name": PHASE_NAMES[index] if index < len(PHASE_NAMES)
+             else "Phase %s" % index,
+             "description": "", "index": index, "limit": None}
+            for index in range(phases)]
+        self.stories[project_id] = {}
+        for _ in range(stories):
+            story = self._story(generator, project, tasks, tags, details_size)
+            self.stories[project_id][story["id"]] = story
+        return project
+
+    def _story(self, generator, project, tasks, tags, details_size):
+        story_id = self._new_id()
+        phase = generator.choice(self.phases[project["id"]])
+        created = generator.randint(0, 3600 * 24 * 365)
+        owner = generator.choice(self.users) if self.users else None
+        return {
+            "id": story_id, "text": "Story %s" % story_id,
+            "details": "".join(generator.choice("abcdefgh ")
+                               for _ in range(details_size)),
+            "size": str(generator.randint(1, 8)),
+            "color": generator.choice(COLORS),
+            "priority": str(generator.randint(1, 5)),
+            "status": generator.choice(STATUSES), "blockedReason": None,
+            "deadline": None, "createTime": _timestamp(created),
+            "updateTime": _timestamp(created + generator.randint(0, 3600)),
+            "project": {"id": project["id"], "name": project["name"]},
+            "phase": {"id": phase["id"], "name": phase["name"]},
+            "creator": self.users[0] if self.users else None,
+            "owner": owner,
+            "tags": [{"id": TAG_NAMES.index(name) + 1, "name": name}
+                     for name in generator.sample(TAG_NAMES, tags)],
+            "tasks": [{"id": self._new_id(), "text": "Task %s" % index,
+                       "status": generator.choice(["incomplete", "complete"]),
+                       "createTime": _timestamp(created)}
+                      for index in range(tasks)],
+        }
+
+    def get_project(self, project_id):
+        try:
+            return self.projects[project_id]
+        except KeyError:
+            raise NotFound()
+
+    def get_phase(self, project_id, phase_id):
+        self.get_project(project_id)
+        for phase in self.phases[project_id]:
+            if phase["id"] == phase_id:
+                return phase
+        raise NotFound()
+
+    def get_story(self, project_id, story_id):
+        self.get_project(project_id)
+        try:
+            return self.stories[project_id][story_id]
+        except KeyError:
+            raise NotFound()
+
+    def add_phase(self, project_id, data):
+        phases = self.phases[self.get_project(project_id)["id"]]
+        phase = {"id": self._new_id(), "name": data.get("name"),
+                 "description": data.get("description"),
+                 "index": data.get("index", len(phases) - 1),
+                 "limit": data.get("limit")}
+        phases.insert(phase["index"], phase)
+        for (index, each_phase) in enumerate(phases):
+            each_phase["index"] = index
+        return phase
+
+    def add_story(self, project_id, data):
+        project = self.get_project(project_id)
+        phases = self.phases[project_id]
+        phase_id = data.get("phase")
+        phase = self.get_phase(project_id, int(phase_id)) if phase_id \
+            else phases[0]
+        story = {"id": self._new_id(), "text": data.get("text"),
+                 "details": data.get("details", ""),
+                 "size": data.get("size"), "color": data.get("color", "grey"),
+                 "priority": data.get("priority"), "status": "ready",
+                 "blockedReason": None, "deadline": None,
+                 "createTime": _timestamp(_now()),
+                 "updateTime": _timestamp(_now()),
+                 "project": {"id": project["id"], "name": project["name"]},
+                 "phase": {"id": phase["id"], "name": phase["name"]},
+                 "creator": None, "owner": None, "tags": [], "tasks": []}
+        self.stories[project_id][story["id"]] = story
+        return story
+
+    def update_story(self, project_id, story_id, data):
+        story = self.get_story(project_id, story_id)
+        for (field, value) in data.items():
+            if field == "phase":
+                phase = self.get_phase(project_id, int(value))
+                story["phase"] = {"id": phase["id"], "name": phase["name"]}
+            elif field == "owner":
+                story["owner"] = {"id": value, "userName": value}
+            else:
+                story[field] = value
+        story["updateTime"] = _timestamp(_now())
+        return story
+
+
+def _matches(entity, filters):
+    """Return True if entity matches every 'field:value' filter. Nested
+    entities such as phase or owner are matched on their name or id, values
+    prefixed by a comparison operator e.g. 'updateTime:>=2014-01-01T00:00:00'
+    are compared with the field.
+    """
+    for (field, value) in filters:
+        comparison = _OPERATOR.match(value).group()
+        if comparison:
+            actual = entity.get(field)
+            if actual is None or not _OPERATORS[comparison](
+                    str(actual), value[len(comparison):]):
+                return False
+            continue
+        if field == "tag":
+            actual = [tag["name"] for tag in entity.get("tags", [])]
+            if value not in actual:
+                return False
+            continue
+        actual = entity.get(field)
+        if isinstance(actual, dict):
+            actual = [str(actual.get("id")), actual.get("name"),
+                      actual.get("userName")]
+        else:
+            actual = [str(actual)]
+        if value not in actual:
+            return False
+    return True
+
+
+def _parse_filters(where):
+    """Parse a 'field:value and field:value' filter into a list of pairs."""
+    filters = []
+    for term in re.split(r"\s+and\s+", where or "", flags=re.IGNORECASE):
+        if ":" in term:
+            (field, value) = term.split(":", 1)
+            filters.append((field.strip(), value.strip().strip('"')))
+    return filters
+
+
+def _paginate(items, params, view=None):
+    """Return the paginated response for the given items.
+
+    Args:
+        items: every item matching the request
+        params: the query parameters of the request
+        view: function applied to the items of the page only
+    """
+    page = int(params.get("page", 1))
+    size = int(params.get("pageSize", 100))
+    total_pages = (len(items) + size - 1) // size
+    page_items = items[(page - 1) * size:page * size]
+    if view is not None:
+        page_items = [view(item) for item in page_items]
+    return {"page": page, "pageSize": size, "totalPages": total_pages,
+            "totalItems": len(items), "items": page_items}
+
+
+def _story_view(story, enrichments):
+    """Return the story as listed, tags and tasks being enrichments."""
+    return dict((key, value) for (key, value) in story.items()
+                if key not in ("tags", "tasks") or key in enrichments)
+
+
+class _Router(object):
+    """Map a verb and a path to the dataset."""
+
+    def __init__(self, dataset):
+        self._dataset = dataset
+
+    def route(self, verb, path, params, data):
+        segments = [segment for segment in path.split("/") if segment]
+        enrichments = set((params.get("with") or "").split(","))
+        filters = _parse_filters(params.get("where"))
+        dataset = self._dataset
+        if not segments or segments[0] != "projects":
+            raise NotFound()
+        if len(segments) == 1:
+            projects = []
+            for project in dataset.projects.values():
+                project = dict(project)
+                if "phases" in enrichments:
+                    project["phases"] = dataset.phases[project["id"]]
+                if "members" in enrichments:
+                    project["members"] = dataset.users
+                projects.append(project)
+            return _paginate(projects, params)
+        project_id = int(segments[1])
+        if len(segments) == 2:
+            if verb == "PUT":
+                dataset.get_project(project_id).update(data)
+            return dataset.get_project(project_id)
+        resource = segments[2]
+        entity_id = int(segments[3]) if len(segments) > 3 else None
+        if resource == "members":
+            dataset.get_project(project_id)
+            if entity_id is None:
+                return _paginate(dataset.users, params)
+            for user in dataset.users:
+                if user["id"] == entity_id:
+                    return user
+            raise NotFound()
+        if resource == "phases":
+            return self._phases(verb, project_id, entity_id, segments[4:],
+                                params, data, enrichments, filters)
+        if resource == "stories":
+            return self._stories(verb, project_id, entity_id, segments[4:],
+                                 params, data, enrichments, filters)
+        raise NotFound()
+
+    def _phases(self, verb, project_id, phase_id, rest, params, data,
+                enrichments, filters):
+        dataset = self._dataset
+        if phase_id is None:
+            if verb == "POST":
+                return dataset.add_phase(project_id, data)
+            dataset.get_project(project_id)
+            phases = dataset.phases[project_id]
+            if "stories" in enrichments:
+                phases = [dict(phase, stories=[
+                    story for story in dataset.stories[project_id].values()
+                    if story["phase"]["id"] == phase["id"]])
+                    for phase in phases]
+            return _paginate(phases, params)
+        phase = dataset.get_phase(project_id, phase_id)
+        if rest == ["stories"]:
+            stories = [story for story in dataset.stories[project_id].values()
+                       if story["phase"]["id"] == phase_id
+                       and _matches(story, filters)]
+            return _paginate(stories, params,
+                             lambda story: _story_view(story, enrichments))
+        if verb == "PUT":
+            phase.update(data)
+        return phase
+
+    def _stories(self, verb, project_id, story_id, rest, params, data,
+                 enrichments, filters):
+        dataset = self._dataset
+        if story_id is None:
+            if verb == "POST":
+                return dataset.add_story(project_id, data)
+            dataset.get_project(project_id)
+            stories = list(dataset.stories[project_id].values())
+            if filters:
+                stories = [story for story in stories
+                           if _matches(story, filters)]
+            return _paginate(stories, params,
+                             lambda story: _story_view(story, enrichments))
+        story = dataset.get_story(project_id, story_id)
+        if rest == ["tags"]:
+            if verb == "POST":
+                tag = {"id": len(TAG_NAMES) + 1, "name": data.get("name")}
+                story["tags"].append(tag)
+                return tag
+            return _paginate(story["tags"], params)
+        if rest == ["tasks"]:
+            return _paginate(story["tasks"], params)
+        if verb == "PUT":
+            return dataset.update_story(project_id, story_id, data)
+        if verb == "DELETE":
+            del dataset.stories[project_id][story_id]
+            return {}
+        return _story_view(story, enrichments | {"tags", "tasks"})
+
+
+class FakeApp(object):
+    """Answer requests from a FakeDataset without going through a socket.
+
+    It is the application served by FakeServer and can be given to a
+    MemoryTransport to run the client against the dataset in process.
+    """
+
+    def __init__(self, dataset=None, latency=0):
+        """
+        Args:
+            dataset: the FakeDataset to serve, defaults to a small dataset
+            latency: number of seconds added to every response
+        """
+        self.dataset = dataset or FakeDataset()
+        self.latency = latency
+        self.request_count = 0
+        self._router = _Router(self.dataset)
+        self._lock = threading.Lock()
+
+    def __call__(self, verb, url, headers, body):
+        """Return the status, headers and body of the response to a request.
+
+        Args:
+            verb: the HTTP verb of the request
+            url: the url, or path, of the request with its query string
+            headers: the headers of the request
+            body: the body of the request as bytes
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        url = urlsplit(url)
+        params = dict(parse_qsl(url.query))
+        headers = dict((name.lower(), value)
+                       for (name, value) in headers.items())
+        api_key = headers.get("x-zen-apikey")
+        status = 200
+        if not api_key:
+            (status, response) = (401, {"message": "missing api key"})
+        elif not url.path.startswith(API_PREFIX):
+            (status, response) = (404, {"message": "not found"})
+        else:
+            try:
+                data = json.loads(body.decode("utf-8")) if body else {}
+                response = self._router.route(
+                    verb, url.path[len(API_PREFIX):], params, data)
+            except (NotFound, ValueError):
+                (status, response) = (404, {"message": "not found"})
+        with self._lock:
+            self.request_count += 1
+        payload = json.dumps(response).encode("utf-8")
+        response_headers = {"Content-Type": "application/json",
+                            "Content-Length": str(len(payload))}
+        if verb == "GET" and status == 200:
+            # Answer conditional requests like the API does
+            etag = '"%08x"' % (zlib.crc32(payload) & 0xffffffff)
+            if headers.get("if-none-match") == etag:
+                return (304, {"ETag": etag}, b"")
+            response_headers["ETag"] = etag
+        return (status, response_headers, payload)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Answer HTTP requests with the application of the server."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, don't wait for delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        """Keep the output of tests and benchmarks clean."""
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        (status, headers, payload) = self.server.app(self.command, self.path,
+                                                     self.headers, body)
+        self.send_response(status)
+        for (name, value) in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        """Clients closing the connection, e.g. after a timeout, are not
+        errors of the server.
+        """
+        if not isinstance(sys.exc_info()[1], socket.error):
+            HTTPServer.handle_error(self, request, client_address)
+
+
+class FakeServer(object):
+    """Serve a FakeDataset over HTTP on localhost from a background thread."""
+
+    def __init__(self, dataset=None, latency=0, port=0):
+        """
+        Args:
+            dataset: the FakeDataset to serve, defaults to a small dataset
+            latency: number of seconds added to every response
+            port: the port to listen on, defaults to a free port
+        """
+        self._app = FakeApp(dataset, latency)
+        self.dataset = self._app.dataset
+        self._server = _ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.app = self._app
+        self._thread = None
+
+    @property
+    def api_url(self):
+        """The url to give to ApiClient to use this server."""
+        return "http://127.0.0.1:%s%s" % (self._server.server_address[1],
+                                          API_PREFIX)
+
+    @property
+    def request_count(self):
+        """Number of requests answered so far."""
+        return self._app.request_count
+
+    def start(self):
+        """Start answering requests in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server and release its socket."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,113 @@
+"""Query the same resource of many projects at once as one stream.
+
+The projects are listed concurrently by a bounded pool of workers and their
+items are yielded as each project completes, every item being tagged with its
+project. Given a sort key the streams of the projects are merged in order:
+
+    for story in ZenRequest(api_key).fan_out("stories", sort="updateTime"):
+        print(story["project"]["name"], story["text"])
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import itertools
+
+from kaizen.pagination import DEFAULT_PAGE_SIZE
+
+RESOURCES = ("stories", "phases", "members")
+# Below the default size of the connection pool of ApiClient
+DEFAULT_FANOUT_WORKERS = 8
+
+
+def iter_projects(zen_request, project_ids=None, size=DEFAULT_PAGE_SIZE):
+    """Yield the projects to query, with their name when they are listed.
+
+    Args:
+        zen_request: the ZenRequest used to call the API
+        project_ids: ids of the projects, defaults to every project accessible
+        size: number of projects fetched per request
+    """
+    if project_ids is not None:
+        for project_id in project_ids:
+            yield {"id": project_id}
+        return
+    for project in zen_request.projects().iter_items(size):
+        yield project
+
+
+def sort_key(field):
+    """Return a key function reading field from an item, nested fields being
+    separated by dots e.g. 'phase.name'. Missing values sort first.
+    """
+    path = field.split(".")
+
+    def key(item):
+        for name in path:
+            item = item.get(name) if isinstance(item, dict) else None
+        return (item is not None, item)
+    return key
+
+
+def _list_project(zen_request, resource, project, where, enrichments,
+                  size, key, reverse):
+    """Return every item of the resource of the project tagged with it,
+    sorted if there is a key.
+    """
+    request = getattr(zen_request.projects(project["id"]), resource)()
+    if where is not None:
+        request = request.where(where)
+    if enrichments:
+        request = request.with_enrichments(*enrichments)
+    tag = {"id": project["id"], "name": project.get("name")}
+    # Tag copies, the items may be shared by a cache or a coalesced request
+    items = [dict(item, project=item.get("project", tag))
+             for item in request.iter_items(size)]
+    if key is not None:
+        items.sort(key=key, reverse=reverse)
+    return items
+
+
+def fan_out(zen_request, resource, project_ids=None, where=None,
+            enrichments=(), sort=None, reverse=False,
+            workers=DEFAULT_FANOUT_WORKERS, size=DEFAULT_PAGE_SIZE):
+    """Yield the items of a resource of many projects, listed concurrently.
+
+    Args:
+        zen_request: the ZenRequest used to call the API
+        resource: one of 'stories', 'phases' or 'members'
+        project_ids: ids of the projects, defaults to every project accessible
+        where: filter applied to the items of every project
+        enrichments: enrichments of the items e.g. 'tags'
+        sort: field the merged stream is ordered by, see sort_key, or a key
+        function. Without it items are yielded as the projects complete
+        reverse: sort in descending order
+        workers: max number of projects queried at once
+        size: number of items fetched per request
+
+    Raises:
+        ValueError if the resource is unknown
+        the error of the first project that could not be listed
+    """
+    if resource not in RESOURCES:
+        raise ValueError("Unknown resource '%s', use one of %s"
+                         % (resource, ", ".join(RESOURCES)))
+    # Not an isinstance check for str, fields may be unicode on Python 2
+    key = sort if sort is None or callable(sort) else sort_key(sort)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = [executor.submit(_list_project, zen_request, resource, project,
+                               where, enrichments, size, key, reverse)
+               for project in iter_projects(zen_request, project_ids, size)]
+    try:
+        if key is None:
+            for future in as_completed(futures):
+                for item in future.result():
+                    yield item
+        else:
+            # sorted merges the sorted lists of the projects as runs,
+            # heapq.merge only takes a key from Python 3.5
+            for item in sorted(itertools.chain.from_iterable(
+                    future.result() for future in futures), key=key,
+                    reverse=reverse):
+                yield item
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
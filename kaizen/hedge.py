@@ -0,0 +1,176 @@
+"""Hedge slow idempotent requests to cut tail latency.
+
+When a request has not been answered after the latency observed for most
+requests, by default the 95th percentile, a second copy is sent and the first
+response received is used, the other one being discarded. About 5% of the
+requests are duplicated, at most 10% with the default budget, while the
+slowest ones no longer set the latency of the operations waiting for them.
+Calls are not hedged while every worker is busy, hedges would only queue
+behind the calls they are meant to overtake:
+
+    hedge = HedgePolicy()
+    client = ApiClient(api_key, hedge=hedge)
+    ...
+    hedge.stats()  # number of requests hedged and of hedges answering first
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import threading
+import time
+
+DEFAULT_HEDGE_QUANTILE = 0.95
+DEFAULT_HEDGE_BUDGET = 0.1
+DEFAULT_HEDGE_WORKERS = 32
+
+
+class HedgePolicy(object):
+    """Send a copy of the calls slower than a quantile of the latencies
+    observed, the first call to answer wins.
+
+    It is thread-safe. Only use it for calls that can be made twice, the
+    client only hedges GET requests.
+    """
+
+    def __init__(self, quantile=DEFAULT_HEDGE_QUANTILE, min_samples=20,
+                 window=1000, workers=DEFAULT_HEDGE_WORKERS,
+                 budget=DEFAULT_HEDGE_BUDGET):
+        """
+        Args:
+            quantile: the quantile of the latencies after which a call is
+            hedged
+            min_samples: number of latencies observed before hedging
+            window: number of the most recent latencies the quantile is
+            computed from
+            workers: max number of calls and hedges in flight at once, calls
+            made while they are all busy are not hedged
+            budget: max fraction of the calls hedged
+        """
+        self._quantile = quantile
+        self._min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._workers = workers
+        self._budget = budget
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._in_flight = 0
+        self.calls = 0
+        self.hedged = 0
+        self.won = 0
+
+    def observe(self, seconds):
+        """Record the latency of a call."""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def delay(self):
+        """Return the number of seconds after which a call is hedged, None
+        while too few latencies have been observed.
+        """
+        with self._lock:
+            if len(self._latencies) < self._min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1,
+                             int(len(latencies) * self._quantile))]
+
+    def _timed(self, function):
+        start = time.time()
+        result = function()
+        self.observe(time.time() - start)
+        return result
+
+    def _reserve_worker(self):
+        """Return True if a worker is free, reserving it. Called locked."""
+        if self._in_flight >= self._workers:
+            return False
+        self._in_flight += 1
+        return True
+
+    def _run(self, function, started=None, acquire=None):
+        """Run function() in a reserved worker and release it."""
+        try:
+            if started is not None:
+                started.set()
+            if acquire is not None:
+                acquire()
+            return self._timed(function)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _drop(self, future, discard):
+        """Cancel the call losing the race, or discard its result."""
+        if future.cancel():
+            with self._lock:
+                self._in_flight -= 1
+        elif discard is not None:
+            def done(future):
+                if future.exception() is None:
+                    discard(future.result())
+            future.add_done_callback(done)
+
+    def call(self, function, acquire=None, discard=None):
+        """Return the result of function(), calling it a second time if the
+        first call is slow.
+
+        Args:
+            function: the function making the call
+            acquire: function called before the second call is made, e.g. to
+            take a token from a rate limiter
+            discard: function called with the result of the call losing the
+            race, e.g. to release its connection
+
+        Raises:
+            the exception of the last call failing if every call failed
+        """
+        delay = self.delay()
+        with self._lock:
+            self.calls += 1
+            hedgeable = delay is not None and self._reserve_worker()
+        if not hedgeable:
+            return self._timed(function)
+        started = threading.Event()
+        first = self._executor.submit(self._run, function, started)
+        # The delay runs from the start of the call, not from its submission
+        started.wait()
+        (done, _) = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        with self._lock:
+            hedgeable = self.hedged < self.calls * self._budget \
+                and self._reserve_worker()
+            if hedgeable:
+                self.hedged += 1
+        if not hedgeable:
+            return first.result()
+        hedge = self._executor.submit(self._run, function, acquire=acquire)
+        pending = [first, hedge]
+        while True:
+            (done, pending) = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.won += 1
+                    for loser in pending:
+                        self._drop(loser, discard)
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                raise error
+
+    def stats(self):
+        """Return the number of calls, of calls hedged and of hedges answering
+        first.
+        """
+        with self._lock:
+            return {"calls": self.calls, "hedged": self.hedged,
+                    "won": self.won}
+
+    def reset(self):
+        """Reset the counters and the latencies observed."""
+        with self._lock:
+            self._latencies.clear()
+            self.calls = 0
+            self.hedged = 0
+            self.won = 0
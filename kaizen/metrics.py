@@ -0,0 +1,201 @@
+"""Instrument requests sent to AgileZen API.
+
+ApiClient calls its hooks for every HTTP request it sends:
+ - before_send: before the request is sent
+ - after_response: once the response is received and decoded
+ - on_error: if the request failed
+
+Each hook receives the RequestEvent describing the request.
+"""
+import json
+import re
+import threading
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def url_template(url):
+    """Return the url with every id replaced by a placeholder so requests to
+    the same endpoint share the same template.
+
+    Example:
+        '/projects/12/stories/42' -> '/projects/{id}/stories/{id}'
+    """
+    return re.sub(r"/\d+(?=/|$)", "/{id}", url)
+
+
+class RequestEvent(object):
+    """Describe a request sent to the API and what happened to it.
+
+    Timings are in seconds and are None until they are known: ttfb is the
+    time until the response headers were received, total includes retries
+    and decode is the time spent decoding the JSON response.
+    """
+
+    def __init__(self, verb, url):
+        """
+        Args:
+            verb: the HTTP verb of the request
+            url: the url of the resource relative to the API root
+        """
+        self.verb = verb
+        self.url = url
+        self.url_template = url_template(url)
+        self.status = None
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.attempts = 0
+        self.ttfb = None
+        self.total = None
+        self.decode = None
+        self.error = None
+
+
+class RequestHooks(object):
+    """Base class for hooks, override the callbacks you are interested in."""
+
+    def before_send(self, event):
+        """Called before the request is sent."""
+
+    def after_response(self, event):
+        """Called once the response has been received and decoded."""
+
+    def on_error(self, event):
+        """Called when the request failed, event.error holds the exception."""
+
+
+class _Histogram(object):
+    """Cumulative histogram of latencies."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self):
+        """Return (upper bound, number of values below it) pairs."""
+        total = 0
+        for (bound, count) in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            yield (bound, total)
+
+
+class _EndpointMetrics(object):
+    """Counters and latency histogram of an endpoint."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.statuses = {}
+        self.latency = _Histogram()
+        self.decode = _Histogram()
+
+
+class MetricsCollector(RequestHooks):
+    """Keep counters and latency histograms per endpoint i.e. per verb and url
+    template. It is thread-safe so one collector can be shared by clients.
+    """
+
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def _get_endpoint(self, event):
+        key = (event.verb, event.url_template)
+        if key not in self._endpoints:
+            self._endpoints[key] = _EndpointMetrics()
+        return self._endpoints[key]
+
+    def _record(self, event):
+        with self._lock:
+            endpoint = self._get_endpoint(event)
+            endpoint.requests += 1
+            endpoint.bytes_in += event.bytes_in
+            endpoint.bytes_out += event.bytes_out
+            if event.error is not None:
+                endpoint.errors += 1
+            if event.status is not None:
+                endpoint.statuses[event.status] = \
+                    endpoint.statuses.get(event.status, 0) + 1
+            if event.total is not None:
+                endpoint.latency.observe(event.total)
+            if event.decode is not None:
+                endpoint.decode.observe(event.decode)
+
+    def after_response(self, event):
+        self._record(event)
+
+    def on_error(self, event):
+        self._record(event)
+
+    def reset(self):
+        """Forget every metric collected so far."""
+        with self._lock:
+            self._endpoints.clear()
+
+    def to_dict(self):
+        """Return the metrics as a dict indexed on 'VERB url_template'."""
+        with self._lock:
+            return dict(("%s %s" % key, {
+                "requests": endpoint.requests,
+                "errors": endpoint.errors,
+                "bytes_in": endpoint.bytes_in,
+                "bytes_out": endpoint.bytes_out,
+                "statuses": dict((str(status), count) for (status, count)
+                                 in endpoint.statuses.items()),
+                "latency_sum": endpoint.latency.sum,
+                "latency_buckets": dict(
+                    (str(bound), count) for (bound, count)
+                    in endpoint.latency.cumulative_counts()),
+                "decode_sum": endpoint.decode.sum,
+            }) for (key, endpoint) in self._endpoints.items())
+
+    def to_json(self):
+        """Return the metrics serialized in JSON."""
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+    def to_prometheus(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        lines = [
+            "# TYPE kaizen_requests_total counter",
+            "# TYPE kaizen_request_errors_total counter",
+            "# TYPE kaizen_request_bytes_in_total counter",
+            "# TYPE kaizen_request_bytes_out_total counter",
+            "# TYPE kaizen_request_duration_seconds histogram",
+            "# TYPE kaizen_decode_duration_seconds histogram",
+        ]
+        with self._lock:
+            for ((verb, template), endpoint) in sorted(
+                    self._endpoints.items()):
+                labels = 'verb="%s",endpoint="%s"' % (verb, template)
+                lines.append("kaizen_requests_total{%s} %s"
+                             % (labels, endpoint.requests))
+                lines.append("kaizen_request_errors_total{%s} %s"
+                             % (labels, endpoint.errors))
+                lines.append("kaizen_request_bytes_in_total{%s} %s"
+                             % (labels, endpoint.bytes_in))
+                lines.append("kaizen_request_bytes_out_total{%s} %s"
+                             % (labels, endpoint.bytes_out))
+                for (name, histogram) in [
+                        ("kaizen_request_duration_seconds", endpoint.latency),
+                        ("kaizen_decode_duration_seconds", endpoint.decode)]:
+                    for (bound, count) in histogram.cumulative_counts():
+                        lines.append('%s_bucket{%s,le="%s"} %s'
+                                     % (name, labels, bound, count))
+                    lines.append("%s_sum{%s} %s" % (name, labels,
+                                                    histogram.sum))
+                    lines.append("%s_count{%s} %s" % (name, labels,
+                                                      histogram.count))
+        return "\n".join(lines) + "\n"
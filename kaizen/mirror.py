@@ -0,0 +1,320 @@
+"""Mirror AgileZen projects into a local SQLite database.
+
+The first sync of a project loads its phases, members and stories along with
+their tags and tasks. The following ones only fetch the stories updated since
+the most recent update already mirrored, using a 'where' filter on their
+update time. Stories are indexed on their phase, owner, status and tags so the
+mirror can answer list queries without calling the API:
+
+    mirror = Mirror()
+    mirror.sync(ZenRequest(api_key))
+    mirror.list_stories(12, phase="Working", owner="bob")
+"""
+import json
+import os
+import sqlite3
+import threading
+
+from kaizen.pagination import DEFAULT_PAGE_SIZE
+
+DEFAULT_MIRROR_PATH = "~/.kaizen/mirror.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS phases (
+    id INTEGER PRIMARY KEY,
+    project_id INTEGER NOT NULL,
+    name TEXT,
+    position INTEGER,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS members (
+    project_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    user_name TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (project_id, id)
+);
+CREATE TABLE IF NOT EXISTS stories (
+    id INTEGER PRIMARY KEY,
+    project_id INTEGER NOT NULL,
+    phase_id INTEGER,
+    phase_name TEXT,
+    owner TEXT,
+    status TEXT,
+    update_time TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS story_tags (
+    story_id INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (story_id, tag)
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    story_id INTEGER NOT NULL,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    project_id INTEGER PRIMARY KEY,
+    last_update TEXT
+);
+CREATE INDEX IF NOT EXISTS phases_project ON phases (project_id, position);
+CREATE INDEX IF NOT EXISTS stories_phase ON stories (project_id, phase_id);
+CREATE INDEX IF NOT EXISTS stories_phase_name ON stories (project_id,
+                                                          phase_name);
+CREATE INDEX IF NOT EXISTS stories_owner ON stories (project_id, owner);
+CREATE INDEX IF NOT EXISTS stories_status ON stories (project_id, status);
+CREATE INDEX IF NOT EXISTS story_tags_tag ON story_tags (tag, story_id);
+CREATE INDEX IF NOT EXISTS tasks_story ON tasks (story_id);
+"""
+
+
+class MirrorError(Exception):
+    """Used when the mirror can not answer a query."""
+
+
+def _name(entity, key="name"):
+    """Return the key of a nested entity, None if there is no entity."""
+    return (entity or {}).get(key)
+
+
+def _page(items, total, page, size):
+    """Return items in the same paginated form as the API."""
+    return {"page": page, "pageSize": size, "totalItems": total,
+            "totalPages": (total + size - 1) // size, "items": items}
+
+
+class Mirror(object):
+    """Local SQLite copy of AgileZen projects."""
+
+    def __init__(self, path=DEFAULT_MIRROR_PATH):
+        """
+        Args:
+            path: path of the SQLite database, defaults to
+            '~/.kaizen/mirror.db', ':memory:' keeps it in memory
+        """
+        if path != ":memory:":
+            path = os.path.expanduser(path)
+            directory = os.path.dirname(path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._connection.close()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def last_update(self, project_id):
+        """Return the update time of the most recently updated story of the
+        project, None if the project was never synced.
+        """
+        rows = self._query("SELECT last_update FROM sync_state "
+                           "WHERE project_id = ?", (project_id,))
+        return rows[0][0] if rows else None
+
+    def sync(self, zen_request, project_ids=None, full=False,
+             size=DEFAULT_PAGE_SIZE, workers=1):
+        """Mirror the given projects, only fetching the stories updated since
+        the previous sync.
+
+        Args:
+            zen_request: the ZenRequest used to call the API
+            project_ids: ids of the projects to mirror, defaults to every
+            project accessible
+            full: reload every story even if the project was already synced
+            size: number of entities fetched per request
+            workers: number of pages fetched in parallel
+
+        Returns:
+            a dict with the number of stories fetched per project id
+        """
+        projects = list(zen_request.projects().iter_items(size))
+        if project_ids is not None:
+            projects = [project for project in projects
+                        if project["id"] in project_ids]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO projects VALUES (?, ?, ?)",
+                [(project["id"], project.get("name"), json.dumps(project))
+                 for project in projects])
+        return dict((project["id"], self._sync_project(
+            zen_request.projects(project["id"]), project["id"], full, size,
+            workers)) for project in projects)
+
+    def _sync_project(self, request, project_id, full, size, workers):
+        phases = list(request.phases().iter_items(size))
+        members = list(request.members().iter_items(size))
+        last_update = None if full else self.last_update(project_id)
+        stories = request.stories().with_enrichments("tags", "tasks")
+        if last_update is not None:
+            stories = stories.where("updateTime:>=%s" % last_update)
+        stories = list(stories.iter_items(size, workers=workers))
+        with self._lock, self._connection:
+            cursor = self._connection.cursor()
+            cursor.execute("DELETE FROM phases WHERE project_id = ?",
+                           (project_id,))
+            cursor.executemany(
+                "INSERT OR REPLACE INTO phases VALUES (?, ?, ?, ?, ?)",
+                [(phase["id"], project_id, phase.get("name"), position,
+                  json.dumps(phase)) for (position, phase)
+                 in enumerate(phases)])
+            cursor.execute("DELETE FROM members WHERE project_id = ?",
+                           (project_id,))
+            cursor.executemany(
+                "INSERT OR REPLACE INTO members VALUES (?, ?, ?, ?)",
+                [(project_id, member["id"], member.get("userName"),
+                  json.dumps(member)) for member in members])
+            if last_update is None:
+                self._delete_stories(cursor, project_id)
+            self._store_stories(cursor, project_id, stories)
+            cursor.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)",
+                           (project_id, self._max_update(cursor, project_id)))
+        if last_update is not None and self._count(project_id) != \
+                request.stories().paginate(1, 1).send()["totalItems"]:
+            # Deleted stories are not returned by the update filter
+            return self._sync_project(request, project_id, True, size,
+                                      workers)
+        return len(stories)
+
+    def _delete_stories(self, cursor, project_id):
+        story_ids = "SELECT id FROM stories WHERE project_id = ?"
+        cursor.execute("DELETE FROM story_tags WHERE story_id IN (%s)"
+                       % story_ids, (project_id,))
+        cursor.execute("DELETE FROM tasks WHERE story_id IN (%s)" % story_ids,
+                       (project_id,))
+        cursor.execute("DELETE FROM stories WHERE project_id = ?",
+                       (project_id,))
+
+    def _store_stories(self, cursor, project_id, stories):
+        story_ids = [(story["id"],) for story in stories]
+        cursor.executemany("DELETE FROM story_tags WHERE story_id = ?",
+                           story_ids)
+        cursor.executemany("DELETE FROM tasks WHERE story_id = ?", story_ids)
+        cursor.executemany(
+            "INSERT OR REPLACE INTO stories VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(story["id"], project_id, _name(story.get("phase"), "id"),
+              _name(story.get("phase")), _name(story.get("owner"), "userName"),
+              story.get("status"), story.get("updateTime"), json.dumps(story))
+             for story in stories])
+        cursor.executemany(
+            "INSERT OR IGNORE INTO story_tags VALUES (?, ?)",
+            [(story["id"], tag["name"]) for story in stories
+             for tag in story.get("tags") or []])
+        cursor.executemany(
+            "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?)",
+            [(task["id"], story["id"], task.get("status"), json.dumps(task))
+             for story in stories for task in story.get("tasks") or []])
+
+    def _max_update(self, cursor, project_id):
+        cursor.execute("SELECT MAX(update_time) FROM stories "
+                       "WHERE project_id = ?", (project_id,))
+        return cursor.fetchone()[0]
+
+    def _count(self, project_id):
+        return self._query("SELECT COUNT(*) FROM stories WHERE project_id = ?",
+                           (project_id,))[0][0]
+
+    def _check_synced(self, project_id):
+        if not self._query("SELECT 1 FROM sync_state WHERE project_id = ?",
+                           (project_id,)):
+            raise MirrorError("Project %s has not been synced, run "
+                              "'kaizen sync' first" % project_id)
+
+    def list_projects(self, phases=False, members=False):
+        """Return the mirrored projects like the API would.
+
+        Args:
+            phases: add the phases to the Project objects
+            members: add the members to the Project objects
+        """
+        projects = []
+        for (data,) in self._query("SELECT data FROM projects ORDER BY id"):
+            project = json.loads(data)
+            if phases:
+                project["phases"] = self.list_phases(project["id"])["items"]
+            if members:
+                project["members"] = [json.loads(member) for (member,)
+                                      in self._query(
+                                          "SELECT data FROM members WHERE "
+                                          "project_id = ? ORDER BY id",
+                                          (project["id"],))]
+            projects.append(project)
+        return _page(projects, len(projects), 1, max(len(projects), 1))
+
+    def list_phases(self, project_id, stories=False, page=1,
+                    size=DEFAULT_PAGE_SIZE):
+        """Return a page of the mirrored phases of the project.
+
+        Args:
+            project_id: id of the Project
+            stories: should the stories be included in the phases
+            page: page number, starting at 1
+            size: max number of phases in the page
+        """
+        self._check_synced(project_id)
+        total = self._query("SELECT COUNT(*) FROM phases WHERE project_id = ?",
+                            (project_id,))[0][0]
+        rows = self._query("SELECT data FROM phases WHERE project_id = ? "
+                           "ORDER BY position LIMIT ? OFFSET ?",
+                           (project_id, size, (page - 1) * size))
+        phases = [json.loads(data) for (data,) in rows]
+        if stories:
+            for phase in phases:
+                phase["stories"] = [json.loads(data) for (data,) in self._query(
+                    "SELECT data FROM stories WHERE project_id = ? AND "
+                    "phase_id = ? ORDER BY id", (project_id, phase["id"]))]
+        return _page(phases, total, page, size)
+
+    def list_stories(self, project_id, phase=None, owner=None, status=None,
+                     tag=None, tasks=False, tags=False, page=1,
+                     size=DEFAULT_PAGE_SIZE):
+        """Return a page of the mirrored stories of the project.
+
+        Args:
+            project_id: id of the Project
+            phase: only stories in the phase with this name
+            owner: only stories owned by the user with this user name
+            status: only stories with this status
+            tag: only stories with this tag
+            tasks: should the tasks be included in the stories
+            tags: should the tags be included in the stories
+            page: page number, starting at 1
+            size: max number of stories in the page
+        """
+        self._check_synced(project_id)
+        (conditions, params) = (["project_id = ?"], [project_id])
+        for (column, value) in [("phase_name", phase), ("owner", owner),
+                                ("status", status)]:
+            if value is not None:
+                conditions.append("%s = ?" % column)
+                params.append(value)
+        if tag is not None:
+            conditions.append("id IN (SELECT story_id FROM story_tags "
+                              "WHERE tag = ?)")
+            params.append(tag)
+        where = " AND ".join(conditions)
+        total = self._query("SELECT COUNT(*) FROM stories WHERE %s" % where,
+                            params)[0][0]
+        rows = self._query("SELECT data FROM stories WHERE %s ORDER BY id "
+                           "LIMIT ? OFFSET ?" % where,
+                           params + [size, (page - 1) * size])
+        stories = []
+        for (data,) in rows:
+            story = json.loads(data)
+            if not tasks:
+                story.pop("tasks", None)
+            if not tags:
+                story.pop("tags", None)
+            stories.append(story)
+        return _page(stories, total, page, size)
@@ -0,0 +1,105 @@
+"""Walk through every page of a paginated AgileZen resource.
+
+Paginated responses look like:
+    {"page": 1, "pageSize": 100, "totalPages": 3, "totalItems": 250,
+     "items": [...]}
+
+Note:
+    see http://dev.agilezen.com/concepts/pagination.html
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+DEFAULT_PAGE_SIZE = 100
+
+
+def _last_page(response, page):
+    """Return the index of the last page given the response for page."""
+    return response.get("totalPages", page)
+
+
+def iter_pages(request, size=DEFAULT_PAGE_SIZE, prefetch=True, workers=1,
+               start=1):
+    """Yield every page of the given request, from the start to the last.
+
+    Once the first page gives the total number of pages the following ones are
+    fetched in the background, up to workers pages at once, while the pages
+    already received are consumed.
+
+    Args:
+        request: the ApiRequest listing a paginated resource
+        size: the number of entities on each page
+        prefetch: fetch the next pages in the background while the current
+        one is being consumed
+        workers: max number of pages fetched concurrently when prefetching
+        start: the first page to fetch, e.g. to resume an interrupted walk
+
+    Note:
+        at most workers + 1 pages are held in memory at once whatever the
+        total number of pages
+    """
+    def fetch(page):
+        return request.for_page(page, size).send()
+
+    response = fetch(start)
+    pages = iter(range(start + 1, _last_page(response, start) + 1))
+    if not prefetch:
+        yield response
+        for page in pages:
+            yield fetch(page)
+        return
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = deque(executor.submit(fetch, page)
+                    for page in islice(pages, workers))
+    try:
+        yield response
+        while pending:
+            response = pending.popleft().result()
+            pending.extend(executor.submit(fetch, page)
+                           for page in islice(pages, 1))
+            yield response
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def stream_items(request, size=DEFAULT_PAGE_SIZE):
+    """Yield every item of every page of the given request, decoding each page
+    incrementally as it is received.
+
+    Args:
+        request: the ApiRequest listing a paginated resource
+        size: the number of entities on each page
+    """
+    page = 1
+    while True:
+        items = request.for_page(page, size).stream()
+        for item in items:
+            yield item
+        if page >= _last_page(items.metadata, page):
+            return
+        page += 1
+
+
+def iter_items(request, size=DEFAULT_PAGE_SIZE, prefetch=True, workers=1,
+               stream=False):
+    """Yield every item of every page of the given request, in page order.
+
+    Args:
+        request: the ApiRequest listing a paginated resource
+        size: the number of entities on each page
+        prefetch: fetch the next pages in the background while the current
+        one is being consumed
+        workers: max number of pages fetched concurrently when prefetching
+        stream: decode the items of each page as it is received rather than
+        decoding whole pages, pages are then fetched one after the other
+    """
+    if stream:
+        for item in stream_items(request, size):
+            yield item
+        return
+    for response in iter_pages(request, size, prefetch, workers):
+        for item in response.get("items", []):
+            yield item
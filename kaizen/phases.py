@@ -0,0 +1,162 @@
+"""Index the phases of projects to find the next phase of a story.
+
+Phase indexes are built once per project, from every page of its phases, and
+reused until they expire or the phases of the project are modified through
+the ApiClient the PhaseIndexCache is hooked to.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import re
+import threading
+import time
+
+from kaizen.metrics import RequestHooks
+from kaizen.request import VERBS
+
+DEFAULT_PHASE_INDEX_TTL = 300
+# Same as the default size of the connection pool of ApiClient
+DEFAULT_BUMP_WORKERS = 10
+_PHASES_URL = re.compile(r"^/projects/(\d+)/phases(?:/|$)")
+
+
+class PhaseIndex(object):
+    """Ids and positions of the phases of a project, in board order."""
+
+    def __init__(self, phases):
+        """
+        Args:
+            phases: the phase dicts of the project ordered by index
+        """
+        self.ids_by_name = {}
+        self.positions = {}
+        self.next_ids = {}
+        previous_id = None
+        for (position, phase) in enumerate(phases):
+            self.ids_by_name.setdefault(phase["name"], phase["id"])
+            self.positions[phase["id"]] = position
+            if previous_id is not None:
+                self.next_ids[previous_id] = phase["id"]
+            previous_id = phase["id"]
+
+    def __contains__(self, phase_name):
+        return phase_name in self.ids_by_name
+
+    def next_phase_id(self, phase_name):
+        """Return the id of the phase following the one with the given name.
+
+        Raises:
+            ValueError if the phase is unknown or is the last one
+        """
+        if phase_name not in self.ids_by_name:
+            raise ValueError("Unknown phase '%s'" % phase_name)
+        next_id = self.next_ids.get(self.ids_by_name[phase_name])
+        if next_id is None:
+            raise ValueError("Story is already in the last phase '%s'"
+                             % phase_name)
+        return next_id
+
+
+class PhaseIndexCache(RequestHooks):
+    """PhaseIndex of each project, expired after ttl seconds.
+
+    Add it to the hooks of an ApiClient to drop the index of a project as
+    soon as one of its phases is added, updated or deleted with that client.
+    """
+
+    def __init__(self, ttl=DEFAULT_PHASE_INDEX_TTL, clock=time.time):
+        """
+        Args:
+            ttl: number of seconds an index is used before being rebuilt
+            clock: function returning the current time in seconds
+        """
+        self._ttl = ttl
+        self._clock = clock
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get(self, project_request, project_id, refresh=False):
+        """Return the PhaseIndex of the project, building it if needed.
+
+        Args:
+            project_request: the ProjectRequest of the project
+            project_id: id of the project
+            refresh: rebuild the index even if it has not expired
+        """
+        with self._lock:
+            entry = self._indexes.get(project_id)
+        if entry is not None and not refresh \
+                and self._clock() - entry[1] < self._ttl:
+            return entry[0]
+        built_at = self._clock()
+        index = PhaseIndex(list(project_request.phases().iter_items()))
+        with self._lock:
+            self._indexes[project_id] = (index, built_at)
+        return index
+
+    def invalidate(self, project_id=None):
+        """Drop the index of the project, of every project if None."""
+        with self._lock:
+            if project_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(project_id, None)
+
+    def after_response(self, event):
+        if event.verb == VERBS.GET:
+            return
+        match = _PHASES_URL.match(event.url)
+        if match:
+            self.invalidate(int(match.group(1)))
+
+
+def _bump_story(story_request, story, index):
+    """Move the story to its next phase, fetching it first if it is None.
+
+    Returns:
+        the id of the phase the story was moved to
+    """
+    if story is None:
+        story = story_request.send()
+    phase_id = index.next_phase_id(story["phase"]["name"])
+    story_request.move_to_phase(phase_id).send()
+    return phase_id
+
+
+def bump_stories(project_request, index, story_ids=None, where=None,
+                 workers=DEFAULT_BUMP_WORKERS):
+    """Move many stories of a project to their next phase concurrently.
+
+    Each story is fetched and moved by one of the workers so the stories
+    don't wait for each other. Stories selected by a filter are listed page by
+    page and only need to be moved. A story both given by id and selected by
+    the filter is moved once.
+
+    Args:
+        project_request: the ProjectRequest of the stories' project
+        index: the PhaseIndex of the project
+        story_ids: ids of the stories to move
+        where: filter selecting the stories to move, e.g. 'phase:Ready'
+        workers: max number of requests sent at once
+
+    Returns:
+        a dict with the new phase id of each story moved under 'moved' and
+        the error of each story that could not be moved under 'failed'
+    """
+    stories = OrderedDict((story_id, None) for story_id in story_ids or [])
+    if where is not None:
+        for story in project_request.stories().where(where).iter_items(
+                workers=workers):
+            stories[story["id"]] = story
+    report = {"moved": {}, "failed": {}}
+    if not stories:
+        return report
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [(story_id, executor.submit(
+            _bump_story, project_request.stories(story_id), story, index))
+            for (story_id, story) in stories.items()]
+        for (story_id, future) in futures:
+            try:
+                report["moved"][story_id] = future.result()
+            except Exception as error:
+                report["failed"][story_id] = str(error)
+    return report
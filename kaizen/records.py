@@ -0,0 +1,284 @@
+"""Compact typed records of the entities returned by AgileZen API.
+
+Records use __slots__ rather than dicts, intern the strings that repeat across
+entities (phase names, colors, statuses, user names...) and keep markdown
+details compressed until they are accessed. They are meant to keep many
+entities in memory:
+
+    stories = [Story.from_dict(story) for story in request.iter_items()]
+"""
+import sys
+import zlib
+
+try:
+    intern = sys.intern
+except AttributeError:
+    pass
+
+# Details longer than this number of bytes are compressed
+COMPRESS_THRESHOLD = 256
+
+
+def _intern(value):
+    """Intern the value if it is a string."""
+    return intern(value) if isinstance(value, str) else value
+
+
+def _user_name(user):
+    """Return the interned user name of a user dict, None if there is none."""
+    if not user:
+        return None
+    return _intern(user.get("userName") or user.get("name"))
+
+
+def _pack(text):
+    """Return the text encoded, and compressed if it is long enough, prefixed
+    by a byte telling how to unpack it.
+    """
+    if not text:
+        return text
+    data = text.encode("utf-8")
+    if len(data) > COMPRESS_THRESHOLD:
+        return b"z" + zlib.compress(data)
+    return b"r" + data
+
+
+def _unpack(data):
+    """Return the text packed with _pack."""
+    if not data:
+        return data
+    if data[:1] == b"z":
+        return zlib.decompress(data[1:]).decode("utf-8")
+    return data[1:].decode("utf-8")
+
+
+class Record(object):
+    """Base class of records, FIELDS lists the attributes of the record."""
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, field) == getattr(other, field)
+            for field in self.FIELDS)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, ", ".join(
+            "%s=%r" % (field, getattr(self, field)) for field in self.FIELDS))
+
+    def to_dict(self):
+        """Return the record as a dict indexed on its fields."""
+        return dict((field, getattr(self, field)) for field in self.FIELDS)
+
+
+class Member(Record):
+    """A user member of a Project."""
+
+    __slots__ = ("id", "name", "user_name", "email")
+    FIELDS = __slots__
+
+    @classmethod
+    def from_dict(cls, data):
+        member = cls()
+        member.id = data.get("id")
+        member.name = _intern(data.get("name"))
+        member.user_name = _intern(data.get("userName"))
+        member.email = data.get("email")
+        return member
+
+
+class Tag(Record):
+    """A tag of a Story."""
+
+    __slots__ = ("id", "name")
+    FIELDS = __slots__
+
+    @classmethod
+    def from_dict(cls, data):
+        tag = cls()
+        tag.id = data.get("id")
+        tag.name = _intern(data.get("name"))
+        return tag
+
+
+class Task(Record):
+    """A task of a Story."""
+
+    __slots__ = ("id", "text", "status", "create_time", "finish_time",
+                 "finished_by")
+    FIELDS = __slots__
+
+    @classmethod
+    def from_dict(cls, data):
+        task = cls()
+        task.id = data.get("id")
+        task.text = data.get("text")
+        task.status = _intern(data.get("status"))
+        task.create_time = data.get("createTime")
+        task.finish_time = data.get("finishTime")
+        task.finished_by = _user_name(data.get("finishedBy"))
+        return task
+
+
+class Phase(Record):
+    """A Phase of a Project, its stories being empty unless the 'stories'
+    enrichment was requested.
+    """
+
+    __slots__ = ("id", "name", "description", "index", "limit", "stories")
+    FIELDS = __slots__
+
+    @classmethod
+    def from_dict(cls, data):
+        phase = cls()
+        phase.id = data.get("id")
+        phase.name = _intern(data.get("name"))
+        phase.description = data.get("description")
+        phase.index = data.get("index")
+        phase.limit = data.get("limit")
+        phase.stories = tuple(Story.from_dict(story)
+                              for story in data.get("stories") or ())
+        return phase
+
+
+class Project(Record):
+    """A Project, its details being decoded when accessed.
+
+    Its phases and members are empty and its metrics None unless the
+    matching enrichments were requested.
+    """
+
+    __slots__ = ("id", "name", "description", "_details", "create_time",
+                 "owner", "phases", "members", "metrics")
+    FIELDS = ("id", "name", "description", "details", "create_time", "owner",
+              "phases", "members", "metrics")
+
+    @property
+    def details(self):
+        return _unpack(self._details)
+
+    @classmethod
+    def from_dict(cls, data):
+        project = cls()
+        project.id = data.get("id")
+        project.name = data.get("name")
+        project.description = data.get("description")
+        project._details = _pack(data.get("details"))
+        project.create_time = data.get("createTime")
+        project.owner = _user_name(data.get("owner"))
+        project.phases = tuple(Phase.from_dict(phase)
+                               for phase in data.get("phases") or ())
+        project.members = tuple(Member.from_dict(member)
+                                for member in data.get("members") or ())
+        project.metrics = data.get("metrics")
+        return project
+
+
+class Story(Record):
+    """A Story, its details being decoded when accessed.
+
+    The phase and users of the Story are referenced by id and name rather than
+    by nested entities.
+    """
+
+    __slots__ = ("id", "text", "_details", "size", "color", "priority",
+                 "status", "blocked_reason", "deadline", "create_time",
+                 "update_time", "project_id", "phase_id", "phase_name",
+                 "owner", "creator", "tags", "tasks")
+    FIELDS = ("id", "text", "details", "size", "color", "priority", "status",
+              "blocked_reason", "deadline", "create_time", "update_time",
+              "project_id", "phase_id", "phase_name", "owner", "creator",
+              "tags", "tasks")
+
+    @property
+    def details(self):
+        return _unpack(self._details)
+
+    @classmethod
+    def from_dict(cls, data):
+        story = cls()
+        story.id = data.get("id")
+        story.text = data.get("text")
+        story._details = _pack(data.get("details"))
+        story.size = _intern(data.get("size"))
+        story.color = _intern(data.get("color"))
+        story.priority = _intern(data.get("priority"))
+        story.status = _intern(data.get("status"))
+        story.blocked_reason = data.get("blockedReason")
+        story.deadline = data.get("deadline")
+        story.create_time = data.get("createTime")
+        story.update_time = data.get("updateTime")
+        story.project_id = (data.get("project") or {}).get("id")
+        phase = data.get("phase") or {}
+        story.phase_id = phase.get("id")
+        story.phase_name = _intern(phase.get("name"))
+        story.owner = _user_name(data.get("owner"))
+        story.creator = _user_name(data.get("creator"))
+        story.tags = tuple(_intern(tag.get("name"))
+                           for tag in data.get("tags") or ())
+        story.tasks = tuple(Task.from_dict(task)
+                            for task in data.get("tasks") or ())
+        return story
+
+
+class RecordPage(Record):
+    """A page of records along with its pagination information."""
+
+    __slots__ = ("page", "page_size", "total_pages", "total_items", "items")
+    FIELDS = __slots__
+
+    @classmethod
+    def from_dict(cls, data, record_class):
+        page = cls()
+        page.page = data.get("page")
+        page.page_size = data.get("pageSize")
+        page.total_pages = data.get("totalPages")
+        page.total_items = data.get("totalItems")
+        page.items = [record_class.from_dict(item)
+                      for item in data.get("items", [])]
+        return page
+
+
+RECORDS_BY_RESOURCE = {
+    "projects": Project,
+    "phases": Phase,
+    "stories": Story,
+    "members": Member,
+    "tasks": Task,
+    "tags": Tag,
+}
+
+
+def record_class_for(url):
+    """Return the record class of the resource at the given url.
+
+    Example:
+        '/projects/12/stories/' -> Story
+
+    Raises:
+        ValueError if the url does not point to a known resource
+    """
+    for segment in reversed([segment for segment in url.split("/")
+                             if segment]):
+        if segment in RECORDS_BY_RESOURCE:
+            return RECORDS_BY_RESOURCE[segment]
+    raise ValueError("No record for the resource at '%s'" % url)
+
+
+def to_records(response, record_class):
+    """Convert a response of the API into records.
+
+    Args:
+        response: a single entity dict or a paginated dict with 'items'
+        record_class: the Record class of the entities
+
+    Returns:
+        a record or a RecordPage for paginated responses
+    """
+    if "items" in response:
+        return RecordPage.from_dict(response, record_class)
+    return record_class.from_dict(response)
@@ -24,6 +24,9 @@ class Verbs(object):
 VERBS = Verbs()
 
 
+_KNOWN_VERBS = frozenset(VERBS)
+
+
 class Request(object):
     """Represent a HTTP request with a URL, a verb, params and data.
 
@@ -39,15 +42,48 @@ class Request(object):
     DATA   {}  | {}                |   {}                    |  {"name":"popo"}
 
     req.execute() # or something equivalent
+
+    Requests are immutable: each update_* method returns a new Request and
+    leaves the original one untouched, so a Request can safely be used as the
+    base of many others. The new Request shares the components that did not
+    change with the original one, params and data must thus never be mutated.
     """
 
+    __slots__ = ("_segments", "_url", "_verb", "_params", "_data")
+
     def __init__(self):
         """Initialize components of the HTTP requests to its default value."""
+        self._segments = ()
         self._url = ""
         self._verb = VERBS.GET
         self._params = {}
         self._data = {}
 
+    def cast(self, cls):
+        """Return a new Request of class cls sharing every attribute of self.
+
+        Args:
+            cls: self's class or one of its sub-classes adding no attribute
+            to the ones of self
+        """
+        request = object.__new__(cls)
+        self._share_attributes(request)
+        return request
+
+    def _share_attributes(self, request):
+        """Set every attribute of self on request, sub-classes adding
+        attributes must extend it.
+        """
+        request._segments = self._segments
+        request._url = self._url
+        request._verb = self._verb
+        request._params = self._params
+        request._data = self._data
+
+    def _clone(self):
+        """Return a new Request of the same class sharing every attribute."""
+        return self.cast(self.__class__)
+
     def copy(self, dest):
         """Copy all Request attribute to dest.
 
@@ -58,16 +94,20 @@ class Request(object):
             ValueError if dest is not a sub-class of Request
 
         Returns:
-            dest with its attribute equal to those of self
+            a Request like dest with its Request attributes equal to those of
+            self
         """
         if not isinstance(dest, Request):
             raise ValueError("'%s' should be a sub-class of 'Request'" % dest)
-        return dest.update_url(self.url).update_verb(self.verb)\
-                   .update_params(self.params).update_data(self.data)
+        request = dest._clone()
+        Request._share_attributes(self, request)
+        return request
 
     @property
     def url(self):
-        """Alias private attribute url."""
+        """The url of the request, built once from its segments."""
+        if self._url is None:
+            self._url = "".join("/%s" % segment for segment in self._segments)
         return self._url
 
     @property
@@ -85,30 +125,39 @@ class Request(object):
         """Alias private attribute data."""
         return self._data
 
-    @verb.setter
-    def verb(self, verb):
-        """Enforce that the verb is known, raises a ValueError otherwise."""
-        if verb not in VERBS:
-            raise ValueError("Unkown HTTP verb '%s'" % verb)
-        self._verb = verb
-
     def update_verb(self, verb):
-        """Update the request verb with the given verb."""
-        self.verb = verb
-        return self
+        """Return a request with the given verb, raises a ValueError if the
+        verb is unknown.
+        """
+        if verb not in _KNOWN_VERBS:
+            raise ValueError("Unkown HTTP verb '%s'" % verb)
+        if verb == self._verb:
+            return self
+        request = self._clone()
+        request._verb = verb
+        return request
 
     def update_params(self, extra_params):
-        """Update parameters with given dict, existing key are overwritten."""
-        self._params.update(extra_params)
-        return self
+        """Return a request with its parameters updated with the given dict,
+        existing key are overwritten.
+        """
+        request = self._clone()
+        request._params = dict(self._params)
+        request._params.update(extra_params)
+        return request
 
     def update_url(self, path):
-        """Concatenate given path to existing url."""
-        self._url += "/%s" % path.lstrip("/")
-        return self
+        """Return a request with the given path concatenated to its url."""
+        request = self._clone()
+        request._segments = self._segments + (path.lstrip("/"),)
+        request._url = None
+        return request
 
     def update_data(self, extra_data):
-        """Update data with given dict, existing key are overwritten."""
-        self._data.update(extra_data)
-        return self
-
+        """Return a request with its data updated with the given dict,
+        existing key are overwritten.
+        """
+        request = self._clone()
+        request._data = dict(self._data)
+        request._data.update(extra_data)
+        return request
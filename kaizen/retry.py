@@ -0,0 +1,159 @@
+"""Retry failed requests and throttle requests sent to AgileZen API."""
+from email.utils import mktime_tz, parsedate_tz
+import random
+import threading
+import time
+
+from kaizen.request import VERBS
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_VERBS = (VERBS.GET, VERBS.PUT, VERBS.DELETE)
+
+_RATE_LIMITERS = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
+
+def _parse_retry_after(value, clock=time.time):
+    """Return the number of seconds to wait from a Retry-After header value,
+    either a number of seconds or a HTTP date, or None if it is invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0.0, mktime_tz(date) - clock())
+
+
+class RetryPolicy(object):
+    """Decide whether a failed request should be retried and how long to wait
+    before doing so.
+
+    The delay grows exponentially with the number of attempts with full jitter
+    i.e. a random delay between 0 and backoff * 2 ** attempt, unless the API
+    sent a Retry-After header in which case it is honored.
+    """
+
+    def __init__(self, max_retries=3, backoff=0.5, max_backoff=30,
+                 statuses=RETRY_STATUSES, verbs=IDEMPOTENT_VERBS,
+                 sleep=time.sleep):
+        """
+        Args:
+            max_retries: max number of retries for a single request
+            backoff: base delay in seconds of the exponential backoff
+            max_backoff: max delay in seconds between two attempts
+            statuses: HTTP status codes for which a request is retried
+            verbs: HTTP verbs that can be retried, only idempotent verbs by
+            default
+            sleep: function used to wait between two attempts
+        """
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._statuses = statuses
+        self._verbs = verbs
+        self.sleep = sleep
+
+    def should_retry(self, verb, attempt, response=None):
+        """Return True if the request should be retried.
+
+        Args:
+            verb: the HTTP verb of the request
+            attempt: the number of retries already made
+            response: the failed requests.Response, None if the request failed
+            before a response was received
+        """
+        if attempt >= self._max_retries or verb not in self._verbs:
+            return False
+        return response is None or response.status_code in self._statuses
+
+    def get_delay(self, attempt, response=None):
+        """Return the number of seconds to wait before retrying.
+
+        Args:
+            attempt: the number of retries already made
+            response: the failed requests.Response if any
+        """
+        if response is not None:
+            retry_after = _parse_retry_after(
+                response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return retry_after
+        return random.uniform(0, min(self._max_backoff,
+                                     self._backoff * 2 ** attempt))
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket limiting the rate at which requests are sent.
+
+    The bucket holds at most capacity tokens and is refilled with rate tokens
+    per second, each request consumes one token.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.time, sleep=time.sleep):
+        """
+        Args:
+            rate: number of requests allowed per second
+            capacity: max number of requests sent in a burst, defaults to rate
+            clock: function returning the current time in seconds
+            sleep: function used to wait for a token
+        """
+        self._rate = float(rate)
+        self._capacity = float(capacity or max(rate, 1))
+        self._tokens = self._capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token and return how long to wait before it is available."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self._capacity, self._tokens +
+                               (now - self._updated_at) * self._rate)
+            self._updated_at = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self._rate
+
+    def acquire(self, timeout=None):
+        """Block until a request can be sent.
+
+        Args:
+            timeout: max number of seconds to wait, None to wait as long as
+            needed
+
+        Returns:
+            False, without taking a token, if it would have to wait longer
+            than timeout
+        """
+        delay = self._reserve()
+        if timeout is not None and delay > timeout:
+            with self._lock:
+                self._tokens += 1
+            return False
+        if delay > 0:
+            self._sleep(delay)
+        return True
+
+
+def get_rate_limiter(api_key, rate, capacity=None):
+    """Return the TokenBucket shared by every client using the given api key,
+    creating it on first use.
+
+    Args:
+        api_key: the AgileZen api key
+        rate: number of requests allowed per second
+        capacity: max number of requests sent in a burst, defaults to rate
+    Note:
+        the rate and capacity are only used when the bucket is created
+    """
+    with _RATE_LIMITERS_LOCK:
+        if api_key not in _RATE_LIMITERS:
+            _RATE_LIMITERS[api_key] = TokenBucket(rate, capacity)
+        return _RATE_LIMITERS[api_key]
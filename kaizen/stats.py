@@ -0,0 +1,150 @@
+"""Aggregate statistics over every story of a project.
+
+Stories are consumed one at a time as their pages arrive and are not kept:
+each story only updates the counters of its (owner, phase, status) group.
+The counters are columns held in arrays indexed by group, so memory depends on
+the number of groups, not on the number of stories.
+"""
+from array import array
+from datetime import date
+import time
+
+from kaizen.pagination import DEFAULT_PAGE_SIZE
+
+SECONDS_PER_DAY = 24 * 3600
+_COLUMNS = [("stories", "l"), ("size", "d"), ("priority", "d"),
+            ("age", "d"), ("max_age", "d"), ("blocked", "l"),
+            ("tasks", "l"), ("complete_tasks", "l")]
+
+
+def _number(value):
+    """Return value as a float, 0 if it is not a number e.g. an 'L' size."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class StoryStats(object):
+    """Accumulate counts, sums and ages of stories per owner, phase and
+    status.
+    """
+
+    def __init__(self, today=None):
+        """
+        Args:
+            today: the date ages are computed from, defaults to today
+        """
+        self._today = (today or date.fromtimestamp(time.time())).toordinal()
+        self._groups = {}
+        self._columns = dict((name, array(typecode))
+                             for (name, typecode) in _COLUMNS)
+        self._days = {}
+        self.tags = {}
+
+    def _group(self, key):
+        """Return the index of the group, adding a row to every column for a
+        new group.
+        """
+        index = self._groups.get(key)
+        if index is None:
+            index = self._groups[key] = len(self._groups)
+            for column in self._columns.values():
+                column.append(0)
+        return index
+
+    def _age(self, timestamp):
+        """Return the number of days since the date of an API timestamp."""
+        if not timestamp:
+            return 0
+        day = timestamp[:10]
+        if day not in self._days:
+            (year, month, day_of_month) = day.split("-")
+            self._days[day] = date(int(year), int(month),
+                                   int(day_of_month)).toordinal()
+        return self._today - self._days[day]
+
+    def add(self, story):
+        """Add the story dict to the statistics."""
+        owner = (story.get("owner") or {}).get("userName")
+        phase = (story.get("phase") or {}).get("name")
+        index = self._group((owner, phase, story.get("status")))
+        columns = self._columns
+        age = self._age(story.get("createTime"))
+        columns["stories"][index] += 1
+        columns["size"][index] += _number(story.get("size"))
+        columns["priority"][index] += _number(story.get("priority"))
+        columns["age"][index] += age
+        if age > columns["max_age"][index]:
+            columns["max_age"][index] = age
+        if story.get("status") == "blocked":
+            columns["blocked"][index] += 1
+        for task in story.get("tasks") or ():
+            columns["tasks"][index] += 1
+            if task.get("status") == "complete":
+                columns["complete_tasks"][index] += 1
+        for tag in story.get("tags") or ():
+            self.tags[tag["name"]] = self.tags.get(tag["name"], 0) + 1
+
+    def extend(self, stories):
+        """Add every story of the iterable to the statistics."""
+        for story in stories:
+            self.add(story)
+        return self
+
+    def _summary(self, indexes):
+        """Return the totals of the given groups."""
+        summary = dict((name, 0) for (name, _) in _COLUMNS)
+        for index in indexes:
+            for (name, column) in self._columns.items():
+                if name == "max_age":
+                    summary[name] = max(summary[name], column[index])
+                else:
+                    summary[name] += column[index]
+        stories = summary["stories"]
+        summary["average_age"] = summary.pop("age") / stories if stories \
+            else 0
+        return summary
+
+    def _by(self, position, indexes=None):
+        """Return the summaries of the groups by the given key position."""
+        groups = {}
+        for (key, index) in self._groups.items():
+            if indexes is None or index in indexes:
+                groups.setdefault(key[position], []).append(index)
+        return dict((name, self._summary(group_indexes))
+                    for (name, group_indexes) in groups.items())
+
+    def to_dict(self):
+        """Return the statistics: totals, then summaries by phase i.e. the
+        work in progress, by status and by owner, each owner being broken
+        down by phase and status. Ages are in days.
+        """
+        by_owner = {}
+        for (owner, indexes) in self._indexes_by_owner().items():
+            by_owner[owner] = self._summary(indexes)
+            by_owner[owner]["by_phase"] = self._by(1, indexes)
+            by_owner[owner]["by_status"] = self._by(2, indexes)
+        return {"total": self._summary(self._groups.values()),
+                "by_phase": self._by(1), "by_status": self._by(2),
+                "by_owner": by_owner, "tags": dict(self.tags)}
+
+    def _indexes_by_owner(self):
+        owners = {}
+        for (key, index) in self._groups.items():
+            owners.setdefault(key[0], set()).add(index)
+        return owners
+
+
+def project_stats(project_request, size=DEFAULT_PAGE_SIZE, workers=4,
+                  today=None):
+    """Return the StoryStats of every story of the project.
+
+    Args:
+        project_request: the ProjectRequest of the project
+        size: number of stories per page
+        workers: number of pages fetched in parallel
+        today: the date ages are computed from, defaults to today
+    """
+    stories = project_request.stories().with_enrichments("tags", "tasks")
+    return StoryStats(today).extend(stories.iter_items(size, workers=workers))
@@ -0,0 +1,300 @@
+"""Send the HTTP requests of ApiClient.
+
+A transport sends one HTTP request and returns a requests.Response, raising
+requests.ConnectionError or requests.Timeout when the request can't be sent,
+so the client handles errors, retries and caching the same way whatever the
+transport. The available transports are:
+
+    - 'requests': a pooled requests.Session, the default
+    - 'urllib3': a urllib3.PoolManager, skipping the overhead of requests
+    - 'http2': an httpx client speaking HTTP/2 when the server does, many
+      concurrent requests being multiplexed over a single connection.
+      httpx with its http2 extra must be installed
+    - MemoryTransport: calls an application in process, e.g. a FakeApp,
+      without any socket
+
+    client = ApiClient(api_key, transport="http2")
+"""
+from datetime import timedelta
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+try:
+    from http.client import responses as _REASONS
+    from urllib.parse import urlencode
+except ImportError:
+    from httplib import responses as _REASONS
+    from urllib import urlencode
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TRANSPORT = "requests"
+
+
+def _full_url(url, params):
+    """Return the url with the params as its query string."""
+    if not params:
+        return url
+    return "%s%s%s" % (url, "&" if "?" in url else "?", urlencode(params))
+
+
+def _body(data):
+    if data is None or isinstance(data, bytes):
+        return data
+    return data.encode("utf-8")
+
+
+def _response(url, status, headers, elapsed, content=None, raw=None):
+    """Return a requests.Response built from the response of a transport.
+
+    Args:
+        url: the url requested
+        status: the status code of the response
+        headers: the headers of the response
+        elapsed: number of seconds until the response headers were received
+        content: the body of the response, None if it is read from raw
+        raw: file-like object from which the body is read, as with
+        requests' stream=True
+    """
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.reason = _REASONS.get(status)
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.elapsed = timedelta(seconds=elapsed)
+    response.raw = raw
+    if content is not None:
+        response._content = content
+        response._content_consumed = True
+    return response
+
+
+class _ChunkReader(object):
+    """File-like object reading the body of a response from its chunks."""
+
+    def __init__(self, chunks, close):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+        self.close = close
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        (data, self._buffer) = (self._buffer[:size], self._buffer[size:])
+        return data
+
+
+class Transport(object):
+    """Send HTTP requests, see the module documentation."""
+
+    def request(self, verb, url, params, data, headers, stream=False,
+                timeout=None):
+        """Send a HTTP request and return its requests.Response.
+
+        Args:
+            verb: the HTTP verb
+            url: the full url
+            params: dict of the query string parameters
+            data: the body to send
+            headers: dict of the headers to send
+            stream: if True the body of the response is read from its raw
+            attribute as it is consumed
+            timeout: max number of seconds to wait for the server to accept
+            the connection or to send data, None to wait forever
+
+        Raises:
+            requests.ConnectionError or requests.Timeout if the request failed
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """Release the connections of the transport."""
+
+
+class RequestsTransport(Transport):
+    """Send requests with a requests.Session pooling its connections."""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
+        """
+        Args:
+            pool_size: max number of connections kept in the pool
+            keep_alive: whether connections should be reused between requests
+        """
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def request(self, verb, url, params, data, headers, stream=False,
+                timeout=None):
+        return self.session.request(verb, url, params=params, data=data,
+                                    headers=headers, stream=stream,
+                                    timeout=timeout)
+
+    def close(self):
+        self.session.close()
+
+
+class Urllib3Transport(Transport):
+    """Send requests with a urllib3.PoolManager."""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
+        """
+        Args:
+            pool_size: max number of connections kept per host
+            keep_alive: whether connections should be reused between requests
+        """
+        import urllib3
+        self._errors = urllib3.exceptions
+        self._pool = urllib3.PoolManager(maxsize=pool_size, retries=False)
+        self._keep_alive = keep_alive
+
+    def request(self, verb, url, params, data, headers, stream=False,
+                timeout=None):
+        url = _full_url(url, params)
+        if not self._keep_alive:
+            headers = dict(headers, Connection="close")
+        start = time.time()
+        try:
+            response = self._pool.request(verb, url, body=_body(data),
+                                          headers=headers,
+                                          preload_content=not stream,
+                                          timeout=timeout)
+        except self._errors.NewConnectionError as error:
+            # It is a subclass of ConnectTimeoutError in urllib3
+            raise requests.ConnectionError(error)
+        except self._errors.TimeoutError as error:
+            raise requests.Timeout(error)
+        except self._errors.HTTPError as error:
+            raise requests.ConnectionError(error)
+        if stream:
+            return _response(url, response.status, response.headers,
+                             time.time() - start, raw=response)
+        return _response(url, response.status, response.headers,
+                         time.time() - start, content=response.data)
+
+    def close(self):
+        self._pool.clear()
+
+
+class Http2Transport(Transport):
+    """Send requests with an httpx.Client speaking HTTP/2, concurrent
+    requests to a host sharing one connection. Raises ImportError if httpx or
+    h2 are not installed.
+
+    HTTP/2 is negotiated over TLS, plain http urls fall back on HTTP/1.1.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
+        """
+        Args:
+            pool_size: max number of connections kept per host, a single
+            connection is enough for HTTP/2 servers
+            keep_alive: whether connections should be reused between requests
+        """
+        import httpx
+        self._errors = httpx
+        self._client = httpx.Client(http2=True, limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size if keep_alive else 0))
+
+    def request(self, verb, url, params, data, headers, stream=False,
+                timeout=None):
+        http_request = self._client.build_request(
+            verb, url, params=params, content=_body(data), headers=headers,
+            timeout=timeout)
+        start = time.time()
+        try:
+            response = self._client.send(http_request, stream=stream)
+            elapsed = time.time() - start
+            if stream:
+                raw = _ChunkReader(response.iter_bytes(), response.close)
+                return _response(str(response.url), response.status_code,
+                                 response.headers, elapsed, raw=raw)
+            return _response(str(response.url), response.status_code,
+                             response.headers, elapsed,
+                             content=response.content)
+        except self._errors.TimeoutException as error:
+            raise requests.Timeout(error)
+        except self._errors.TransportError as error:
+            raise requests.ConnectionError(error)
+
+    def close(self):
+        self._client.close()
+
+
+class MemoryTransport(Transport):
+    """Answer requests with an application called in process."""
+
+    def __init__(self, app):
+        """
+        Args:
+            app: function taking the verb, the url, the headers and the body
+            of a request and returning the status, the headers and the body of
+            its response, e.g. a FakeApp
+        """
+        self._app = app
+
+    def request(self, verb, url, params, data, headers, stream=False,
+                timeout=None):
+        url = _full_url(url, params)
+        start = time.time()
+        (status, response_headers, content) = self._app(verb, url, headers,
+                                                        _body(data) or b"")
+        return _response(url, status, response_headers, time.time() - start,
+                         content=content)
+
+
+# Transports selectable by name
+TRANSPORTS = {"requests": RequestsTransport, "urllib3": Urllib3Transport,
+              "http2": Http2Transport}
+
+_TRANSPORTS = {}
+_TRANSPORTS_LOCK = threading.Lock()
+
+
+def get_transport(name, api_key, pool_size=DEFAULT_POOL_SIZE,
+                  keep_alive=True):
+    """Return the transport shared by every client using the same api key and
+    pool options, creating it on first use.
+
+    Args:
+        name: one of TRANSPORTS
+        api_key: the AgileZen api key
+        pool_size: max number of connections kept in the pool
+        keep_alive: whether connections should be reused between requests
+
+    Raises:
+        ValueError if the transport is unknown
+        ImportError if the library of the transport is not installed
+    """
+    if name not in TRANSPORTS:
+        raise ValueError("Unknown transport '%s', use one of %s"
+                         % (name, ", ".join(sorted(TRANSPORTS))))
+    key = (name, api_key, pool_size, keep_alive)
+    with _TRANSPORTS_LOCK:
+        transport = _TRANSPORTS.get(key)
+        if transport is None:
+            transport = _TRANSPORTS[key] = TRANSPORTS[name](pool_size,
+                                                            keep_alive)
+        return transport
+
+
+def close_transports():
+    """Close every shared transport and release their pooled connections."""
+    with _TRANSPORTS_LOCK:
+        for transport in _TRANSPORTS.values():
+            transport.close()
+        _TRANSPORTS.clear()
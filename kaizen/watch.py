@@ -0,0 +1,182 @@
+"""Watch the stories of a project and yield what changed between polls.
+
+The watcher keeps a fingerprint of the last snapshot, the id and a hash of
+every story, rather than the stories themselves. A poll only lists the
+stories updated since the most recent update seen, with a 'where' filter,
+and counts the stories of the project: a full listing is only needed when
+the count reveals deleted stories. Polling speeds up while the project
+changes and slows down while it is quiet:
+
+    for change in ZenRequest(api_key).projects(12).iter_changes():
+        print(change.kind, change.story_id)
+
+The polls repeat the same requests while the project is quiet: given a
+client with a DiskCache they are sent as conditional requests and the API
+answers 304 Not Modified without a body. Every change starts a new filter,
+so the cache should drop the responses no longer polled, as the watch
+command does:
+
+    cache = DiskCache(WATCH_CACHE_DIRECTORY, max_age=2 * max_interval)
+    client = ApiClient(api_key, disk_cache=cache)
+    ZenRequest(api_key, client).projects(12).iter_changes(
+        max_interval=max_interval)
+"""
+import json
+import time
+import zlib
+
+from kaizen.pagination import DEFAULT_PAGE_SIZE
+
+ADDED = "added"
+CHANGED = "changed"
+REMOVED = "removed"
+DEFAULT_MIN_INTERVAL = 5
+DEFAULT_MAX_INTERVAL = 300
+# Kept apart from the responses cached for other commands
+WATCH_CACHE_DIRECTORY = "~/.kaizen/watch-cache"
+# Factors applied to the interval after a poll with and without changes
+_SPEED_UP = 0.5
+_SLOW_DOWN = 1.5
+
+
+def fingerprint(story):
+    """Return a hash of the story, changed whenever one of its fields is."""
+    return zlib.crc32(json.dumps(story, sort_keys=True).encode("utf-8"))
+
+
+class StoryChange(object):
+    """A story added, changed or removed, story being None when removed."""
+
+    __slots__ = ("kind", "story_id", "story")
+
+    def __init__(self, kind, story_id, story=None):
+        self.kind = kind
+        self.story_id = story_id
+        self.story = story
+
+    def __eq__(self, other):
+        return isinstance(other, StoryChange) and \
+            (self.kind, self.story_id, self.story) == \
+            (other.kind, other.story_id, other.story)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "StoryChange(%r, %r)" % (self.kind, self.story_id)
+
+    def to_dict(self):
+        return {"kind": self.kind, "id": self.story_id, "story": self.story}
+
+
+class StoryWatcher(object):
+    """Diff the stories of a project between polls."""
+
+    def __init__(self, project_request, size=DEFAULT_PAGE_SIZE, workers=1,
+                 min_interval=DEFAULT_MIN_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL):
+        """
+        Args:
+            project_request: the ProjectRequest of the project to watch
+            size: number of stories per page
+            workers: number of pages fetched in parallel
+            min_interval: min number of seconds between two polls
+            max_interval: max number of seconds between two polls
+        """
+        self._stories = project_request.stories()
+        self._size = size
+        self._workers = workers
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self.interval = min_interval
+        self._fingerprints = None
+        self._last_update = None
+
+    def _list(self, stories):
+        return stories.iter_items(self._size, workers=self._workers)
+
+    def _diff(self, stories):
+        """Update the fingerprints with the stories and return the changes."""
+        changes = []
+        for story in stories:
+            story_id = story["id"]
+            previous = self._fingerprints.get(story_id)
+            current = fingerprint(story)
+            if previous != current:
+                changes.append(StoryChange(
+                    ADDED if previous is None else CHANGED, story_id, story))
+                self._fingerprints[story_id] = current
+            update_time = story.get("updateTime")
+            if update_time and (self._last_update is None
+                                or update_time > self._last_update):
+                self._last_update = update_time
+        return changes
+
+    def snapshot(self):
+        """Take the first snapshot of the project, every story being added.
+
+        Returns:
+            the list of StoryChange of every story
+        """
+        self._fingerprints = {}
+        self._last_update = None
+        return self._diff(self._list(self._stories))
+
+    def poll(self):
+        """Return the StoryChange since the previous poll, taking a snapshot
+        first if there is none.
+        """
+        if self._fingerprints is None:
+            self.snapshot()
+            return []
+        stories = self._stories
+        if self._last_update is not None:
+            stories = stories.where("updateTime:>=%s" % self._last_update)
+        changes = self._diff(self._list(stories))
+        total = self._stories.paginate(1, 1).send().get("totalItems")
+        if total is not None and total != len(self._fingerprints):
+            # Stories were deleted, find which ones from a full listing
+            seen = set()
+            for story in self._list(self._stories):
+                seen.add(story["id"])
+                changes.extend(self._diff([story]))
+            for story_id in set(self._fingerprints) - seen:
+                del self._fingerprints[story_id]
+                changes.append(StoryChange(REMOVED, story_id))
+        self._adapt(changes)
+        return changes
+
+    def _adapt(self, changes):
+        """Poll more often while the project changes, less when it doesn't."""
+        factor = _SPEED_UP if changes else _SLOW_DOWN
+        self.interval = min(self._max_interval,
+                            max(self._min_interval, self.interval * factor))
+
+
+def iter_changes(project_request, size=DEFAULT_PAGE_SIZE, workers=1,
+                 min_interval=DEFAULT_MIN_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL, initial=False, polls=None,
+                 sleep=time.sleep):
+    """Yield the StoryChange of the project's stories as they are polled.
+
+    Args:
+        project_request: the ProjectRequest of the project to watch
+        size: number of stories per page
+        workers: number of pages fetched in parallel
+        min_interval: min number of seconds between two polls
+        max_interval: max number of seconds between two polls
+        initial: yield every story of the first snapshot as added
+        polls: number of polls after the snapshot, None to poll forever
+        sleep: function waiting for the given number of seconds
+    """
+    watcher = StoryWatcher(project_request, size, workers, min_interval,
+                           max_interval)
+    for change in watcher.snapshot():
+        if initial:
+            yield change
+    poll = 0
+    while polls is None or poll < polls:
+        sleep(watcher.interval)
+        for change in watcher.poll():
+            yield change
+        poll += 1
@@ -33,7 +33,8 @@ setup(
     install_requires=[
         "requests",
         "parse_this",
-        "pyyaml"
+        "pyyaml",
+        "futures; python_version < '3.2'",
     ],
     entry_points={
         # Console script entry points will result in commandline
@@ -0,0 +1,59 @@
+import asyncio
+import json
+import requests
+import responses
+import unittest
+
+from kaizen.aio import AsyncApiClient, gather
+from kaizen.api import ZenRequest
+from kaizen.request import Request, VERBS
+
+
+class AsyncApiClientTest(unittest.TestCase):
+
+    @responses.activate
+    def test_send_request(self):
+        items = {"items": [1, 2]}
+        request = Request().update_url("fake_url").update_verb(VERBS.GET)
+        responses.add(responses.GET, "https://agilezen.com/api/v1/fake_url",
+                      body=json.dumps(items), status=200,
+                      content_type="application/json")
+        client = AsyncApiClient("fake_api_key")
+        self.assertEqual(asyncio.run(client.send_request(request)), items)
+
+    @responses.activate
+    def test_send_request_raises(self):
+        request = Request().update_url("fake_url").update_verb(VERBS.GET)
+        responses.add(responses.GET, "https://agilezen.com/api/v1/fake_url",
+                      status=404, content_type="application/json")
+        client = AsyncApiClient("fake_api_key")
+        self.assertRaises(requests.HTTPError, asyncio.run,
+                          client.send_request(request))
+
+
+class SendAsyncTest(unittest.TestCase):
+
+    @responses.activate
+    def test_send_async(self):
+        responses.add(responses.GET,
+                      "https://agilezen.com/api/v1/projects/12/stories/",
+                      body=json.dumps({"items": []}), status=200,
+                      content_type="application/json")
+        request = ZenRequest("fake_key").projects(12).stories()
+        self.assertEqual(asyncio.run(request.send_async()), {"items": []})
+
+    @responses.activate
+    def test_gather_keeps_order(self):
+        for project_id in range(5):
+            url = "https://agilezen.com/api/v1/projects/%s" % project_id
+            responses.add(responses.GET, url,
+                          body=json.dumps({"id": project_id}), status=200,
+                          content_type="application/json")
+        zen_request = ZenRequest("fake_key")
+        results = asyncio.run(gather(*[zen_request.projects(project_id)
+                                       for project_id in range(5)], limit=2))
+        self.assertEqual([result["id"] for result in results], list(range(5)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -39,6 +39,12 @@ class ApiRequestTest(unittest.TestCase):
 
 class ZenRequestTest(unittest.TestCase):
 
+    def test_requests_share_client_per_api_key(self):
+        project = ZenRequest("fake_key").projects(12)
+        self.assertIs(project.get_client(), ZenRequest("fake_key").get_client())
+        self.assertIs(project.stories(42).get_client(), project.get_client())
+        self.assertIs(project.phases().get_client(), project.get_client())
+
     def test_projects_return_project_request(self):
         self.assertEqual(type(ZenRequest("fake_key").projects()),
                          ProjectRequest)
@@ -82,6 +88,7 @@ class ProjectRequestTest(unittest.TestCase):
         project_request = ProjectRequest.from_zen_request(zen_request)
         self.assertEqual(project_request.get_api_key(),
                          zen_request.get_api_key())
+        self.assertIs(project_request.get_client(), zen_request.get_client())
         self.assertEqual(project_request.url, "/fake_url/projects/")
         self.assertEqual(project_request.verb, VERBS.POST)
         self.assertEqual(project_request.params, {"k": "v"})
@@ -190,6 +197,14 @@ class StoryRequestTest(unittest.TestCase):
                       content_type="application/json", status=200, body="{}")
         story_request.update(status="blocked", blocked_reason="Why not")
 
+    def test_update_data(self):
+        story_request = ZenRequest("fake_key").projects(12).stories(42)
+        update_request = story_request.update(text="Story", status="blocked")
+        self.assertEqual({"text": "Story", "status": "blocked"},
+                         update_request.data)
+        self.assertEqual(update_request.verb, VERBS.PUT)
+        self.assertEqual(story_request.data, {})
+
 
 if __name__ == "__main__":
     unittest.main()
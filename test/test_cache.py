@@ -0,0 +1,152 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from kaizen.cache import DiskCache, ResponseCache, cache_key
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class CacheKeyTest(unittest.TestCase):
+
+    def test_params_order_does_not_matter(self):
+        self.assertEqual(cache_key("GET", "/projects", {"a": 1, "b": 2}),
+                         cache_key("GET", "/projects", {"b": 2, "a": 1}))
+
+    def test_params_are_part_of_the_key(self):
+        self.assertNotEqual(cache_key("GET", "/projects", {"page": 1}),
+                            cache_key("GET", "/projects", {"page": 2}))
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._clock = FakeClock()
+        self._cache = ResponseCache(max_size=2, ttl=10, clock=self._clock)
+
+    def test_get_missing(self):
+        self.assertIsNone(self._cache.get(cache_key("GET", "/projects", {})))
+        self.assertEqual(self._cache.misses, 1)
+
+    def test_get_fresh(self):
+        key = cache_key("GET", "/projects", {})
+        self._cache.set(key, {"items": []})
+        self.assertEqual(self._cache.get(key), {"items": []})
+        self.assertEqual(self._cache.hits, 1)
+
+    def test_get_expired(self):
+        key = cache_key("GET", "/projects", {})
+        self._cache.set(key, {"items": []})
+        self._clock.now = 10
+        self.assertIsNone(self._cache.get(key))
+        self.assertEqual(len(self._cache), 0)
+
+    def test_least_recently_used_is_evicted(self):
+        keys = [cache_key("GET", "/projects/%s" % i, {}) for i in range(3)]
+        self._cache.set(keys[0], 0)
+        self._cache.set(keys[1], 1)
+        self._cache.get(keys[0])
+        self._cache.set(keys[2], 2)
+        self.assertEqual(self._cache.get(keys[0]), 0)
+        self.assertIsNone(self._cache.get(keys[1]))
+        self.assertEqual(self._cache.get(keys[2]), 2)
+        self.assertEqual(self._cache.stats(), {"hits": 3, "misses": 1,
+                                               "evictions": 1, "size": 2,
+                                               "bytes": 0})
+
+    def test_max_bytes(self):
+        cache = ResponseCache(max_bytes=100)
+        keys = [cache_key("GET", "/projects/%s" % i, {}) for i in range(3)]
+        cache.set(keys[0], 0, 40)
+        cache.set(keys[1], 1, 40)
+        cache.set(keys[2], 2, 40)
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertEqual(cache.get(keys[2]), 2)
+        self.assertEqual(cache.stats()["bytes"], 80)
+        cache.set(keys[1], 1, 10)
+        self.assertEqual(cache.stats()["bytes"], 50)
+        cache.invalidate("/projects/2")
+        self.assertEqual(cache.stats()["bytes"], 10)
+
+    def test_response_larger_than_max_bytes_is_not_cached(self):
+        cache = ResponseCache(max_bytes=100)
+        key = cache_key("GET", "/projects", {})
+        cache.set(key, {"items": []}, 101)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.stats()["evictions"], 0)
+
+    def test_invalidate_related_resources(self):
+        cache = ResponseCache()
+        for url in ["/projects/", "/projects/12", "/projects/12/stories/",
+                    "/projects/13/phases/"]:
+            cache.set(cache_key("GET", url, {}), url)
+        cache.invalidate("/projects/12/stories/42")
+        self.assertEqual(len(cache), 1)
+        self.assertIsNotNone(cache.get(cache_key("GET", "/projects/13/phases/",
+                                                 {})))
+
+
+class DiskCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._cache = DiskCache(self._directory)
+        self._key = cache_key("GET", "/projects", {})
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def test_missing_response(self):
+        self.assertEqual(self._cache.validators(self._key), {})
+        self.assertIsNone(self._cache.load(self._key))
+
+    def test_store_and_load(self):
+        self._cache.store(self._key, {"ETag": '"v1"',
+                                      "Last-Modified": "yesterday"},
+                          b'{"items": [1]}')
+        self.assertEqual(self._cache.validators(self._key),
+                         {"If-None-Match": '"v1"',
+                          "If-Modified-Since": "yesterday"})
+        self.assertEqual(self._cache.load(self._key), {"items": [1]})
+
+    def _age(self, key, seconds):
+        path = self._cache._get_path(key)
+        mtime = time.time() - seconds
+        os.utime(path, (mtime, mtime))
+
+    def test_prune(self):
+        keys = [cache_key("GET", "/projects/%s" % i, {}) for i in range(3)]
+        for key in keys:
+            self._cache.store(key, {"ETag": '"v1"'}, b'{"items": [1]}')
+            self._age(key, 100)
+        self._cache.load(keys[0])
+        self.assertEqual(self._cache.prune(50), 2)
+        self.assertEqual(self._cache.load(keys[0]), {"items": [1]})
+        self.assertIsNone(self._cache.load(keys[1]))
+
+    def test_store_prunes_with_max_age(self):
+        cache = DiskCache(self._directory, max_age=50)
+        cache.store(self._key, {"ETag": '"v1"'}, b'{"items": [1]}')
+        self._age(self._key, 100)
+        cache._pruned_at -= 100
+        key = cache_key("GET", "/projects/12", {})
+        cache.store(key, {"ETag": '"v1"'}, b'{"items": [2]}')
+        self.assertIsNone(cache.load(self._key))
+        self.assertEqual(cache.load(key), {"items": [2]})
+
+    def test_response_without_validators_is_not_stored(self):
+        self._cache.store(self._key, {}, b'{"items": [1]}')
+        self.assertIsNone(self._cache.load(self._key))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,33 @@
-from kaizen.cli import ZenApi, get_config, KaizenConfigError
+from concurrent.futures import ThreadPoolExecutor
+from kaizen.cli import (CONFIG_CACHE_ENV_VARIABLE, ZenApi, get_config,
+                        KaizenConfigError, _should_forward)
 import json
 import os
 import responses
+import shutil
+import subprocess
+import sys
+import tempfile
 import unittest
 
 
 CONFIG_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)),
                            "config_test.yaml")
+_CONFIG_CACHE = None
+
+
+def setUpModule():
+    # Don't cache the test configs in the user's home directory
+    global _CONFIG_CACHE
+    _CONFIG_CACHE = os.environ.get(CONFIG_CACHE_ENV_VARIABLE)
+    os.environ[CONFIG_CACHE_ENV_VARIABLE] = ""
+
+
+def tearDownModule():
+    if _CONFIG_CACHE is None:
+        del os.environ[CONFIG_CACHE_ENV_VARIABLE]
+    else:
+        os.environ[CONFIG_CACHE_ENV_VARIABLE] = _CONFIG_CACHE
 
 
 class ZenApiTest(unittest.TestCase):
@@ -44,6 +65,14 @@ class ZenApiTest(unittest.TestCase):
                       body=json.dumps(phases), match_querystring=True)
         self.assertRaises(ValueError, api._get_next_phase_id, "other_phase", 12)
 
+    def test_zen_request_is_created_once(self):
+        api = ZenApi(CONFIG_PATH)
+        executor = ThreadPoolExecutor(max_workers=8)
+        zen_requests = list(executor.map(lambda _: api._zen_request,
+                                         range(32)))
+        executor.shutdown(wait=True)
+        self.assertEqual(len(set(map(id, zen_requests))), 1)
+
 
 class ConfigTest(unittest.TestCase):
 
@@ -62,3 +91,64 @@ class ConfigTest(unittest.TestCase):
         malformed_file = os.path.abspath(__file__)
         self.assertRaises(KaizenConfigError, get_config, malformed_file)
 
+
+class ConfigCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._config_path = os.path.join(self._directory, "kaizen.yaml")
+        self._cache_path = os.path.join(self._directory, "cache.json")
+        self._write_config("api_key: first")
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def _write_config(self, content, mtime=1000):
+        with open(self._config_path, "w") as config_file:
+            config_file.write(content)
+        os.utime(self._config_path, (mtime, mtime))
+
+    def test_config_is_cached(self):
+        get_config(self._config_path, self._cache_path)
+        with open(self._cache_path) as cache_file:
+            cache = json.load(cache_file)
+        self.assertEqual(cache[self._config_path]["config"],
+                         {"api_key": "first"})
+
+    def test_cache_is_used(self):
+        get_config(self._config_path, self._cache_path)
+        with open(self._cache_path) as cache_file:
+            cache = json.load(cache_file)
+        cache[self._config_path]["config"] = {"api_key": "cached"}
+        with open(self._cache_path, "w") as cache_file:
+            json.dump(cache, cache_file)
+        self.assertEqual(get_config(self._config_path, self._cache_path),
+                         {"api_key": "cached"})
+
+    def test_modified_config_is_parsed_again(self):
+        get_config(self._config_path, self._cache_path)
+        self._write_config("api_key: second", mtime=2000)
+        self.assertEqual(get_config(self._config_path, self._cache_path),
+                         {"api_key": "second"})
+
+    def test_cli_does_not_import_requests_at_startup(self):
+        code = ("import sys; from kaizen.cli import ZenApi; ZenApi(%r); "
+                "print('requests' in sys.modules)" % CONFIG_PATH)
+        output = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(output.strip(), b"False")
+
+
+class RunCliTest(unittest.TestCase):
+
+    def test_commands_are_forwarded_to_the_daemon(self):
+        self.assertTrue(_should_forward(["list-stories", "--page", "2"]))
+
+    def test_daemon_and_help_are_run_locally(self):
+        self.assertFalse(_should_forward(["daemon"]))
+        self.assertFalse(_should_forward(["watch", "--project-id", "1"]))
+        self.assertFalse(_should_forward(["export", "--path", "out.jsonl"]))
+        self.assertFalse(_should_forward(["--help"]))
+        self.assertFalse(_should_forward(["--config_path", "path",
+                                          "list-projects"]))
+        self.assertFalse(_should_forward(["--config_path=path",
+                                          "list-projects"]))
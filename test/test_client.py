@@ -1,10 +1,16 @@
+import gc
 import json
 import requests
 import responses
+import shutil
+import tempfile
 import unittest
 
-from kaizen.client import ApiClient
+from kaizen.cache import DiskCache, ResponseCache
+from kaizen.client import (_CLIENTS, ApiClient, clear_clients, get_client,
+                           get_session)
 from kaizen.request import Request, VERBS
+from kaizen.retry import RetryPolicy
 
 
 class ApiClientTest(unittest.TestCase):
@@ -36,5 +42,148 @@ class ApiClientTest(unittest.TestCase):
         self.assertRaises(requests.HTTPError, self._client.send_request,
                           request)
 
+    def test_clients_share_session_per_api_key(self):
+        session = ApiClient("fake_api_key")._transport.session
+        self.assertIs(self._client._transport.session, session)
+        self.assertIs(get_session("fake_api_key"), session)
+
+    def test_clients_do_not_share_session_across_api_keys(self):
+        session = ApiClient("other_api_key")._transport.session
+        self.assertIsNot(self._client._transport.session, session)
+
+    def test_session_pool_size(self):
+        session = ApiClient("fake_api_key", pool_size=42)._transport.session
+        self.assertEqual(session.get_adapter(ApiClient.API_URL)._pool_maxsize,
+                         42)
+
+
+class ClientRegistryTest(unittest.TestCase):
+
+    def tearDown(self):
+        clear_clients()
+
+    def test_client_shared_per_api_key(self):
+        self.assertIs(get_client("fake_api_key"), get_client("fake_api_key"))
+        self.assertIsNot(get_client("fake_api_key"),
+                         get_client("other_api_key"))
+
+    def test_client_shared_per_options(self):
+        cache = ResponseCache()
+        client = get_client("fake_api_key", cache=cache, hooks=[])
+        self.assertIs(get_client("fake_api_key", cache=cache, hooks=[]),
+                      client)
+        self.assertIsNot(get_client("fake_api_key", cache=ResponseCache()),
+                         client)
+        self.assertIsNot(get_client("fake_api_key", pool_size=42), client)
+
+    def test_unused_clients_are_forgotten(self):
+        get_client("fake_api_key", cache=ResponseCache())
+        gc.collect()
+        self.assertEqual(len(_CLIENTS), 0)
+        client = get_client("fake_api_key")
+        gc.collect()
+        self.assertIs(get_client("fake_api_key"), client)
+
+    def test_clear_clients(self):
+        client = get_client("fake_api_key")
+        clear_clients()
+        self.assertIsNot(get_client("fake_api_key"), client)
+
+
+class ApiClientRetryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._delays = []
+        retry = RetryPolicy(max_retries=2, sleep=self._delays.append)
+        self._client = ApiClient("fake_api_key", retry=retry)
+
+    @responses.activate
+    def test_retry_until_success(self):
+        request = Request().update_url("fake_url")
+        responses.add(responses.GET, "https://agilezen.com/api/v1/fake_url",
+                      status=429, headers={"Retry-After": "2"})
+        responses.add(responses.GET, "https://agilezen.com/api/v1/fake_url",
+                      body=json.dumps({"id": 1}), status=200,
+                      content_type="application/json")
+        self.assertEqual(self._client.send_request(request), {"id": 1})
+        self.assertEqual(self._delays, [2])
+
+    @responses.activate
+    def test_give_up_after_max_retries(self):
+        request = Request().update_url("fake_url")
+        responses.add(responses.GET, "https://agilezen.com/api/v1/fake_url",
+                      status=503)
+        self.assertRaises(requests.HTTPError, self._client.send_request,
+                          request)
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_post_is_not_retried(self):
+        request = Request().update_url("fake_url").update_verb(VERBS.POST)
+        responses.add(responses.POST, "https://agilezen.com/api/v1/fake_url",
+                      status=503)
+        self.assertRaises(requests.HTTPError, self._client.send_request,
+                          request)
+        self.assertEqual(len(responses.calls), 1)
+
+
+class ApiClientCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._client = ApiClient("fake_api_key", cache=ResponseCache())
+
+    @responses.activate
+    def test_get_is_cached(self):
+        request = Request().update_url("fake_url")
+        responses.add(responses.GET, "https://agilezen.com/api/v1/fake_url",
+                      body=json.dumps({"id": 1}), status=200,
+                      content_type="application/json")
+        self._client.send_request(request)
+        self.assertEqual(self._client.send_request(request), {"id": 1})
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(self._client._cache.stats()["bytes"],
+                         len(json.dumps({"id": 1})))
+
+    @responses.activate
+    def test_write_invalidates_cache(self):
+        request = Request().update_url("fake_url")
+        responses.add(responses.GET, "https://agilezen.com/api/v1/fake_url",
+                      body=json.dumps({"id": 1}), status=200,
+                      content_type="application/json")
+        responses.add(responses.PUT, "https://agilezen.com/api/v1/fake_url",
+                      body=json.dumps({"id": 1}), status=200,
+                      content_type="application/json")
+        self._client.send_request(request)
+        self._client.send_request(Request().update_url("fake_url")
+                                           .update_verb(VERBS.PUT))
+        self._client.send_request(request)
+        self.assertEqual(len(responses.calls), 3)
+
+
+class ApiClientDiskCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._client = ApiClient("fake_api_key",
+                                 disk_cache=DiskCache(self._directory))
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    @responses.activate
+    def test_not_modified_is_served_from_disk(self):
+        request = Request().update_url("fake_url")
+        responses.add(responses.GET, "https://agilezen.com/api/v1/fake_url",
+                      body=json.dumps({"id": 1}), status=200,
+                      content_type="application/json",
+                      headers={"ETag": '"v1"'})
+        responses.add(responses.GET, "https://agilezen.com/api/v1/fake_url",
+                      status=304)
+        self.assertEqual(self._client.send_request(request), {"id": 1})
+        self.assertEqual(self._client.send_request(request), {"id": 1})
+        self.assertNotIn("If-None-Match", responses.calls[0].request.headers)
+        self.assertEqual(responses.calls[1].request.headers["If-None-Match"],
+                         '"v1"')
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import unittest
+
+from kaizen.api import ZenRequest
+from kaizen.client import ApiClient
+from kaizen.coalesce import RequestCoalescer
+from kaizen.deadline import Deadline, DeadlineExceeded
+from kaizen.fakeserver import FakeDataset, FakeServer
+
+
+class RequestCoalescerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._coalescer = RequestCoalescer()
+        self._release = threading.Event()
+        self._calls = []
+
+    def _call(self, result):
+        def call():
+            self._calls.append(result)
+            self._release.wait(5)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return call
+
+    def _run_concurrently(self, key, result, count=5):
+        executor = ThreadPoolExecutor(max_workers=count)
+        futures = [executor.submit(self._coalescer.do, key,
+                                   self._call(result))
+                   for _ in range(count)]
+        while self._coalescer.stats()["saved"] < count - 1:
+            time.sleep(0.001)
+        self._release.set()
+        executor.shutdown(wait=True)
+        return futures
+
+    def test_concurrent_calls_are_shared(self):
+        futures = self._run_concurrently("key", {"id": 1})
+        self.assertEqual([future.result() for future in futures],
+                         [{"id": 1}] * 5)
+        self.assertEqual(self._calls, [{"id": 1}])
+        self.assertEqual(self._coalescer.stats(), {"calls": 1, "saved": 4})
+
+    def test_errors_are_shared(self):
+        futures = self._run_concurrently("key", ValueError("boom"))
+        for future in futures:
+            self.assertRaises(ValueError, future.result)
+        self.assertEqual(len(self._calls), 1)
+
+    def test_waiting_is_bounded_by_the_deadline(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        leader = executor.submit(self._coalescer.do, "key",
+                                 self._call({"id": 1}))
+        while not self._calls:
+            time.sleep(0.001)
+        start = time.time()
+        self.assertRaises(DeadlineExceeded, self._coalescer.do, "key",
+                          self._call({"id": 2}), Deadline(0.05))
+        self.assertLess(time.time() - start, 1)
+        self._release.set()
+        self.assertEqual(leader.result(), {"id": 1})
+        self.assertEqual(self._calls, [{"id": 1}])
+        executor.shutdown(wait=True)
+
+    def test_sequential_calls_are_not_shared(self):
+        self._release.set()
+        self._coalescer.do("key", self._call(1))
+        self._coalescer.do("key", self._call(2))
+        self.assertEqual(self._calls, [1, 2])
+        self.assertEqual(self._coalescer.saved, 0)
+
+
+class ApiClientCoalescingTest(unittest.TestCase):
+
+    def test_identical_gets_share_one_request(self):
+        coalescer = RequestCoalescer()
+        with FakeServer(FakeDataset(stories=1), latency=0.2) as server:
+            client = ApiClient("fake_key", api_url=server.api_url,
+                               coalescer=coalescer)
+            project_id = list(server.dataset.projects)[0]
+            phases = ZenRequest("fake_key", client).projects(project_id)\
+                .phases()
+            with ThreadPoolExecutor(max_workers=10) as executor:
+                responses = list(executor.map(lambda _: phases.send(),
+                                              range(10)))
+            self.assertEqual(server.request_count, 1)
+        self.assertEqual(len(responses[0]["items"]), 5)
+        self.assertEqual(coalescer.stats(), {"calls": 1, "saved": 9})
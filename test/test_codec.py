@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from kaizen.codec import ItemStream, JsonCodec, get_codec
+
+
+def chunked(document, size):
+    data = document.encode("utf-8")
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+class CodecTest(unittest.TestCase):
+
+    def test_get_codec_by_name(self):
+        self.assertEqual(get_codec("json").name, "json")
+
+    def test_get_unknown_codec(self):
+        self.assertRaises(ValueError, get_codec, "yaml")
+
+    def test_default_codec_round_trip(self):
+        codec = get_codec()
+        self.assertEqual(codec.loads(codec.dumps({"items": [1, "a"]})),
+                         {"items": [1, "a"]})
+
+    def test_json_codec_loads_bytes(self):
+        self.assertEqual(JsonCodec().loads(b'{"id": 1}'), {"id": 1})
+
+
+class ItemStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self._document = {"page": 1, "pageSize": 3, "totalPages": 2,
+                          "items": [{"id": 1, "text": u"caf\xe9"},
+                                    {"id": 2, "tags": [1, 2]}, 12345, None,
+                                    1.5e300, -2.25]}
+
+    def test_any_chunk_size(self):
+        document = json.dumps(self._document)
+        for size in [1, 2, 7, 1024]:
+            stream = ItemStream(chunked(document, size))
+            self.assertEqual(list(stream), self._document["items"])
+            self.assertEqual(stream.metadata, {"page": 1, "pageSize": 3,
+                                               "totalPages": 2})
+
+    def test_numbers_split_across_chunks(self):
+        document = '{"items":[1.5e300,2.25,-3,4E-2],"totalPages":12.5}'
+        for size in range(1, len(document) + 1):
+            stream = ItemStream(chunked(document, size))
+            self.assertEqual(list(stream), [1.5e300, 2.25, -3, 4E-2])
+            self.assertEqual(stream.metadata, {"totalPages": 12.5})
+
+    def test_metadata_after_items(self):
+        document = '{"items": [1, 2], "totalPages": 4}'
+        stream = ItemStream(chunked(document, 3))
+        self.assertEqual(list(stream), [1, 2])
+        self.assertEqual(stream.metadata, {"totalPages": 4})
+
+    def test_empty_documents(self):
+        self.assertEqual(list(ItemStream([b"{}"])), [])
+        self.assertEqual(list(ItemStream([b'{"items": [ ]}'])), [])
+
+    def test_close_is_called(self):
+        closed = []
+        list(ItemStream([b'{"items": [1]}'], close=lambda: closed.append(1)))
+        self.assertEqual(closed, [1])
+
+    def test_truncated_document(self):
+        self.assertRaises(ValueError, list,
+                          ItemStream(chunked('{"items": [{"id": 1}', 4)))
+
+    def test_invalid_document(self):
+        self.assertRaises(ValueError, list, ItemStream([b'["items"]']))
+
+
+if __name__ == "__main__":
+    unittest.main()
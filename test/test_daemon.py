@@ -0,0 +1,159 @@
+import os
+import shutil
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from kaizen.cli import CONFIG_CACHE_ENV_VARIABLE, ZenApi, run_cli
+from kaizen.daemon import (SOCKET_ENV_VARIABLE, DaemonError, InvalidArguments,
+                           ZenDaemon, forward, is_running, stop)
+from kaizen.fakeserver import FakeApp, FakeDataset
+from kaizen.records import Tag
+from kaizen.transport import MemoryTransport
+
+CONFIG_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)),
+                           "config_test.yaml")
+
+
+class FakeParser(object):
+    """Run the method named by the first argument with the other ones."""
+
+    def call(self, args, instance):
+        return getattr(instance, args[0])(*args[1:])
+
+
+class FakeApi(object):
+
+    parser = FakeParser()
+
+    def echo(self, *args):
+        return list(args)
+
+    def fail(self):
+        raise ValueError("boom")
+
+    def usage(self):
+        raise SystemExit(2)
+
+    def tag(self):
+        return Tag.from_dict({"id": 1, "name": "bug"})
+
+
+class DaemonTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._socket_path = os.path.join(self._directory, "daemon.sock")
+        self._daemon = ZenDaemon(FakeApi(), self._socket_path)
+        self._thread = threading.Thread(target=self._daemon.serve_forever)
+        self._thread.start()
+
+    def tearDown(self):
+        if is_running(self._socket_path):
+            stop(self._socket_path)
+        self._thread.join()
+        shutil.rmtree(self._directory)
+
+    def test_forward(self):
+        self.assertEqual(forward(["echo", "a", "b"], self._socket_path),
+                         ["a", "b"])
+
+    def test_records_are_sent_as_dicts(self):
+        self.assertEqual(forward(["tag"], self._socket_path),
+                         {"id": 1, "name": "bug"})
+
+    def test_errors_are_forwarded(self):
+        self.assertRaises(DaemonError, forward, ["fail"], self._socket_path)
+
+    def test_invalid_arguments_are_forwarded(self):
+        self.assertRaises(InvalidArguments, forward, ["usage"],
+                          self._socket_path)
+
+    def test_cli_prints_errors(self):
+        (argv, stderr, environ) = (sys.argv, sys.stderr, dict(os.environ))
+        os.environ[SOCKET_ENV_VARIABLE] = self._socket_path
+        sys.argv = ["kaizen", "fail"]
+        sys.stderr = StringIO()
+        try:
+            with self.assertRaises(SystemExit) as context:
+                run_cli()
+            output = sys.stderr.getvalue()
+        finally:
+            (sys.argv, sys.stderr) = (argv, stderr)
+            os.environ.clear()
+            os.environ.update(environ)
+        self.assertEqual(context.exception.code, 1)
+        self.assertEqual(output, "kaizen: error: ValueError: boom\n")
+
+    def test_stop_removes_the_socket(self):
+        stop(self._socket_path)
+        self._thread.join()
+        self.assertFalse(is_running(self._socket_path))
+        self.assertFalse(os.path.exists(self._socket_path))
+        self.assertRaises(socket.error, forward, ["echo"], self._socket_path)
+
+    def test_socket_is_private(self):
+        mode = stat.S_IMODE(os.stat(self._socket_path).st_mode)
+        self.assertEqual(mode, 0o600)
+
+    def test_directory_is_private(self):
+        socket_path = os.path.join(self._directory, "kaizen", "daemon.sock")
+        daemon = ZenDaemon(FakeApi(), socket_path)
+        daemon.stop_requested()
+        daemon.serve_forever()
+        mode = stat.S_IMODE(os.stat(os.path.dirname(socket_path)).st_mode)
+        self.assertEqual(mode, 0o700)
+
+    def test_only_one_daemon_per_socket(self):
+        self.assertRaises(DaemonError, ZenDaemon, FakeApi(), self._socket_path)
+
+
+@unittest.skipUnless(hasattr(ZenApi.parser, "call"),
+                     "parse_this does not provide parser.call")
+class ZenApiDaemonTest(unittest.TestCase):
+    """Commands parsed by the parser of ZenApi and run by the daemon."""
+
+    def setUp(self):
+        environ = dict(os.environ)
+        self.addCleanup(os.environ.update, environ)
+        self.addCleanup(os.environ.clear)
+        os.environ[CONFIG_CACHE_ENV_VARIABLE] = ""
+        self._directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._directory)
+        self._app = FakeApp(FakeDataset(stories=5))
+        self._project_id = list(self._app.dataset.projects)[0]
+        api = ZenApi(CONFIG_PATH)
+        api._config["transport"] = MemoryTransport(self._app)
+        self._socket_path = os.path.join(self._directory, "daemon.sock")
+        daemon = ZenDaemon(api, self._socket_path)
+        thread = threading.Thread(target=daemon.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(stop, self._socket_path)
+
+    def test_command(self):
+        stories = forward(["list-stories", "--project_id",
+                           str(self._project_id), "--size", "3"],
+                          self._socket_path)
+        self.assertEqual(len(stories["items"]), 3)
+        self.assertEqual(self._app.request_count, 1)
+
+    def test_records(self):
+        stories = forward(["list-stories", "--project_id",
+                           str(self._project_id), "--records"],
+                          self._socket_path)
+        self.assertEqual(sorted(story["id"] for story in stories["items"]),
+                         sorted(self._app.dataset.stories[self._project_id]))
+
+    def test_invalid_arguments(self):
+        self.assertRaises(InvalidArguments, forward,
+                          ["list-stories", "--page", "first"],
+                          self._socket_path)
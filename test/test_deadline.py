@@ -0,0 +1,132 @@
+import requests
+import time
+import unittest
+
+from kaizen.api import ZenRequest
+from kaizen.client import ApiClient
+from kaizen.deadline import Deadline, DeadlineExceeded
+from kaizen.fakeserver import FakeApp, FakeDataset, FakeServer
+from kaizen.hedge import HedgePolicy
+from kaizen.retry import RetryPolicy
+from kaizen.transport import MemoryTransport
+
+
+class SlowFirstTransport(MemoryTransport):
+    """Record the timeout of every request, the first one being slow."""
+
+    def __init__(self, app, delay):
+        super(SlowFirstTransport, self).__init__(app)
+        self._delay = delay
+        self.timeouts = []
+
+    def request(self, *args, **kwargs):
+        self.timeouts.append(kwargs["timeout"])
+        if len(self.timeouts) == 1:
+            time.sleep(self._delay)
+        return super(SlowFirstTransport, self).request(*args, **kwargs)
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class DeadlineTest(unittest.TestCase):
+
+    def setUp(self):
+        self._clock = FakeClock()
+        self._deadline = Deadline(10, clock=self._clock)
+
+    def test_remaining(self):
+        self._clock.now += 4
+        self.assertEqual(self._deadline.remaining(), 6)
+        self.assertFalse(self._deadline.expired())
+        self._clock.now += 7
+        self.assertEqual(self._deadline.remaining(), 0)
+        self.assertTrue(self._deadline.expired())
+
+    def test_timeout(self):
+        self.assertEqual(self._deadline.timeout(), 10)
+        self.assertEqual(self._deadline.timeout(3), 3)
+        self._clock.now += 8
+        self.assertEqual(self._deadline.timeout(3), 2)
+        self._clock.now += 2
+        self.assertRaises(DeadlineExceeded, self._deadline.timeout, 3)
+
+    def test_deadline_is_shared_by_derived_requests(self):
+        deadline = Deadline(10)
+        request = ZenRequest("fake_key").with_deadline(deadline)
+        stories = request.projects(12).stories()
+        self.assertIs(stories.deadline, deadline)
+        self.assertIs(stories.for_page(3).deadline, deadline)
+        self.assertIsNone(stories.with_deadline(None).deadline)
+        self.assertIsNone(ZenRequest("fake_key").deadline)
+
+
+class ClientDeadlineTest(unittest.TestCase):
+
+    def test_timeout(self):
+        with FakeServer(FakeDataset(stories=5), latency=0.5) as server:
+            client = ApiClient("fake_key", api_url=server.api_url,
+                               timeout=0.1)
+            projects = ZenRequest("fake_key", client).projects()
+            start = time.time()
+            self.assertRaises(requests.Timeout, projects.send)
+            self.assertLess(time.time() - start, 0.4)
+
+    def test_deadline_bounds_pagination(self):
+        with FakeServer(FakeDataset(stories=50), latency=0.05) as server:
+            client = ApiClient("fake_key", api_url=server.api_url)
+            project_id = list(server.dataset.projects)[0]
+            stories = ZenRequest("fake_key", client).with_deadline(0.12)\
+                .projects(project_id).stories()
+            start = time.time()
+            self.assertRaises(requests.Timeout, list,
+                              stories.iter_items(5, prefetch=False))
+            self.assertLess(time.time() - start, 0.3)
+
+    def test_expired_deadline_sends_nothing(self):
+        app = FakeApp(FakeDataset(stories=5))
+        client = ApiClient("fake_key", transport=MemoryTransport(app))
+        request = ZenRequest("fake_key", client).with_deadline(0).projects()
+        self.assertRaises(DeadlineExceeded, request.send)
+        self.assertEqual(app.request_count, 0)
+
+    def test_rate_limiter_wait_bounded_by_the_deadline(self):
+        app = FakeApp(FakeDataset(stories=5))
+        client = ApiClient("deadline_key", transport=MemoryTransport(app),
+                           rate_limit=1)
+        zen_request = ZenRequest("deadline_key", client)
+        zen_request.projects().send()
+        start = time.time()
+        self.assertRaises(DeadlineExceeded,
+                          zen_request.with_deadline(0.2).projects().send)
+        self.assertLess(time.time() - start, 0.1)
+        self.assertEqual(app.request_count, 1)
+
+    def test_hedge_timeout_is_the_time_left(self):
+        hedge = HedgePolicy(min_samples=1)
+        hedge.observe(0.05)
+        transport = SlowFirstTransport(FakeApp(FakeDataset(stories=5)), 0.3)
+        client = ApiClient("fake_key", transport=transport, hedge=hedge)
+        ZenRequest("fake_key", client).with_deadline(1).projects().send()
+        (first, second) = transport.timeouts
+        self.assertLessEqual(second, first - 0.05)
+
+    def test_no_retry_past_the_deadline(self):
+        sleeps = []
+        client = ApiClient(
+            "fake_key", transport=MemoryTransport(
+                lambda *args: (503, {}, b"{}")),
+            retry=RetryPolicy(backoff=60, sleep=sleeps.append))
+        request = ZenRequest("fake_key", client).with_deadline(5).projects()
+        # The first retry would be sent after at most 60s, possibly sooner
+        try:
+            request.send()
+        except requests.HTTPError:
+            pass
+        self.assertTrue(all(delay < 5 for delay in sleeps))
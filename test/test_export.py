@@ -0,0 +1,121 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from kaizen.api import ZenRequest
+from kaizen.client import ApiClient
+from kaizen.export import (COLUMNS, ExportError, export_stories,
+                           read_columnar)
+from kaizen.fakeserver import FakeDataset, FakeServer
+from kaizen.metrics import RequestHooks
+
+
+class FailAfter(RequestHooks):
+    """Fail every request once count requests have been sent."""
+
+    def __init__(self, count):
+        self.count = count
+
+    def before_send(self, event):
+        self.count -= 1
+        if self.count < 0:
+            raise IOError("connection lost")
+
+
+class ExportTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._server = FakeServer(FakeDataset(projects=2, stories=45)).start()
+        cls._project_ids = sorted(cls._server.dataset.projects)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._server.stop()
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def _zen_request(self, hooks=None):
+        client = ApiClient("fake_key", api_url=self._server.api_url,
+                           hooks=hooks)
+        return ZenRequest("fake_key", client)
+
+    def _path(self, name):
+        return os.path.join(self._directory, name)
+
+    def _story_ids(self):
+        return [story_id for project_id in self._project_ids
+                for story_id in self._server.dataset.stories[project_id]]
+
+    def test_jsonl(self):
+        path = self._path("stories.jsonl")
+        summary = export_stories(self._zen_request(), self._project_ids, path,
+                                 size=10)
+        self.assertEqual(summary, {"stories": 90, "pages": 10})
+        with open(path) as export_file:
+            stories = [json.loads(line) for line in export_file]
+        self.assertEqual([story["id"] for story in stories],
+                         self._story_ids())
+        self.assertIn("tasks", stories[0])
+        self.assertFalse(os.path.exists(path + ".progress"))
+
+    def test_gzip_csv(self):
+        path = self._path("stories.csv.gz")
+        export_stories(self._zen_request(), self._project_ids, path, "csv",
+                       compress=True, size=20)
+        with gzip.open(path, "rb") as export_file:
+            rows = list(csv.reader(io.StringIO(
+                export_file.read().decode("utf-8"))))
+        self.assertEqual(tuple(rows[0]), COLUMNS)
+        self.assertEqual([int(row[0]) for row in rows[1:]], self._story_ids())
+
+    def test_columnar(self):
+        path = self._path("stories.kzc")
+        export_stories(self._zen_request(), self._project_ids, path,
+                       "columnar", size=20)
+        with open(path, "rb") as export_file:
+            rows = list(read_columnar(export_file))
+        self.assertEqual([row["id"] for row in rows], self._story_ids())
+        story = self._server.dataset.stories[self._project_ids[0]][
+            rows[0]["id"]]
+        self.assertEqual(rows[0]["phase_name"], story["phase"]["name"])
+        self.assertEqual(rows[0]["tasks"], len(story["tasks"]))
+
+    def test_resume(self):
+        for compress in [False, True]:
+            path = self._path("stories-%s.csv" % compress)
+            # Fails fetching the third page of the second project
+            self.assertRaises(IOError, export_stories,
+                              self._zen_request([FailAfter(7)]),
+                              self._project_ids, path, "csv", compress,
+                              size=10, workers=1)
+            self.assertTrue(os.path.exists(path + ".progress"))
+            summary = export_stories(self._zen_request(), self._project_ids,
+                                     path, "csv", compress, size=10)
+            self.assertEqual(summary["pages"], 3)
+            with (gzip.open if compress else open)(path, "rb") as export_file:
+                rows = list(csv.reader(io.StringIO(
+                    export_file.read().decode("utf-8"))))
+            self.assertEqual([int(row[0]) for row in rows[1:]],
+                             self._story_ids())
+
+    def test_resume_with_other_options(self):
+        path = self._path("stories.jsonl")
+        self.assertRaises(IOError, export_stories,
+                          self._zen_request([FailAfter(2)]),
+                          self._project_ids, path, size=10, workers=1)
+        self.assertRaises(ExportError, export_stories, self._zen_request(),
+                          self._project_ids, path, "csv", size=10)
+
+    def test_unknown_format(self):
+        self.assertRaises(ExportError, export_stories, self._zen_request(),
+                          self._project_ids, self._path("x"), "xml")
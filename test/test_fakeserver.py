@@ -0,0 +1,60 @@
+import requests
+import unittest
+
+from kaizen.api import ZenRequest
+from kaizen.client import ApiClient
+from kaizen.fakeserver import FakeDataset, FakeServer
+
+
+class FakeServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._server = FakeServer(FakeDataset(stories=25)).start()
+        client = ApiClient("fake_key", api_url=cls._server.api_url)
+        cls._zen_request = ZenRequest("fake_key", client)
+        cls._project_id = list(cls._server.dataset.projects)[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._server.stop()
+
+    def test_list_projects(self):
+        projects = self._zen_request.projects().send()
+        self.assertEqual([project["id"] for project in projects["items"]],
+                         [self._project_id])
+
+    def test_paginate_stories(self):
+        stories = self._zen_request.projects(self._project_id).stories()
+        page = stories.for_page(2, 10).send()
+        self.assertEqual(page["totalPages"], 3)
+        self.assertEqual(len(page["items"]), 10)
+        self.assertEqual(len(list(stories.iter_items(size=10))), 25)
+
+    def test_enrichments(self):
+        stories = self._zen_request.projects(self._project_id).stories()
+        story = stories.paginate(1, 1).send()["items"][0]
+        self.assertNotIn("tasks", story)
+        story = stories.with_enrichments("tasks").paginate(1, 1).send()
+        self.assertIn("tasks", story["items"][0])
+
+    def test_where(self):
+        stories = self._zen_request.projects(self._project_id).stories()
+        ready = stories.where("status:ready").paginate(1, 100).send()
+        self.assertTrue(all(story["status"] == "ready"
+                            for story in ready["items"]))
+
+    def test_update_story(self):
+        project = self._zen_request.projects(self._project_id)
+        story_id = list(self._server.dataset.stories[self._project_id])[0]
+        phase_id = self._server.dataset.phases[self._project_id][1]["id"]
+        story = project.stories(story_id).move_to_phase(phase_id).send()
+        self.assertEqual(story["phase"]["id"], phase_id)
+
+    def test_unknown_resource(self):
+        self.assertRaises(requests.HTTPError,
+                          self._zen_request.projects(404).send)
+
+
+if __name__ == "__main__":
+    unittest.main()
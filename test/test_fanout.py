@@ -0,0 +1,114 @@
+import threading
+import unittest
+
+from kaizen.api import ZenRequest
+from kaizen.cache import ResponseCache
+from kaizen.client import ApiClient
+from kaizen.fakeserver import FakeApp, FakeDataset
+from kaizen.fanout import fan_out, sort_key
+from kaizen.transport import MemoryTransport
+
+
+class _InFlight(object):
+    """Application counting the max number of requests answered at once."""
+
+    def __init__(self, app):
+        self._app = app
+        self._lock = threading.Lock()
+        self._count = 0
+        self.max_count = 0
+
+    def __call__(self, *args):
+        with self._lock:
+            self._count += 1
+            self.max_count = max(self.max_count, self._count)
+        try:
+            return self._app(*args)
+        finally:
+            with self._lock:
+                self._count -= 1
+
+
+class FanOutTest(unittest.TestCase):
+
+    def setUp(self):
+        self._app = FakeApp(FakeDataset(projects=6, stories=15, members=3))
+        self._dataset = self._app.dataset
+        self._zen_request = ZenRequest("fake_key", ApiClient(
+            "fake_key", transport=MemoryTransport(self._app)))
+
+    def test_every_project(self):
+        stories = list(self._zen_request.fan_out("stories", size=10))
+        self.assertEqual(len(stories), 90)
+        self.assertEqual(set(story["project"]["id"] for story in stories),
+                         set(self._dataset.projects))
+
+    def test_project_ids(self):
+        project_ids = sorted(self._dataset.projects)[:2]
+        phases = list(self._zen_request.fan_out("phases", project_ids))
+        self.assertEqual(len(phases), 10)
+        self.assertEqual(sorted(set(phase["project"]["id"]
+                                    for phase in phases)), project_ids)
+
+    def test_items_are_tagged_with_their_project(self):
+        members = list(self._zen_request.fan_out("members"))
+        self.assertEqual(len(members), 18)
+        for member in members:
+            project = self._dataset.projects[member["project"]["id"]]
+            self.assertEqual(member["project"]["name"], project["name"])
+
+    def test_cached_items_are_not_tagged(self):
+        zen_request = ZenRequest("fake_key", ApiClient(
+            "fake_key", transport=MemoryTransport(self._app),
+            cache=ResponseCache()))
+        project_id = sorted(self._dataset.projects)[0]
+        members = list(zen_request.fan_out("members", [project_id]))
+        self.assertEqual(len(members), 3)
+        count = self._app.request_count
+        cached = list(zen_request.projects(project_id).members().iter_items())
+        self.assertEqual(self._app.request_count, count)
+        self.assertEqual(len(cached), 3)
+        for member in cached:
+            self.assertNotIn("project", member)
+
+    def test_where_and_enrichments(self):
+        stories = list(self._zen_request.fan_out(
+            "stories", where="status:blocked", enrichments=["tags"]))
+        self.assertTrue(stories)
+        for story in stories:
+            self.assertEqual(story["status"], "blocked")
+            self.assertIn("tags", story)
+
+    def test_sorted_merge(self):
+        stories = list(self._zen_request.fan_out("stories",
+                                                 sort="updateTime"))
+        update_times = [story["updateTime"] for story in stories]
+        self.assertEqual(update_times, sorted(update_times))
+        stories = list(self._zen_request.fan_out("stories", sort="phase.name",
+                                                 reverse=True))
+        names = [story["phase"]["name"] for story in stories]
+        self.assertEqual(names, sorted(names, reverse=True))
+        stories = list(self._zen_request.fan_out("stories", sort=u"id"))
+        self.assertEqual([story["id"] for story in stories],
+                         sorted(story["id"] for story in stories))
+
+    def test_workers_bound_concurrency(self):
+        self._app.latency = 0.01
+        in_flight = _InFlight(self._app)
+        zen_request = ZenRequest("fake_key", ApiClient(
+            "fake_key", transport=MemoryTransport(in_flight)))
+        stories = list(fan_out(zen_request, "stories", workers=3))
+        self.assertEqual(len(stories), 90)
+        self.assertGreater(in_flight.max_count, 1)
+        self.assertLessEqual(in_flight.max_count, 3)
+
+    def test_unknown_resource(self):
+        self.assertRaises(ValueError, list,
+                          self._zen_request.fan_out("tasks"))
+
+    def test_sort_key(self):
+        key = sort_key("owner.userName")
+        items = [{"owner": {"userName": "b"}}, {"owner": None},
+                 {"owner": {"userName": "a"}}]
+        self.assertEqual(sorted(items, key=key),
+                         [items[1], items[2], items[0]])
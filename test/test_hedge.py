@@ -0,0 +1,154 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import unittest
+
+from kaizen.api import ZenRequest
+from kaizen.client import ApiClient
+from kaizen.fakeserver import FakeApp, FakeDataset
+from kaizen.hedge import HedgePolicy
+from kaizen.transport import MemoryTransport
+
+
+class SlowFirstCall(object):
+    """Call function, the first call being slow."""
+
+    def __init__(self, function=lambda *args: "result", delay=0.5):
+        self._function = function
+        self._delay = delay
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def __call__(self, *args):
+        with self._lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            time.sleep(self._delay)
+        return self._function(*args)
+
+
+def _primed(latency=0.01, samples=20, **options):
+    hedge = HedgePolicy(min_samples=samples, **options)
+    for _ in range(samples):
+        hedge.observe(latency)
+    return hedge
+
+
+class HedgePolicyTest(unittest.TestCase):
+
+    def test_no_hedge_before_enough_samples(self):
+        hedge = HedgePolicy(min_samples=5)
+        self.assertIsNone(hedge.delay())
+        function = SlowFirstCall(delay=0.05)
+        self.assertEqual(hedge.call(function), "result")
+        self.assertEqual(function.calls, 1)
+        self.assertEqual(hedge.stats(), {"calls": 1, "hedged": 0, "won": 0})
+
+    def test_delay_is_the_quantile(self):
+        hedge = HedgePolicy(quantile=0.9, min_samples=10)
+        for latency in range(1, 11):
+            hedge.observe(latency / 100.0)
+        self.assertEqual(hedge.delay(), 0.1)
+        hedge.reset()
+        self.assertIsNone(hedge.delay())
+
+    def test_fast_call_is_not_hedged(self):
+        hedge = _primed(latency=0.2)
+        function = SlowFirstCall(delay=0)
+        self.assertEqual(hedge.call(function), "result")
+        self.assertEqual(function.calls, 1)
+
+    def test_slow_call_is_hedged(self):
+        hedge = _primed()
+        function = SlowFirstCall(delay=0.5)
+        start = time.time()
+        self.assertEqual(hedge.call(function), "result")
+        self.assertLess(time.time() - start, 0.4)
+        self.assertEqual(function.calls, 2)
+        self.assertEqual(hedge.stats(), {"calls": 1, "hedged": 1, "won": 1})
+
+    def test_hedge_acquires_and_loser_is_discarded(self):
+        hedge = _primed()
+        (acquired, discarded, calls) = ([], [], [])
+
+        def function():
+            calls.append(None)
+            if len(calls) == 1:
+                time.sleep(0.2)
+                return "slow"
+            return "fast"
+        self.assertEqual(hedge.call(function, lambda: acquired.append(True),
+                                    discarded.append), "fast")
+        # Only the hedge takes a token
+        self.assertEqual(acquired, [True])
+        time.sleep(0.3)
+        self.assertEqual(discarded, ["slow"])
+
+    def test_budget(self):
+        hedge = _primed(samples=100, budget=0.5)
+        for _ in range(4):
+            hedge.call(SlowFirstCall(delay=0.05))
+        self.assertEqual(hedge.stats(), {"calls": 4, "hedged": 2, "won": 2})
+
+    def test_no_hedge_while_workers_are_busy(self):
+        hedge = _primed(workers=1)
+        release = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=1)
+        busy = executor.submit(hedge.call, lambda: release.wait(5))
+        function = SlowFirstCall(delay=0.05)
+        self.assertEqual(hedge.call(function), "result")
+        self.assertEqual(function.calls, 1)
+        release.set()
+        self.assertTrue(busy.result())
+        executor.shutdown(wait=True)
+        self.assertEqual(hedge.stats()["hedged"], 0)
+
+    def test_concurrent_calls_of_equal_latency(self):
+        hedge = _primed(latency=0.02)
+
+        def call():
+            time.sleep(0.02)
+            return "result"
+        executor = ThreadPoolExecutor(max_workers=64)
+        futures = [executor.submit(hedge.call, call) for _ in range(640)]
+        executor.shutdown(wait=True)
+        self.assertEqual([future.result() for future in futures],
+                         ["result"] * 640)
+        # Waiting for a free worker doesn't count as a slow call
+        self.assertLessEqual(hedge.stats()["hedged"], 64)
+
+    def test_errors(self):
+        hedge = _primed()
+
+        def fail():
+            raise ValueError("failed")
+        self.assertRaises(ValueError, hedge.call, fail)
+
+        def slow_fail():
+            time.sleep(0.05)
+            raise ValueError("failed")
+        self.assertRaises(ValueError, hedge.call, slow_fail)
+
+
+class ClientHedgeTest(unittest.TestCase):
+
+    def test_slow_get_is_hedged(self):
+        app = SlowFirstCall(FakeApp(FakeDataset(stories=5)))
+        hedge = _primed()
+        client = ApiClient("fake_key", transport=MemoryTransport(app),
+                           hedge=hedge)
+        start = time.time()
+        projects = ZenRequest("fake_key", client).projects().send()
+        self.assertLess(time.time() - start, 0.4)
+        self.assertEqual(len(projects["items"]), 1)
+        self.assertEqual(hedge.stats(), {"calls": 1, "hedged": 1, "won": 1})
+
+    def test_updates_are_not_hedged(self):
+        app = FakeApp(FakeDataset(stories=5))
+        client = ApiClient("fake_key", transport=MemoryTransport(app),
+                           hedge=_primed(latency=0))
+        project_id = list(app.dataset.projects)[0]
+        ZenRequest("fake_key", client).projects(project_id)\
+            .update(name="new").send()
+        self.assertEqual(app.request_count, 1)
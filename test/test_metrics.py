@@ -0,0 +1,102 @@
+import json
+import requests
+import responses
+import unittest
+
+from kaizen.client import ApiClient
+from kaizen.metrics import (MetricsCollector, RequestEvent, RequestHooks,
+                            url_template)
+from kaizen.request import Request
+
+
+class RecordingHooks(RequestHooks):
+
+    def __init__(self):
+        self.calls = []
+
+    def before_send(self, event):
+        self.calls.append(("before_send", event))
+
+    def after_response(self, event):
+        self.calls.append(("after_response", event))
+
+    def on_error(self, event):
+        self.calls.append(("on_error", event))
+
+
+class UrlTemplateTest(unittest.TestCase):
+
+    def test_ids_are_replaced(self):
+        self.assertEqual(url_template("/projects/12/stories/42"),
+                         "/projects/{id}/stories/{id}")
+        self.assertEqual(url_template("/projects/12/phases/"),
+                         "/projects/{id}/phases/")
+
+
+class HooksTest(unittest.TestCase):
+
+    def setUp(self):
+        self._hooks = RecordingHooks()
+        self._client = ApiClient("fake_api_key", hooks=[self._hooks])
+
+    @responses.activate
+    def test_hooks_on_success(self):
+        responses.add(responses.GET,
+                      "https://agilezen.com/api/v1/projects/12",
+                      body=json.dumps({"id": 12}), status=200,
+                      content_type="application/json")
+        self._client.send_request(Request().update_url("/projects/12"))
+        self.assertEqual([name for (name, _) in self._hooks.calls],
+                         ["before_send", "after_response"])
+        event = self._hooks.calls[-1][1]
+        self.assertEqual(event.verb, "GET")
+        self.assertEqual(event.url_template, "/projects/{id}")
+        self.assertEqual(event.status, 200)
+        self.assertEqual(event.bytes_in, len(json.dumps({"id": 12})))
+        self.assertIsNotNone(event.total)
+        self.assertIsNotNone(event.decode)
+
+    @responses.activate
+    def test_hooks_on_error(self):
+        responses.add(responses.GET,
+                      "https://agilezen.com/api/v1/projects/12", status=404)
+        self.assertRaises(requests.HTTPError, self._client.send_request,
+                          Request().update_url("/projects/12"))
+        self.assertEqual([name for (name, _) in self._hooks.calls],
+                         ["before_send", "on_error"])
+        self.assertEqual(self._hooks.calls[-1][1].status, 404)
+
+
+class MetricsCollectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self._collector = MetricsCollector()
+        for (total, status) in [(0.001, 200), (0.2, 200), (3, 500)]:
+            event = RequestEvent("GET", "/projects/%s" % status)
+            event.status = status
+            event.total = total
+            event.bytes_in = 10
+            self._collector.after_response(event)
+
+    def test_to_dict(self):
+        metrics = self._collector.to_dict()["GET /projects/{id}"]
+        self.assertEqual(metrics["requests"], 3)
+        self.assertEqual(metrics["bytes_in"], 30)
+        self.assertEqual(metrics["statuses"], {"200": 2, "500": 1})
+        self.assertEqual(metrics["latency_buckets"]["0.005"], 1)
+        self.assertEqual(metrics["latency_buckets"]["+Inf"], 3)
+
+    def test_to_json(self):
+        self.assertIn("GET /projects/{id}",
+                      json.loads(self._collector.to_json()))
+
+    def test_to_prometheus(self):
+        text = self._collector.to_prometheus()
+        self.assertIn('kaizen_requests_total{verb="GET",'
+                      'endpoint="/projects/{id}"} 3', text)
+        self.assertIn('kaizen_request_duration_seconds_bucket{verb="GET",'
+                      'endpoint="/projects/{id}",le="+Inf"} 3', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from kaizen.api import ZenRequest
+from kaizen.client import ApiClient
+from kaizen.fakeserver import FakeDataset, FakeServer
+from kaizen.mirror import Mirror, MirrorError
+
+
+class MirrorTest(unittest.TestCase):
+
+    def setUp(self):
+        self._server = FakeServer(FakeDataset(stories=30)).start()
+        client = ApiClient("fake_key", api_url=self._server.api_url)
+        self._zen_request = ZenRequest("fake_key", client)
+        self._project_id = list(self._server.dataset.projects)[0]
+        self._stories = self._server.dataset.stories[self._project_id]
+        self._mirror = Mirror(":memory:")
+
+    def tearDown(self):
+        self._mirror.close()
+        self._server.stop()
+
+    def test_full_sync(self):
+        self.assertEqual(self._mirror.sync(self._zen_request),
+                         {self._project_id: 30})
+        stories = self._mirror.list_stories(self._project_id, size=10)
+        self.assertEqual(stories["totalItems"], 30)
+        self.assertEqual(stories["totalPages"], 3)
+        self.assertNotIn("tasks", stories["items"][0])
+        phases = self._mirror.list_phases(self._project_id)
+        self.assertEqual(len(phases["items"]), 5)
+
+    def test_incremental_sync_only_fetches_updated_stories(self):
+        self._mirror.sync(self._zen_request)
+        story_id = list(self._stories)[0]
+        self._zen_request.projects(self._project_id).stories(story_id)\
+            .update(text="updated").send()
+        # The stories updated last during the previous sync are fetched again
+        fetched = self._mirror.sync(self._zen_request)[self._project_id]
+        self.assertLess(fetched, 5)
+        story = self._mirror.list_stories(self._project_id, size=1)["items"][0]
+        self.assertEqual(story["text"], "updated")
+
+    def test_sync_removes_deleted_stories(self):
+        self._mirror.sync(self._zen_request)
+        story_id = list(self._stories)[0]
+        del self._stories[story_id]
+        self._mirror.sync(self._zen_request)
+        stories = self._mirror.list_stories(self._project_id)
+        self.assertEqual(stories["totalItems"], 29)
+        self.assertNotIn(story_id, [story["id"] for story in stories["items"]])
+
+    def test_filters(self):
+        self._mirror.sync(self._zen_request)
+        story = list(self._stories.values())[0]
+        tag = story["tags"][0]["name"]
+        stories = self._mirror.list_stories(
+            self._project_id, phase=story["phase"]["name"],
+            owner=story["owner"]["userName"], status=story["status"], tag=tag,
+            tags=True)["items"]
+        self.assertIn(story["id"], [each["id"] for each in stories])
+        for each in stories:
+            self.assertEqual(each["phase"]["name"], story["phase"]["name"])
+            self.assertIn(tag, [each_tag["name"] for each_tag in each["tags"]])
+
+    def test_unsynced_project(self):
+        self.assertRaises(MirrorError, self._mirror.list_stories, 12)
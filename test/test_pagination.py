@@ -0,0 +1,92 @@
+import json
+import requests
+import responses
+import unittest
+
+from kaizen.api import ZenRequest
+
+
+STORIES_URL = "https://agilezen.com/api/v1/projects/12/stories/"
+
+
+def add_page(page, total_pages, items, size=2):
+    responses.add(responses.GET,
+                  "%s?page=%s&pageSize=%s" % (STORIES_URL, page, size),
+                  match_querystring=True, status=200,
+                  content_type="application/json",
+                  body=json.dumps({"page": page, "pageSize": size,
+                                   "totalPages": total_pages,
+                                   "items": items}))
+
+
+class IterPagesTest(unittest.TestCase):
+
+    def setUp(self):
+        self._request = ZenRequest("fake_key").projects(12).stories()
+
+    @responses.activate
+    def test_iter_pages_follows_total_pages(self):
+        add_page(1, 3, [1, 2])
+        add_page(2, 3, [3, 4])
+        add_page(3, 3, [5])
+        pages = list(self._request.iter_pages(size=2))
+        self.assertEqual([page["page"] for page in pages], [1, 2, 3])
+
+    @responses.activate
+    def test_iter_pages_without_prefetch(self):
+        add_page(1, 2, [1, 2])
+        add_page(2, 2, [3])
+        pages = list(self._request.iter_pages(size=2, prefetch=False))
+        self.assertEqual([page["page"] for page in pages], [1, 2])
+
+    @responses.activate
+    def test_iter_pages_from_start(self):
+        add_page(2, 3, [3, 4])
+        add_page(3, 3, [5])
+        pages = list(self._request.iter_pages(size=2, start=2))
+        self.assertEqual([page["page"] for page in pages], [2, 3])
+
+    @responses.activate
+    def test_iter_pages_empty_resource(self):
+        add_page(1, 0, [])
+        self.assertEqual(len(list(self._request.iter_pages(size=2))), 1)
+
+    @responses.activate
+    def test_iter_pages_parallel_keeps_page_order(self):
+        for page in range(1, 7):
+            add_page(page, 6, [page])
+        pages = list(self._request.iter_pages(size=2, workers=4))
+        self.assertEqual([page["page"] for page in pages], list(range(1, 7)))
+
+    @responses.activate
+    def test_iter_pages_parallel_raises(self):
+        add_page(1, 3, [1, 2])
+        add_page(2, 3, [3, 4])
+        responses.add(responses.GET, "%s?page=3&pageSize=2" % STORIES_URL,
+                      match_querystring=True, status=500,
+                      content_type="application/json")
+        pages = self._request.iter_pages(size=2, workers=2)
+        self.assertRaises(requests.HTTPError, list, pages)
+
+    @responses.activate
+    def test_iter_items(self):
+        add_page(1, 2, [1, 2])
+        add_page(2, 2, [3])
+        self.assertEqual(list(self._request.iter_items(size=2)), [1, 2, 3])
+
+    @responses.activate
+    def test_iter_items_stream(self):
+        add_page(1, 2, [1, 2])
+        add_page(2, 2, [3])
+        self.assertEqual(list(self._request.iter_items(size=2, stream=True)),
+                         [1, 2, 3])
+
+    def test_for_page_leaves_request_untouched(self):
+        page_request = self._request.for_page(3, 2)
+        self.assertEqual(page_request.params, {"page": 3, "pageSize": 2})
+        self.assertEqual(self._request.params, {})
+        self.assertEqual(page_request.url, self._request.url)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+
+from kaizen.api import ZenRequest
+from kaizen.client import ApiClient
+from kaizen.fakeserver import FakeDataset, FakeServer
+from kaizen.phases import PhaseIndex, PhaseIndexCache, bump_stories
+
+
+class PhaseIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self._index = PhaseIndex([{"id": 1, "name": "todo"},
+                                  {"id": 5, "name": "doing"},
+                                  {"id": 3, "name": "done"}])
+
+    def test_next_phase_id(self):
+        self.assertEqual(self._index.next_phase_id("todo"), 5)
+        self.assertEqual(self._index.next_phase_id("doing"), 3)
+        self.assertEqual(self._index.positions, {1: 0, 5: 1, 3: 2})
+
+    def test_last_phase(self):
+        self.assertRaises(ValueError, self._index.next_phase_id, "done")
+
+    def test_unknown_phase(self):
+        self.assertNotIn("unknown", self._index)
+        self.assertRaises(ValueError, self._index.next_phase_id, "unknown")
+
+
+class PhaseIndexCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._server = FakeServer(FakeDataset(phases=150, stories=1)).start()
+        self._now = 0
+        self._indexes = PhaseIndexCache(ttl=10, clock=lambda: self._now)
+        client = ApiClient("fake_key", api_url=self._server.api_url,
+                           hooks=[self._indexes])
+        self._project_id = list(self._server.dataset.projects)[0]
+        self._project = ZenRequest("fake_key", client).projects(
+            self._project_id)
+
+    def tearDown(self):
+        self._server.stop()
+
+    def test_index_spans_every_page(self):
+        phases = self._server.dataset.phases[self._project_id]
+        index = self._indexes.get(self._project, self._project_id)
+        self.assertEqual(index.next_phase_id(phases[120]["name"]),
+                         phases[121]["id"])
+
+    def test_index_is_reused(self):
+        index = self._indexes.get(self._project, self._project_id)
+        count = self._server.request_count
+        self.assertIs(self._indexes.get(self._project, self._project_id),
+                      index)
+        self.assertEqual(self._server.request_count, count)
+
+    def test_index_expires(self):
+        index = self._indexes.get(self._project, self._project_id)
+        self._now = 11
+        self.assertIsNot(self._indexes.get(self._project, self._project_id),
+                         index)
+
+    def test_index_invalidated_by_new_phase(self):
+        index = self._indexes.get(self._project, self._project_id)
+        self._project.phases().add("New", "A new phase").send()
+        new_index = self._indexes.get(self._project, self._project_id)
+        self.assertIsNot(new_index, index)
+        self.assertIn("New", new_index)
+
+
+class BumpStoriesTest(unittest.TestCase):
+
+    def setUp(self):
+        self._server = FakeServer(FakeDataset(stories=40)).start()
+        client = ApiClient("fake_key", api_url=self._server.api_url)
+        self._project_id = list(self._server.dataset.projects)[0]
+        self._project = ZenRequest("fake_key", client).projects(
+            self._project_id)
+        self._phases = self._server.dataset.phases[self._project_id]
+        self._index = PhaseIndex(self._phases)
+        self._stories = self._server.dataset.stories[self._project_id]
+
+    def tearDown(self):
+        self._server.stop()
+
+    def _phase_id(self, story_id):
+        return self._stories[story_id]["phase"]["id"]
+
+    def test_bump_story_ids(self):
+        last_phase = self._phases[-1]["id"]
+        story_ids = [story_id for story_id in self._stories
+                     if self._phase_id(story_id) != last_phase][:5]
+        expected = dict((story_id, self._index.next_ids[
+            self._phase_id(story_id)]) for story_id in story_ids)
+        report = bump_stories(self._project, self._index, story_ids)
+        self.assertEqual(report, {"moved": expected, "failed": {}})
+        for (story_id, phase_id) in expected.items():
+            self.assertEqual(self._phase_id(story_id), phase_id)
+
+    def test_bump_where(self):
+        ready = self._phases[1]
+        story_ids = [story_id for story_id in self._stories
+                     if self._phase_id(story_id) == ready["id"]]
+        report = bump_stories(self._project, self._index,
+                              where="phase:%s" % ready["name"], workers=4)
+        self.assertEqual(sorted(report["moved"]), sorted(story_ids))
+        self.assertEqual(set(report["moved"].values()),
+                         set([self._phases[2]["id"]]))
+
+    def test_stories_are_moved_once(self):
+        ready = self._phases[1]
+        story_ids = [story_id for story_id in self._stories
+                     if self._phase_id(story_id) == ready["id"]]
+        requests = self._server.request_count
+        report = bump_stories(self._project, self._index, story_ids[:2],
+                              where="phase:%s" % ready["name"])
+        self.assertEqual(sorted(report["moved"]), sorted(story_ids))
+        self.assertEqual(set(report["moved"].values()),
+                         set([self._phases[2]["id"]]))
+        # One page listing the stories then one move per story
+        self.assertEqual(self._server.request_count - requests,
+                         1 + len(story_ids))
+
+    def test_failures_are_reported(self):
+        last_phase = self._phases[-1]["id"]
+        story_id = [story_id for story_id in self._stories
+                    if self._phase_id(story_id) == last_phase][0]
+        report = bump_stories(self._project, self._index, [story_id, 404])
+        self.assertEqual(report["moved"], {})
+        self.assertEqual(sorted(report["failed"]), sorted([story_id, 404]))
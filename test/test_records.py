@@ -0,0 +1,104 @@
+import unittest
+import responses
+
+from kaizen.api import ZenRequest
+from kaizen.records import (COMPRESS_THRESHOLD, Phase, Project, RecordPage,
+                            Story, Tag, record_class_for, to_records)
+
+
+STORY = {
+    "id": 42,
+    "text": "Story",
+    "details": "x" * (COMPRESS_THRESHOLD * 4),
+    "size": "3",
+    "color": "green",
+    "status": "started",
+    "project": {"id": 12},
+    "phase": {"id": 2, "name": "Working"},
+    "owner": {"id": 1, "name": "Bob", "userName": "bob"},
+    "tags": [{"id": 1, "name": "bug"}],
+    "tasks": [{"id": 7, "text": "Task", "status": "complete",
+               "finishedBy": {"id": 1, "userName": "bob"}}],
+}
+
+
+class RecordTest(unittest.TestCase):
+
+    def test_story_from_dict(self):
+        story = Story.from_dict(STORY)
+        self.assertEqual(story.id, 42)
+        self.assertEqual(story.project_id, 12)
+        self.assertEqual((story.phase_id, story.phase_name), (2, "Working"))
+        self.assertEqual(story.owner, "bob")
+        self.assertIsNone(story.creator)
+        self.assertEqual(story.tags, ("bug",))
+        self.assertEqual(story.tasks[0].finished_by, "bob")
+
+    def test_enrichments_are_kept(self):
+        project = Project.from_dict({
+            "id": 12, "phases": [{"id": 2, "name": "Working",
+                                  "stories": [STORY]}],
+            "members": [{"id": 1, "userName": "bob"}],
+            "metrics": {"throughput": 3}})
+        self.assertEqual(project.phases[0].stories, (Story.from_dict(STORY),))
+        self.assertEqual(project.members[0].user_name, "bob")
+        self.assertEqual(project.metrics, {"throughput": 3})
+        project = Project.from_dict({"id": 12})
+        self.assertEqual((project.phases, project.members), ((), ()))
+        self.assertIsNone(project.metrics)
+
+    def test_details_are_compressed(self):
+        story = Story.from_dict(STORY)
+        self.assertLess(len(story._details), len(STORY["details"]))
+        self.assertEqual(story.details, STORY["details"])
+
+    def test_short_details_are_not_compressed(self):
+        story = Story.from_dict(dict(STORY, details=u"caf\xe9"))
+        self.assertEqual(story.details, u"caf\xe9")
+        self.assertIsNone(Story.from_dict({"id": 1}).details)
+
+    def test_repeated_strings_are_interned(self):
+        first = Story.from_dict(STORY)
+        name = "".join(["Work", "ing"])
+        second = Story.from_dict(dict(STORY, phase={"id": 2, "name": name}))
+        self.assertIs(first.phase_name, second.phase_name)
+
+    def test_records_have_no_dict(self):
+        self.assertFalse(hasattr(Story.from_dict(STORY), "__dict__"))
+
+    def test_equality_and_to_dict(self):
+        self.assertEqual(Tag.from_dict({"id": 1, "name": "bug"}),
+                         Tag.from_dict({"id": 1, "name": "bug"}))
+        self.assertNotEqual(Tag.from_dict({"id": 1}), Tag.from_dict({"id": 2}))
+        self.assertEqual(Tag.from_dict({"id": 1, "name": "bug"}).to_dict(),
+                         {"id": 1, "name": "bug"})
+        self.assertEqual(Story.from_dict(STORY).to_dict()["details"],
+                         STORY["details"])
+
+
+class ToRecordsTest(unittest.TestCase):
+
+    def test_record_class_for(self):
+        self.assertIs(record_class_for("/projects/12/stories"), Story)
+        self.assertIs(record_class_for("/projects/12/phases/3"), Phase)
+        self.assertRaises(ValueError, record_class_for, "/unknown")
+
+    def test_to_records_page(self):
+        page = to_records({"page": 1, "pageSize": 10, "totalPages": 1,
+                           "totalItems": 1, "items": [STORY]}, Story)
+        self.assertIsInstance(page, RecordPage)
+        self.assertEqual(page.total_items, 1)
+        self.assertEqual(page.items, [Story.from_dict(STORY)])
+
+    def test_to_records_single_entity(self):
+        self.assertEqual(to_records(STORY, Story), Story.from_dict(STORY))
+
+    @responses.activate
+    def test_send_records(self):
+        responses.add(responses.GET,
+                      "https://agilezen.com/api/v1/projects/12/stories/42",
+                      content_type="application/json", status=200,
+                      json=STORY)
+        story = ZenRequest("fake_key").projects(12).stories(42).send(
+            records=True)
+        self.assertEqual(story, Story.from_dict(STORY))
@@ -36,18 +36,39 @@ class RequestTest(unittest.TestCase):
         self.assertEqual(request.data, dest.data)
 
     def test_set_verb(self):
+        self.assertRaises(ValueError, self._request.update_verb, "Nop!")
+
+    def test_request_is_immutable(self):
         def assign_verb(new_verb):
             """To make it possible to use assertRaises."""
             self._request.verb = new_verb
-        self.assertRaises(ValueError, assign_verb, "Nop!")
-        self.assertRaises(ValueError, self._request.update_verb, "Nop!")
+        self.assertRaises(AttributeError, assign_verb, "POST")
+        self.assertRaises(AttributeError, setattr, self._request, "x", 1)
 
     def test_call_chaining(self):
         post_request = self._request.update_verb("POST").update_url("/call_me")\
             .update_params({"name": "popo"}).update_data({"text": "cool beans"})
-        self.assertEqual(post_request, self._request)
+        self.assertNotEqual(post_request, self._request)
+        self.assertEqual(self._request.verb, "GET")
+        self.assertEqual(self._request.url, "")
+        self.assertDictEqual(self._request.params, {})
+        self.assertDictEqual(self._request.data, {})
         self.assertEqual(post_request.verb, "POST")
         self.assertEqual(post_request.url, "/call_me")
         self.assertDictEqual(post_request.params, {"name": "popo"})
         self.assertDictEqual(post_request.data, {"text": "cool beans"})
 
+    def test_base_request_can_be_reused(self):
+        base = self._request.update_url("/projects/12")
+        first = base.update_url("/stories/1").update_data({"text": "one"})
+        second = base.update_url("/stories/2")
+        self.assertEqual(base.url, "/projects/12")
+        self.assertEqual(first.url, "/projects/12/stories/1")
+        self.assertEqual(second.url, "/projects/12/stories/2")
+        self.assertDictEqual(second.data, {})
+
+    def test_unchanged_components_are_shared(self):
+        request = self._request.update_params({"page": 1})
+        updated = request.update_data({"text": "cool beans"})
+        self.assertIs(updated.params, request.params)
+
@@ -0,0 +1,92 @@
+import unittest
+
+from kaizen.retry import (RetryPolicy, TokenBucket, _parse_retry_after,
+                          get_rate_limiter)
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.now += delay
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        self._policy = RetryPolicy(max_retries=2, backoff=1, max_backoff=3)
+
+    def test_retry_on_retryable_status(self):
+        self.assertTrue(self._policy.should_retry("GET", 0,
+                                                  FakeResponse(503)))
+        self.assertFalse(self._policy.should_retry("GET", 0,
+                                                   FakeResponse(404)))
+
+    def test_retry_on_connection_error(self):
+        self.assertTrue(self._policy.should_retry("GET", 0))
+
+    def test_no_retry_after_max_retries(self):
+        self.assertFalse(self._policy.should_retry("GET", 2,
+                                                   FakeResponse(503)))
+
+    def test_no_retry_for_non_idempotent_verbs(self):
+        self.assertFalse(self._policy.should_retry("POST", 0,
+                                                   FakeResponse(503)))
+
+    def test_delay_is_bounded(self):
+        for attempt in range(5):
+            self.assertLessEqual(self._policy.get_delay(attempt), 3)
+
+    def test_delay_honors_retry_after(self):
+        response = FakeResponse(429, {"Retry-After": "12"})
+        self.assertEqual(self._policy.get_delay(0, response), 12)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(_parse_retry_after("3"), 3)
+        self.assertIsNone(_parse_retry_after("soon"))
+        self.assertEqual(_parse_retry_after("Thu, 01 Jan 1970 00:01:00 GMT",
+                                            clock=lambda: 30), 30)
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst_then_throttle(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, capacity=2, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(clock.now, 0)
+        bucket.acquire()
+        self.assertEqual(clock.now, 0.5)
+
+    def test_acquire_timeout(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, capacity=1, clock=clock, sleep=clock.sleep)
+        self.assertTrue(bucket.acquire(0))
+        self.assertFalse(bucket.acquire(0.1))
+        self.assertEqual(clock.now, 0)
+        # The token was given back, the next one is available in 0.5s
+        self.assertTrue(bucket.acquire(0.5))
+        self.assertEqual(clock.now, 0.5)
+
+    def test_rate_limiter_shared_per_api_key(self):
+        self.assertIs(get_rate_limiter("fake_key", 5),
+                      get_rate_limiter("fake_key", 10))
+        self.assertIsNot(get_rate_limiter("fake_key", 5),
+                         get_rate_limiter("other_key", 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+from datetime import date
+import unittest
+
+from kaizen.api import ZenRequest
+from kaizen.client import ApiClient
+from kaizen.fakeserver import FakeDataset, FakeServer
+from kaizen.stats import StoryStats, project_stats
+
+
+def story(owner, phase, status, size="2", created="2014-01-01T10:00:00",
+          tags=(), tasks=()):
+    return {"owner": {"userName": owner} if owner else None,
+            "phase": {"name": phase}, "status": status, "size": size,
+            "priority": "1", "createTime": created,
+            "tags": [{"name": tag} for tag in tags],
+            "tasks": [{"status": task} for task in tasks]}
+
+
+class StoryStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._stats = StoryStats(today=date(2014, 1, 11)).extend([
+            story("bob", "Ready", "ready", tags=["bug"]),
+            story("bob", "Working", "blocked", size="L",
+                  created="2014-01-06T00:00:00", tasks=["complete", "open"]),
+            story(None, "Ready", "ready", size="3", tags=["bug", "ui"]),
+        ]).to_dict()
+
+    def test_total(self):
+        total = self._stats["total"]
+        self.assertEqual(total["stories"], 3)
+        self.assertEqual(total["size"], 5)
+        self.assertEqual(total["blocked"], 1)
+        self.assertEqual((total["tasks"], total["complete_tasks"]), (2, 1))
+        self.assertEqual(total["max_age"], 10)
+        self.assertAlmostEqual(total["average_age"], 25 / 3.0)
+
+    def test_work_in_progress_by_phase(self):
+        self.assertEqual(self._stats["by_phase"]["Ready"]["stories"], 2)
+        self.assertEqual(self._stats["by_phase"]["Working"]["stories"], 1)
+        self.assertEqual(self._stats["by_status"]["ready"]["size"], 5)
+
+    def test_by_owner(self):
+        bob = self._stats["by_owner"]["bob"]
+        self.assertEqual(bob["stories"], 2)
+        self.assertEqual(bob["by_status"]["blocked"]["stories"], 1)
+        self.assertEqual(sorted(bob["by_phase"]), ["Ready", "Working"])
+        self.assertEqual(self._stats["by_owner"][None]["stories"], 1)
+
+    def test_tags(self):
+        self.assertEqual(self._stats["tags"], {"bug": 2, "ui": 1})
+
+
+class ProjectStatsTest(unittest.TestCase):
+
+    def test_every_page_is_aggregated(self):
+        dataset = FakeDataset(stories=250)
+        with FakeServer(dataset) as server:
+            client = ApiClient("fake_key", api_url=server.api_url)
+            project_id = list(dataset.projects)[0]
+            stats = project_stats(ZenRequest("fake_key", client)
+                                  .projects(project_id), size=50).to_dict()
+        stories = dataset.stories[project_id].values()
+        self.assertEqual(stats["total"]["stories"], 250)
+        self.assertEqual(stats["total"]["tasks"],
+                         sum(len(each["tasks"]) for each in stories))
+        self.assertEqual(sum(stats["tags"].values()),
+                         sum(len(each["tags"]) for each in stories))
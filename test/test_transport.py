@@ -0,0 +1,134 @@
+import requests
+import socket
+import unittest
+
+from kaizen.api import ZenRequest
+from kaizen.client import ApiClient
+from kaizen.fakeserver import FakeApp, FakeDataset, FakeServer
+from kaizen.request import Request, VERBS
+from kaizen.transport import (MemoryTransport, RequestsTransport,
+                              Urllib3Transport, close_transports,
+                              get_transport)
+
+try:
+    import httpx
+    import h2
+except ImportError:
+    httpx = None
+
+
+def _closed_port_url():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return "http://127.0.0.1:%s/api/v1" % port
+
+
+class MemoryTransportTest(unittest.TestCase):
+
+    def setUp(self):
+        self._app = FakeApp(FakeDataset(stories=30))
+        client = ApiClient("fake_key", transport=MemoryTransport(self._app))
+        self._project_id = list(self._app.dataset.projects)[0]
+        self._project_request = ZenRequest("fake_key", client)\
+            .projects(self._project_id)
+
+    def test_send(self):
+        stories = self._project_request.stories().paginate(2, 10).send()
+        self.assertEqual(stories["page"], 2)
+        self.assertEqual(len(stories["items"]), 10)
+        self.assertEqual(self._app.request_count, 1)
+
+    def test_update(self):
+        story_id = list(self._app.dataset.stories[self._project_id])[0]
+        self._project_request.stories(story_id).update(text="new").send()
+        self.assertEqual(self._app.dataset.get_story(
+            self._project_id, story_id)["text"], "new")
+
+    def test_stream(self):
+        stories = list(self._project_request.stories().stream())
+        self.assertEqual(len(stories), 30)
+
+    def test_error(self):
+        self.assertRaises(requests.HTTPError,
+                          self._project_request.stories(12345).send)
+
+
+class _ServerTransportTest(object):
+    """Tests run against a FakeServer by each transport sending requests over
+    the network.
+    """
+
+    transport = None
+
+    def setUp(self):
+        self._server = FakeServer(FakeDataset(stories=30)).start()
+        self._project_id = list(self._server.dataset.projects)[0]
+        client = ApiClient("fake_key", api_url=self._server.api_url,
+                           transport=self.transport)
+        self._project_request = ZenRequest("fake_key", client)\
+            .projects(self._project_id)
+
+    def tearDown(self):
+        self._server.stop()
+        close_transports()
+
+    def test_send(self):
+        stories = self._project_request.stories().paginate(2, 10).send()
+        self.assertEqual(stories["page"], 2)
+        self.assertEqual(len(stories["items"]), 10)
+
+    def test_stream(self):
+        stories = list(self._project_request.stories().stream())
+        self.assertEqual(len(stories), 30)
+
+    def test_iter_items_concurrently(self):
+        stories = list(self._project_request.stories().iter_items(
+            5, workers=4))
+        self.assertEqual(len(stories), 30)
+
+    def test_error(self):
+        self.assertRaises(requests.HTTPError,
+                          self._project_request.stories(12345).send)
+
+    def test_connection_error(self):
+        client = ApiClient("fake_key", api_url=_closed_port_url(),
+                           transport=self.transport)
+        request = Request().update_url("projects").update_verb(VERBS.GET)
+        self.assertRaises(requests.ConnectionError, client.send_request,
+                          request)
+
+
+class RequestsTransportTest(_ServerTransportTest, unittest.TestCase):
+    transport = "requests"
+
+
+class Urllib3TransportTest(_ServerTransportTest, unittest.TestCase):
+    transport = "urllib3"
+
+
+@unittest.skipIf(httpx is None, "httpx and h2 are not installed")
+class Http2TransportTest(_ServerTransportTest, unittest.TestCase):
+    transport = "http2"
+
+
+class GetTransportTest(unittest.TestCase):
+
+    def tearDown(self):
+        close_transports()
+
+    def test_shared_per_api_key_and_options(self):
+        transport = get_transport("urllib3", "fake_key")
+        self.assertIsInstance(transport, Urllib3Transport)
+        self.assertIs(get_transport("urllib3", "fake_key"), transport)
+        self.assertIsNot(get_transport("urllib3", "other_key"), transport)
+        self.assertIsNot(get_transport("urllib3", "fake_key", 42), transport)
+
+    def test_default_transport(self):
+        self.assertIsInstance(ApiClient("fake_key")._transport,
+                              RequestsTransport)
+
+    def test_unknown_transport(self):
+        self.assertRaises(ValueError, get_transport, "carrier_pigeon",
+                          "fake_key")
@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+import unittest
+
+from kaizen.api import ZenRequest
+from kaizen.cache import DiskCache
+from kaizen.client import ApiClient
+from kaizen.fakeserver import FakeDataset, FakeServer
+from kaizen.metrics import RequestHooks
+from kaizen.watch import ADDED, CHANGED, REMOVED, StoryChange, StoryWatcher
+
+
+class StoryWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self._server = FakeServer(FakeDataset(stories=30)).start()
+        client = ApiClient("fake_key", api_url=self._server.api_url)
+        self._project_id = list(self._server.dataset.projects)[0]
+        self._project_request = ZenRequest("fake_key", client)\
+            .projects(self._project_id)
+        self._stories = self._server.dataset.stories[self._project_id]
+        self._watcher = StoryWatcher(self._project_request, size=10,
+                                     min_interval=1, max_interval=8)
+
+    def tearDown(self):
+        self._server.stop()
+
+    def test_snapshot(self):
+        changes = self._watcher.snapshot()
+        self.assertEqual(len(changes), 30)
+        self.assertEqual(set(change.kind for change in changes), set([ADDED]))
+
+    def test_poll_without_changes(self):
+        self._watcher.snapshot()
+        self.assertEqual(self._watcher.poll(), [])
+
+    def test_poll_changes(self):
+        self._watcher.snapshot()
+        dataset = self._server.dataset
+        updated_id = list(self._stories)[0]
+        dataset.update_story(self._project_id, updated_id, {"text": "new"})
+        added = dataset.add_story(self._project_id, {"text": "added"})
+        removed_id = list(self._stories)[1]
+        del self._stories[removed_id]
+        changes = self._watcher.poll()
+        self.assertEqual(sorted((change.kind, change.story_id)
+                                for change in changes),
+                         sorted([(CHANGED, updated_id), (ADDED, added["id"]),
+                                 (REMOVED, removed_id)]))
+        self.assertEqual(self._watcher.poll(), [])
+
+    def test_poll_only_lists_updated_stories(self):
+        self._watcher.snapshot()
+        requests = self._server.request_count
+        self._watcher.poll()
+        # One page of updated stories and one page counting the stories
+        self.assertEqual(self._server.request_count - requests, 2)
+
+    def test_adaptive_interval(self):
+        self._watcher.snapshot()
+        self._watcher.poll()
+        self._watcher.poll()
+        self.assertEqual(self._watcher.interval, 2.25)
+        for _ in range(5):
+            self._watcher.poll()
+        self.assertEqual(self._watcher.interval, 8)
+        self._server.dataset.add_story(self._project_id, {"text": "added"})
+        self._watcher.poll()
+        self.assertEqual(self._watcher.interval, 4)
+
+    def test_polls_are_conditional_with_a_disk_cache(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        statuses = _Statuses()
+        client = ApiClient("fake_key", api_url=self._server.api_url,
+                           disk_cache=DiskCache(directory), hooks=[statuses])
+        watcher = StoryWatcher(ZenRequest("fake_key", client)
+                               .projects(self._project_id), size=10)
+        watcher.snapshot()
+        watcher.poll()
+        del statuses[:]
+        self.assertEqual(watcher.poll(), [])
+        self.assertEqual(statuses, [304, 304])
+
+
+class _Statuses(RequestHooks, list):
+    """Hooks keeping the status of every response."""
+
+    def after_response(self, event):
+        self.append(event.status)
+
+
+class IterChangesTest(unittest.TestCase):
+
+    def test_iter_changes(self):
+        dataset = FakeDataset(stories=5)
+        project_id = list(dataset.projects)[0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 2:
+                dataset.add_story(project_id, {"text": "added"})
+
+        with FakeServer(dataset) as server:
+            client = ApiClient("fake_key", api_url=server.api_url)
+            changes = list(ZenRequest("fake_key", client).projects(project_id)
+                           .iter_changes(initial=True, polls=3, sleep=sleep))
+        self.assertEqual(len(changes), 6)
+        added = changes[-1]
+        self.assertEqual(added.kind, ADDED)
+        self.assertEqual(added.to_dict()["story"]["text"], "added")
+        # The poll finding the added story brings the interval back down
+        self.assertEqual(sleeps, [5, 7.5, 5])
+
+    def test_change_equality(self):
+        self.assertEqual(StoryChange(REMOVED, 1), StoryChange(REMOVED, 1))
+        self.assertNotEqual(StoryChange(REMOVED, 1), StoryChange(ADDED, 1))